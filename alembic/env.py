@@ -3,8 +3,10 @@ from sqlalchemy import engine_from_config, pool
 from sqlalchemy.ext.asyncio import AsyncEngine
 from core.config import config as app_config
 from core.database import Base
-from apps.qna.models import Question, Answer
-from apps.auth.models import User
+from apps.qna.models import Question, Answer, QuestionTrend
+from apps.auth.models import User, RevokedToken
+from apps.mail.models import EmailOutbox
+from core.idempotency import IdempotencyKey
 
 
 # Целевые метаданные
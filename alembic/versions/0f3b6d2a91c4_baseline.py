@@ -0,0 +1,79 @@
+"""baseline
+
+Revision ID: 0f3b6d2a91c4
+Revises:
+Create Date: 2026-10-18 08:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0f3b6d2a91c4'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Исходная схема, которую раньше создавал create_all при старте приложения.
+    # Существующие таблицы не трогаются: базы, созданные create_all до появления миграций,
+    # проходят эту ревизию без изменений и дальше обновляются следующими миграциями
+    existing = set() if context.is_offline_mode() else set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("username", sa.String(), nullable=True),
+            sa.Column("email", sa.String(), nullable=True),
+            sa.Column("hashed_password", sa.String(), nullable=True),
+            sa.Column("birth_date", sa.String(), nullable=True),
+            sa.Column("gender", sa.String(), nullable=True),
+            sa.Column("is_superuser", sa.Boolean(), nullable=True),
+            sa.Column("is_verified", sa.Boolean(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+            comment="Users",
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    if "question" not in existing:
+        op.create_table(
+            "question",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("text", sa.String(), nullable=False),
+            sa.Column("author_id", sa.String(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=True),
+            sa.ForeignKeyConstraint(["author_id"], ["users.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("text"),
+        )
+        op.create_index("ix_question_id", "question", ["id"])
+
+    if "answer" not in existing:
+        op.create_table(
+            "answer",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("question_id", sa.Integer(), nullable=False),
+            sa.Column("user_id", sa.String(), nullable=False),
+            sa.Column("text", sa.String(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=True),
+            sa.ForeignKeyConstraint(["question_id"], ["question.id"], ondelete="CASCADE"),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("id"),
+            comment="Answers",
+        )
+        op.create_index("ix_answer_id", "answer", ["id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("answer")
+    op.drop_table("question")
+    op.drop_table("users")
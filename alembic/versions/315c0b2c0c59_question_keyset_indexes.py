@@ -0,0 +1,40 @@
+"""question keyset indexes
+
+Revision ID: 315c0b2c0c59
+Revises: 0f3b6d2a91c4
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '315c0b2c0c59'
+down_revision: Union[str, None] = '0f3b6d2a91c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY не блокирует запись в question на время построения индексов
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_question_created_at_id", "question", ["created_at", "id"],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            "ix_question_author_id_created_at_id", "question", ["author_id", "created_at", "id"],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_question_author_id_created_at_id", table_name="question",
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index("ix_question_created_at_id", table_name="question",
+                      postgresql_concurrently=True, if_exists=True)
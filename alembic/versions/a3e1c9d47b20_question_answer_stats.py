@@ -0,0 +1,70 @@
+"""question answer stats
+
+Revision ID: a3e1c9d47b20
+Revises: 7605904aa268
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3e1c9d47b20'
+down_revision: Union[str, None] = '7605904aa268'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Размер диапазона id вопросов, пересчитываемого одной транзакцией
+BACKFILL_CHUNK_SIZE = 5000
+
+
+# Пересчёт счётчиков вопросов с id из [start, stop)
+BACKFILL_SQL = sa.text(
+    """
+    UPDATE question q
+    SET answer_count = s.answer_count, last_answer_at = s.last_answer_at
+    FROM (
+        SELECT question_id, count(*) AS answer_count, max(created_at) AS last_answer_at
+        FROM answer
+        WHERE question_id >= :start AND question_id < :stop
+        GROUP BY question_id
+    ) s
+    WHERE q.id = s.question_id
+    """
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Колонка с константным DEFAULT добавляется без перезаписи таблицы
+    op.add_column("question", sa.Column("answer_count", sa.Integer(), server_default="0", nullable=False))
+    op.add_column("question", sa.Column("last_answer_at", sa.DateTime(), nullable=True))
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_answer_question_id_created_at_id", "answer", ["question_id", "created_at", "id"],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+        if context.is_offline_mode():
+            # alembic upgrade --sql: без БД границы порций неизвестны — один UPDATE по всей таблице
+            op.execute(BACKFILL_SQL.bindparams(start=0, stop=2 ** 31))
+        else:
+            # Заполнение порциями: каждая порция — отдельная короткая транзакция,
+            # блокировки строк question не держатся на время всего пересчёта
+            bind = op.get_bind()
+            max_id = bind.execute(sa.text("SELECT max(id) FROM question")).scalar()
+            for start in range(0, (max_id or 0) + 1, BACKFILL_CHUNK_SIZE):
+                bind.execute(BACKFILL_SQL, {"start": start, "stop": start + BACKFILL_CHUNK_SIZE})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_answer_question_id_created_at_id", table_name="answer",
+                      postgresql_concurrently=True, if_exists=True)
+    op.drop_column("question", "last_answer_at")
+    op.drop_column("question", "answer_count")
@@ -0,0 +1,45 @@
+"""token revocation
+
+Revision ID: b5e82d1f6c39
+Revises: f3a8c6e1b472
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e82d1f6c39'
+down_revision: Union[str, None] = 'f3a8c6e1b472'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NULL у существующих пользователей: выпущенные до обновления токены (без iat) действуют до истечения срока
+    op.add_column("users", sa.Column("tokens_valid_after", sa.DateTime(), nullable=True))
+    op.create_table(
+        "revoked_token",
+        sa.Column("id", sa.BigInteger(), nullable=False),
+        sa.Column("jti", sa.String(length=32), nullable=True),
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("revoked_at", sa.DateTime(), server_default=sa.text("now()"), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        comment="Revoked tokens",
+    )
+    op.create_index("ix_revoked_token_jti", "revoked_token", ["jti"], unique=True)
+    op.create_index("ix_revoked_token_expires_at", "revoked_token", ["expires_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_revoked_token_expires_at", table_name="revoked_token")
+    op.drop_index("ix_revoked_token_jti", table_name="revoked_token")
+    op.drop_table("revoked_token")
+    op.drop_column("users", "tokens_valid_after")
@@ -0,0 +1,51 @@
+"""full text search
+
+Revision ID: c81f5a2e9d64
+Revises: a3e1c9d47b20
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c81f5a2e9d64'
+down_revision: Union[str, None] = 'a3e1c9d47b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_VECTORS = {
+    "question": "setweight(to_tsvector('russian', coalesce(text, '')), 'A')",
+    "answer": "setweight(to_tsvector('russian', coalesce(text, '')), 'C')",
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Генерируемая STORED-колонка заполняется перезаписью таблицы под эксклюзивной блокировкой:
+    # на больших таблицах миграцию нужно запускать в окно обслуживания
+    for table, expression in SEARCH_VECTORS.items():
+        op.add_column(
+            table,
+            sa.Column("search_vector", postgresql.TSVECTOR(), sa.Computed(expression, persisted=True), nullable=True),
+        )
+    with op.get_context().autocommit_block():
+        for table in SEARCH_VECTORS:
+            op.create_index(
+                f"ix_{table}_search_vector", table, ["search_vector"], postgresql_using="gin",
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for table in SEARCH_VECTORS:
+            op.drop_index(f"ix_{table}_search_vector", table_name=table,
+                          postgresql_concurrently=True, if_exists=True)
+    for table in SEARCH_VECTORS:
+        op.drop_column(table, "search_vector")
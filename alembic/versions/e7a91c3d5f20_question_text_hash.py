@@ -0,0 +1,69 @@
+"""question text hash and lsh bands
+
+Revision ID: e7a91c3d5f20
+Revises: d4f27a8b3e15
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a91c3d5f20'
+down_revision: Union[str, None] = 'd4f27a8b3e15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Размер диапазона id вопросов, заполняемого одной транзакцией
+BACKFILL_CHUNK_SIZE = 5000
+
+
+def _backfill(bind):
+    # Порции — отдельные короткие транзакции. sha256 в БД совпадает с apps.qna.utils.text_hash (текст в UTF-8)
+    max_id = bind.execute(sa.text("SELECT max(id) FROM question")).scalar()
+    for start in range(0, (max_id or 0) + 1, BACKFILL_CHUNK_SIZE):
+        bind.execute(
+            sa.text(
+                "UPDATE question SET text_hash = sha256(convert_to(text, 'UTF8')) "
+                "WHERE id >= :start AND id < :stop AND text_hash IS NULL"
+            ),
+            {"start": start, "stop": start + BACKFILL_CHUNK_SIZE},
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("question", sa.Column("text_hash", sa.LargeBinary(), nullable=True))
+    op.add_column("question", sa.Column("lsh_bands", postgresql.ARRAY(sa.Integer()), nullable=True))
+
+    with op.get_context().autocommit_block():
+        # lsh_bands не заполняются: ключи MinHash зависят от параметров приложения, которые могут измениться,
+        # а пустые ключи вычисляет и сохраняет индекс похожих вопросов при загрузке (apps.qna.dedup).
+        # alembic upgrade --sql: порций нет, хеши заполняет UPDATE ниже
+        if not context.is_offline_mode():
+            _backfill(op.get_bind())
+
+        op.create_index(
+            "ix_question_text_hash", "question", ["text_hash"], unique=True,
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+    # Вопросы, вставленные во время заполнения прежней версией приложения
+    op.execute("UPDATE question SET text_hash = sha256(convert_to(text, 'UTF8')) WHERE text_hash IS NULL")
+    op.alter_column("question", "text_hash", nullable=False)
+    # Уникальность текста теперь обеспечивает индекс по хешу
+    op.execute("ALTER TABLE question DROP CONSTRAINT IF EXISTS question_text_key")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_unique_constraint("question_text_key", "question", ["text"])
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_question_text_hash", table_name="question",
+                      postgresql_concurrently=True, if_exists=True)
+    op.drop_column("question", "lsh_bands")
+    op.drop_column("question", "text_hash")
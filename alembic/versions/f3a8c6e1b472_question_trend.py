@@ -0,0 +1,74 @@
+"""question trend
+
+Revision ID: f3a8c6e1b472
+Revises: e7a91c3d5f20
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a8c6e1b472'
+down_revision: Union[str, None] = 'e7a91c3d5f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Размер диапазона id вопросов, заполняемого одной транзакцией
+BACKFILL_CHUNK_SIZE = 5000
+# Период полураспада веса ответа, часов (apps.qna.models.TRENDING_HALF_LIFE_HOURS на момент миграции)
+HALF_LIFE_HOURS = 6
+
+
+# score = ln Σ 2^(t / T½) по ответам вопросов с id из [start, stop), считается как max + ln Σ e^(x - max)
+BACKFILL_SQL = sa.text(
+    """
+    INSERT INTO question_trend (question_id, score)
+    SELECT question_id, max(newest) + ln(sum(exp(greatest(exponent - newest, -700))))
+    FROM (
+        SELECT question_id, exponent, max(exponent) OVER (PARTITION BY question_id) AS newest
+        FROM (
+            SELECT question_id, extract(epoch FROM created_at)::float8 * ln(2) / :half_life AS exponent
+            FROM answer
+            WHERE question_id >= :start AND question_id < :stop
+        ) a
+    ) s
+    GROUP BY question_id
+    """
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "question_trend",
+        sa.Column("question_id", sa.Integer(), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(["question_id"], ["question.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("question_id"),
+        comment="Question trending scores",
+    )
+
+    with op.get_context().autocommit_block():
+        if context.is_offline_mode():
+            # alembic upgrade --sql: без БД границы порций неизвестны — один INSERT по всем вопросам
+            op.execute(BACKFILL_SQL.bindparams(start=0, stop=2 ** 31, half_life=HALF_LIFE_HOURS * 3600))
+        else:
+            bind = op.get_bind()
+            max_id = bind.execute(sa.text("SELECT max(id) FROM question")).scalar()
+            for start in range(0, (max_id or 0) + 1, BACKFILL_CHUNK_SIZE):
+                bind.execute(
+                    BACKFILL_SQL,
+                    {"start": start, "stop": start + BACKFILL_CHUNK_SIZE, "half_life": HALF_LIFE_HOURS * 3600},
+                )
+
+    op.create_index("ix_question_trend_score_question_id", "question_trend", ["score", "question_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_question_trend_score_question_id", table_name="question_trend")
+    op.drop_table("question_trend")
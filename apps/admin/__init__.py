@@ -3,9 +3,8 @@ from sqladmin import Admin
 from apps.admin.auth import AdminAuth
 from apps.admin.views.users import UserAdmin
 from apps.admin.views.qna import QuestionAdmin, AnswerAdmin
-from core.database import engine
+from core.database import async_session
 import logging
-from sqlalchemy.ext.asyncio import async_sessionmaker
 
 logger = logging.getLogger(__name__)
 
@@ -13,13 +12,10 @@ logger = logging.getLogger(__name__)
 def init_admin(app: FastAPI):
     logger.info("Начало инициализации панели администратора")
 
-    logger.debug("Создание фабрики асинхронных сессий")
-    AsyncSessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
-    app.state.db_session_maker = AsyncSessionLocal
-    logger.debug("Фабрика асинхронных сессий успешно создана")
+    # Общая фабрика сессий приложения: админка работает через тот же пул соединений и настройки сессий
     admin = Admin(
         app,
-        engine,
+        session_maker=async_session,
         title="Админ-панель QnA",
         authentication_backend=AdminAuth()
     )
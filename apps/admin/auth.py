@@ -1,8 +1,9 @@
 from fastapi import Request
 from sqladmin.authentication import AuthenticationBackend
 from sqlalchemy.ext.asyncio import AsyncSession
-from apps.auth.crud import get_user_by_email
-from apps.auth.routes import verify_password
+from apps.auth.crud import get_user_by_email, rehash_password_if_needed
+from apps.auth.hashing import PasswordHasherBusy
+from apps.auth.utils import verify_password
 from core.config import config
 from core.dependencies import get_db_session
 import logging
@@ -19,30 +20,36 @@ class AdminAuth(AuthenticationBackend):
         form_data = await request.form()
         email = form_data.get("username")
         password = form_data.get("password")
-        logger.debug(f"Попытка входа с email: {email}")
+        logger.debug("Попытка входа с email: %s", email)
         session = await get_db_session()
         async with session as db_session:
             user = await get_user_by_email(db_session, email)
             if user:
-                logger.debug(f"Пользователь найден: id={user.id}, is_superuser={user.is_superuser}")
-                if verify_password(password, user.hashed_password) and user.is_superuser:
+                logger.debug("Пользователь найден: id=%s, is_superuser=%s", user.id, user.is_superuser)
+                try:
+                    password_ok = await verify_password(password, user.hashed_password)
+                except PasswordHasherBusy:
+                    logger.warning("Вход в админ-панель отклонён из-за перегрузки: %s", email)
+                    return False
+                if password_ok and user.is_superuser:
+                    await rehash_password_if_needed(db_session, user, password)
                     request.session["authenticated"] = True
                     request.session["user_id"] = user.id
-                    logger.info(f"Успешный вход: user_id={user.id}, email={email}")
+                    logger.info("Успешный вход: user_id=%s, email=%s", user.id, email)
                     return True
                 else:
-                    logger.warning(f"Неверный пароль или недостаточно прав для user_id={user.id}")
+                    logger.warning("Неверный пароль или недостаточно прав для user_id=%s", user.id)
             else:
-                logger.warning(f"Пользователь с email={email} не найден")
+                logger.warning("Пользователь с email=%s не найден", email)
         return False
 
     async def logout(self, request: Request) -> bool:
-        logger.info(f"Выход из админ-панели: user_id={request.session.get('user_id')}")
+        logger.info("Выход из админ-панели: user_id=%s", request.session.get('user_id'))
         request.session.clear()
         logger.debug("Сессия очищена")
         return True
 
     async def authenticate(self, request: Request) -> bool:
         authenticated = request.session.get("authenticated", False)
-        logger.debug(f"Проверка аутентификации: authenticated={authenticated}, user_id={request.session.get('user_id')}")
+        logger.debug("Проверка аутентификации: authenticated=%s, user_id=%s", authenticated, request.session.get('user_id'))
         return authenticated
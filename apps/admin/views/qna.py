@@ -1,16 +1,41 @@
 from sqladmin import ModelView
 from apps.qna.models import Question, Answer
+from apps.qna.cache import invalidate_question
+from apps.qna.crud import to_tsquery, search_matches, refresh_answer_stats
+from core.database import async_session
+
+
+async def _answers_changed(*question_ids: int):
+    """Пересчитывает счётчики и популярность вопросов после изменения ответов в админке и сбрасывает их кэш."""
+    question_ids = sorted({question_id for question_id in question_ids if question_id is not None})
+    async with async_session() as db:
+        await refresh_answer_stats(db, question_ids)
+        await db.commit()
+    for question_id in question_ids:
+        await invalidate_question(question_id)
 
 
 class QuestionAdmin(ModelView, model=Question):
     column_list = [Question.id, Question.text, Question.created_at]
     column_searchable_list = [Question.text]
     column_sortable_list = [Question.id, Question.created_at]
+    # Вычисляются из text при сохранении
+    form_excluded_columns = [Question.text_hash, Question.lsh_bands]
     page_size = 20
     name = "Вопрос"
     name_plural = "Вопросы"
     icon = "fa fa-question-circle"
 
+    def search_query(self, stmt, term):
+        # Поиск по GIN-индексу search_vector вместо ILIKE '%...%' по всей таблице
+        return stmt.where(search_matches(Question.search_vector, to_tsquery(term)))
+
+    async def after_model_change(self, data, model, is_created, request):
+        await invalidate_question(model.id)
+
+    async def after_model_delete(self, model, request):
+        await invalidate_question(model.id)
+
 
 class AnswerAdmin(ModelView, model=Answer):
     column_list = [Answer.id, Answer.text, Answer.user_id, Answer.question_id, Answer.created_at]
@@ -19,4 +44,17 @@ class AnswerAdmin(ModelView, model=Answer):
     page_size = 20
     name = "Ответ"
     name_plural = "Ответы"
-    icon = "fa fa-reply"
\ No newline at end of file
+    icon = "fa fa-reply"
+
+    def search_query(self, stmt, term):
+        return stmt.where(search_matches(Answer.search_vector, to_tsquery(term)))
+
+    async def on_model_change(self, data, model, is_created, request):
+        # Прежний вопрос: после сохранения ответ может быть перенесён в другой
+        request.state.previous_question_id = None if is_created else model.question_id
+
+    async def after_model_change(self, data, model, is_created, request):
+        await _answers_changed(request.state.previous_question_id, model.question_id)
+
+    async def after_model_delete(self, model, request):
+        await _answers_changed(model.question_id)
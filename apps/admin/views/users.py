@@ -1,5 +1,6 @@
 from sqladmin import ModelView
 from apps.auth.models import User
+from apps.auth.cache import invalidate_user
 
 class UserAdmin(ModelView, model=User):
     column_list = [User.id, User.username, User.email, User.is_superuser]
@@ -7,4 +8,15 @@ class UserAdmin(ModelView, model=User):
     page_size = 20
     name = "Пользователь"
     name_plural = "Пользователи"
-    icon = "fa fa-user"
\ No newline at end of file
+    icon = "fa fa-user"
+
+    async def on_model_change(self, data, model, is_created, request):
+        # Старый email: после сохранения он уже будет перезаписан
+        if not is_created:
+            await invalidate_user(model.email)
+
+    async def after_model_change(self, data, model, is_created, request):
+        await invalidate_user(model.email)
+
+    async def after_model_delete(self, model, request):
+        await invalidate_user(model.email)
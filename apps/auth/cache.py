@@ -0,0 +1,71 @@
+import json
+import logging
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy import DateTime
+from sqlalchemy.orm import make_transient_to_detached
+from apps.auth.models import User
+from core.cache import create_cache, cache_requests_total
+from core.config import config
+
+logger = logging.getLogger(__name__)
+
+# Кэш пользователей, ключ — subject токена (email в нижнем регистре).
+# При CACHE_BACKEND=memory инвалидация видна только своему процессу: остальные воркеры отдают прежнего
+# пользователя (в том числе удалённого или лишённого прав) до USER_CACHE_TTL_SECONDS. Смена пароля и выход
+# везде действуют во всех процессах через отзыв токенов (apps/auth/revocation.py).
+user_cache = create_cache("user", config.USER_CACHE_MAX_ENTRIES)
+
+# Метка вместо записи после инвалидации: пока она жива, пользователь читается только из primary,
+# чтобы отставшая реплика не вернула в кэш удалённого или ещё не подтверждённого пользователя
+_CHANGED_MARKER = b"-"
+
+# Хеш пароля в кэш (и в Redis) не попадает: у пользователя из кэша атрибут не загружен,
+# проверка пароля читает хеш из БД
+_EXCLUDED_COLUMNS = {"hashed_password"}
+_COLUMNS = [column.key for column in User.__table__.columns if column.key not in _EXCLUDED_COLUMNS]
+_DATETIME_COLUMNS = {column.key for column in User.__table__.columns if isinstance(column.type, DateTime)}
+
+
+def _dump_user(user: User) -> bytes:
+    data = {}
+    for key in _COLUMNS:
+        value = getattr(user, key)
+        data[key] = value.isoformat() if isinstance(value, datetime) else value
+    return json.dumps(data).encode("utf-8")
+
+
+def _load_user(raw: bytes) -> User:
+    data = json.loads(raw)
+    for key in _DATETIME_COLUMNS:
+        if data.get(key) is not None:
+            data[key] = datetime.fromisoformat(data[key])
+    user = User(**data)
+    # Объект выглядит как загруженный из БД: session.merge(user, load=False) подключит его без SELECT
+    make_transient_to_detached(user)
+    return user
+
+
+async def get_cached_user(email: str) -> Tuple[Optional[User], bool]:
+    """Возвращает (отсоединённый от сессии User или None, изменялся ли пользователь недавно)."""
+    raw = await user_cache.get(email.lower())
+    if raw is None or raw == _CHANGED_MARKER:
+        cache_requests_total.labels("user", "miss").inc()
+        return None, raw is not None
+    cache_requests_total.labels("user", "hit").inc()
+    return _load_user(raw), False
+
+
+async def cache_user(user: User):
+    """Кладёт пользователя в кэш. Неподтверждённые пользователи не кэшируются."""
+    if not user.is_verified:
+        return
+    await user_cache.set(user.email.lower(), _dump_user(user), config.USER_CACHE_TTL_SECONDS)
+
+
+async def invalidate_user(*emails: Optional[str]):
+    """Сбрасывает пользователей в кэше. Вызывается после фиксации изменений пользователя в БД."""
+    keys = [email.lower() for email in emails if email]
+    logger.debug("Инвалидация кэша пользователей: %s", keys)
+    for key in keys:
+        await user_cache.set(key, _CHANGED_MARKER, config.READ_YOUR_WRITES_SECONDS)
@@ -3,7 +3,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from apps.auth.models import User
 from apps.auth.schemas import UserCreate, UserUpdate, PasswordChange
-import bcrypt
+from apps.auth.cache import invalidate_user
+from apps.auth import revocation
+from apps.auth.hashing import password_hasher
+from apps.auth.utils import hash_password, verify_password
+from apps.mail.crud import enqueue_email
 from jose import jwt, JWTError
 from core.config import config
 from datetime import timedelta
@@ -12,24 +16,37 @@ logger = logging.getLogger(__name__)
 
 async def get_user_by_email(db: AsyncSession, email: str):
     email = email.lower()
-    logger.debug(f"Поиск пользователя по email: {email}")
+    logger.debug("Поиск пользователя по email: %s", email)
     result = await db.execute(select(User).filter(User.email == email))
     user = result.scalars().first()
-    logger.debug(f"Пользователь найден: {user.email if user else 'не найден'}")
+    logger.debug("Пользователь найден: %s", user.email if user else 'не найден')
     return user
 
 async def create_verification_token(email: str) -> str:
     """Генерирует токен подтверждения email."""
-    logger.debug(f"Создание токена подтверждения для email: {email}")
+    logger.debug("Создание токена подтверждения для email: %s", email)
     to_encode = {"sub": email, "type": "verify"}
     expire = timedelta(hours=24)
     token = jwt.encode(to_encode, config.SECRET_KEY, config.ALGORITHM)
     logger.debug("Токен подтверждения успешно создан")
     return token
 
-async def create_user(db: AsyncSession, user: UserCreate):
-    logger.debug(f"Создание пользователя: {user.email}")
-    hashed_password = bcrypt.hashpw(user.password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+def build_verification_email(username: str, verification_token: str) -> str:
+    """Текст письма со ссылкой подтверждения email."""
+    verification_link = f"{config.BASE_URL}/auth/verify?token={verification_token}"
+    return f"""
+        Здравствуйте, {username}!
+
+        Спасибо за регистрацию в QnA. Пожалуйста, подтвердите ваш email, перейдя по ссылке:
+        {verification_link}
+
+        Если вы не регистрировались, просто проигнорируйте это письмо.
+        """
+
+async def create_user(db: AsyncSession, user: UserCreate, send_verification: bool = True):
+    """Создаёт пользователя и в той же транзакции ставит в outbox письмо для подтверждения email."""
+    logger.debug("Создание пользователя: %s", user.email)
+    hashed_password = await hash_password(user.password)
     db_user = User(
         username=user.username,
         email=user.email.lower(),
@@ -38,12 +55,18 @@ async def create_user(db: AsyncSession, user: UserCreate):
         gender=user.gender.value if user.gender else None,
     )
     db.add(db_user)
+    verification_token = await create_verification_token(db_user.email)
+    logger.debug("Токен подтверждения создан для пользователя: %s", db_user.email)
+    if send_verification and config.SMTP_ENABLED:
+        enqueue_email(
+            db,
+            db_user.email,
+            "Подтверждение регистрации в QnA",
+            build_verification_email(db_user.username, verification_token),
+        )
     await db.commit()
     await db.refresh(db_user)
-    logger.info(f"Пользователь успешно создан: {db_user.email}")
-
-    verification_token = await create_verification_token(db_user.email)
-    logger.debug(f"Токен подтверждения создан для пользователя: {db_user.email}")
+    logger.info("Пользователь успешно создан: %s", db_user.email)
     return db_user, verification_token
 
 async def verify_user_email(db: AsyncSession, token: str):
@@ -60,39 +83,66 @@ async def verify_user_email(db: AsyncSession, token: str):
         if user and not user.is_verified:
             user.is_verified = True
             await db.commit()
+            await invalidate_user(user.email)
             await db.refresh(user)
-            logger.info(f"Email успешно подтверждён для пользователя: {user.email}")
+            logger.info("Email успешно подтверждён для пользователя: %s", user.email)
             return user
-        logger.warning(f"Пользователь не найден или email уже подтверждён: {email}")
+        logger.warning("Пользователь не найден или email уже подтверждён: %s", email)
         return None
     except JWTError as e:
-        logger.error(f"Ошибка при проверке токена: {str(e)}")
+        logger.error("Ошибка при проверке токена: %s", e)
         return None
 
 async def update_user(db: AsyncSession, user: User, user_update: UserUpdate):
-    logger.debug(f"Обновление профиля пользователя: {user.email}")
+    logger.debug("Обновление профиля пользователя: %s", user.email)
+    old_email = user.email
     if user_update.email is not None and user_update.email != user.email:
         if await get_user_by_email(db, user_update.email):
-            logger.warning(f"Попытка обновления на занятый email: {user_update.email}")
+            logger.warning("Попытка обновления на занятый email: %s", user_update.email)
             raise ValueError("Этот email уже занят")
         user.email = user_update.email.lower()
         user.is_verified = False
-        logger.debug(f"Email изменён на: {user.email}, статус верификации сброшен")
+        logger.debug("Email изменён на: %s, статус верификации сброшен", user.email)
     if user_update.gender is not None:
         user.gender = user_update.gender.value
-        logger.debug(f"Пол изменён на: {user.gender}")
+        logger.debug("Пол изменён на: %s", user.gender)
     await db.commit()
+    await invalidate_user(old_email, user.email)
     await db.refresh(user)
-    logger.info(f"Профиль пользователя успешно обновлён: {user.email}")
+    logger.info("Профиль пользователя успешно обновлён: %s", user.email)
     return user
 
 async def change_password(db: AsyncSession, user: User, password_change: PasswordChange):
-    logger.debug(f"Смена пароля для пользователя: {user.email}")
-    if not bcrypt.checkpw(password_change.current_password.encode("utf-8"), user.hashed_password.encode("utf-8")):
+    logger.debug("Смена пароля для пользователя: %s", user.email)
+    # Пользователь из кэша загружен без хеша пароля
+    hashed_password = await db.scalar(select(User.hashed_password).where(User.id == user.id))
+    if not await verify_password(password_change.current_password, hashed_password):
         logger.warning("Неверный текущий пароль")
         raise ValueError("Текущий пароль неверный")
-    user.hashed_password = bcrypt.hashpw(password_change.new_password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    user.hashed_password = await hash_password(password_change.new_password)
+    # Все выпущенные токены, в том числе украденные со старым паролем, перестают действовать
+    revocation.revoke_user_tokens(db, user)
     await db.commit()
+    revocation.user_tokens_revoked(user)
+    await invalidate_user(user.email)
     await db.refresh(user)
-    logger.info(f"Пароль успешно изменён для пользователя: {user.email}")
+    logger.info("Пароль успешно изменён для пользователя: %s", user.email)
     return user
+
+async def revoke_user_tokens(db: AsyncSession, user: User):
+    """Отзывает все выпущенные пользователю токены («выйти везде»)."""
+    revocation.revoke_user_tokens(db, user)
+    await db.commit()
+    revocation.user_tokens_revoked(user)
+    await invalidate_user(user.email)
+    await db.refresh(user)
+    logger.info("Токены пользователя отозваны: %s", user.email)
+
+async def rehash_password_if_needed(db: AsyncSession, user: User, password: str):
+    """Перехеширует пароль после успешного входа, если изменился BCRYPT_ROUNDS."""
+    if not password_hasher.needs_rehash(user.hashed_password):
+        return
+    logger.info("Перехеширование пароля с новым cost factor для пользователя: %s", user.email)
+    user.hashed_password = await hash_password(password)
+    await db.commit()
+    await invalidate_user(user.email)
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from core.config import config
+from core.profiling import profiled
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusy(Exception):
+    """Очередь на хеширование паролей переполнена."""
+
+
+class PasswordHasher:
+    """Хеширование и проверка паролей bcrypt в ограниченном пуле потоков.
+
+    bcrypt отпускает GIL, поэтому вычисления в потоках не блокируют event loop.
+    Если в работе и в очереди уже workers + queue_depth операций, новая операция
+    сразу отклоняется с PasswordHasherBusy, а не копит задержку.
+    """
+
+    def __init__(self, rounds: int, workers: int, queue_depth: int):
+        self.rounds = rounds
+        self._limit = workers + queue_depth
+        self._pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+
+    async def _run(self, func, *args):
+        if self._pending >= self._limit:
+            logger.warning("Очередь хеширования паролей переполнена: %s операций", self._pending)
+            raise PasswordHasherBusy("Сервис перегружен, повторите попытку позже")
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+
+    def _hash(self, password: str) -> str:
+        return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(self.rounds)).decode("utf-8")
+
+    @staticmethod
+    def _verify(password: str, hashed_password: str) -> bool:
+        return bcrypt.checkpw(password.encode("utf-8"), hashed_password.encode("utf-8"))
+
+    @profiled("bcrypt")
+    async def hash(self, password: str) -> str:
+        """Хеширует пароль с текущим cost factor."""
+        return await self._run(self._hash, password)
+
+    @profiled("bcrypt")
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """Проверяет пароль по хешу."""
+        return await self._run(self._verify, password, hashed_password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """Хеш создан с cost factor, отличным от текущего BCRYPT_ROUNDS."""
+        try:
+            return int(hashed_password.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(
+    rounds=config.BCRYPT_ROUNDS,
+    workers=config.PASSWORD_HASH_WORKERS,
+    queue_depth=config.PASSWORD_HASH_QUEUE_DEPTH,
+)
@@ -1,9 +1,14 @@
-from sqlalchemy import Column, String, Boolean, DateTime
+from sqlalchemy import Column, String, Boolean, DateTime, BigInteger, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from core.database import Base
 from sqlalchemy.sql import func
+from datetime import datetime, UTC
 import uuid
 
+
+def _utcnow() -> datetime:
+    return datetime.now(UTC).replace(tzinfo=None)
+
 class User(Base):
     __tablename__ = "users"
     __table_args__ = {'comment': 'Users'}
@@ -17,6 +22,30 @@ class User(Base):
     is_superuser = Column(Boolean, default=False)
     is_verified = Column(Boolean, default=False)
     created_at = Column(DateTime, server_default=func.now())
+    # Токены, выпущенные раньше (iat), недействительны: «выйти везде» и смена пароля. У нового пользователя —
+    # момент создания, чтобы токены удалённого пользователя с тем же email не подошли к новому
+    tokens_valid_after = Column(DateTime, nullable=True, default=_utcnow)
+
+    answers = relationship("Answer", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    questions = relationship("Question", back_populates="author", cascade="all, delete-orphan", passive_deletes=True)
+
+
+class RevokedToken(Base):
+    """Отозванный токен (по jti) или, при jti NULL, отзыв всех токенов пользователя (tokens_valid_after).
+
+    Запись нужна, пока не истёк срок самих токенов.
+    """
+    __tablename__ = "revoked_token"
+    __table_args__ = (
+        Index("ix_revoked_token_jti", "jti", unique=True),
+        # Очистка истёкших записей
+        Index("ix_revoked_token_expires_at", "expires_at"),
+        {'comment': 'Revoked tokens'},
+    )
 
-    answers = relationship("Answer", back_populates="user", cascade="all, delete-orphan")
-    questions = relationship("Question", back_populates="author", cascade="all, delete-orphan")
+    # Возрастающий id — по нему процессы дочитывают новые записи в свои фильтры
+    id = Column(BigInteger, primary_key=True)
+    jti = Column(String(32), nullable=True)
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, server_default=func.now())
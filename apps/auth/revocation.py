@@ -0,0 +1,215 @@
+"""Отзыв JWT-токенов.
+
+Два механизма:
+- users.tokens_valid_after — токены пользователя, выпущенные раньше (iat), недействительны. Это «выйти везде»
+  и смена пароля. Изменение сопровождается записью в revoked_token с jti NULL;
+- revoked_token с jti — отдельные токены: выход и refresh-токен, уже использованный для обновления.
+Записи хранятся, пока не истёк срок токенов.
+
+Каждый процесс раз в REVOCATION_SYNC_INTERVAL дочитывает новые записи revoked_token по возрастающему id:
+jti — в фильтр Блума, отзывы всех токенов — в словарь user_id -> tokens_valid_after (их немного: смены
+пароля за срок жизни refresh-токена). Пользователь при проверке токена может быть из кэша другого процесса,
+загруженным до отзыва, поэтому его tokens_valid_after сравнивается со словарём. По jti проверка обращается
+к БД, только если jti есть в фильтре: токен отозван или это ложное срабатывание (доля около
+REVOCATION_FILTER_ERROR_RATE). Отзыв действует в процессе, который его выполнил, сразу, в остальных — после
+следующей синхронизации. Пока записи не загружены, каждая проверка идёт в БД.
+"""
+import asyncio
+import logging
+from datetime import datetime, UTC
+from typing import Dict, Optional
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from apps.auth.models import User, RevokedToken
+from apps.auth.utils import REFRESH_TOKEN_EXPIRE
+from core.bloom import BloomFilter
+from core.config import config
+from core.database import async_session
+from core.metrics import CallbackGauge, Counter
+
+logger = logging.getLogger(__name__)
+
+# Записи, которые перечитываются при синхронизации: транзакция с меньшим id могла зафиксироваться позже
+SYNC_LOOKBACK = 100
+LOAD_BATCH_SIZE = 5000
+
+# Доля ложных срабатываний фильтра: false_positive / (false_positive + filtered)
+token_revocation_checks_total = Counter(
+    "qna_token_revocation_checks_total", "Проверки отзыва токена по jti: отсеяно фильтром или результат запроса к БД",
+    ["result"],
+)
+
+
+def _now() -> datetime:
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+class RevocationList:
+    def __init__(self):
+        self._filter = BloomFilter(config.REVOCATION_FILTER_CAPACITY, config.REVOCATION_FILTER_ERROR_RATE)
+        self._users: Dict[str, datetime] = {}  # user_id -> tokens_valid_after последнего отзыва всех токенов
+        self.max_id = 0
+        self.loaded = False
+
+    def __len__(self):
+        return len(self._filter)
+
+    def add(self, jti: str):
+        self._filter.add(jti)
+
+    def add_user(self, user_id: str, valid_after: datetime):
+        if valid_after > self._users.get(user_id, valid_after.min):
+            self._users[user_id] = valid_after
+
+    def might_contain(self, jti: str) -> bool:
+        """False — токен точно не отозван (на момент последней синхронизации)."""
+        return not self.loaded or jti in self._filter
+
+    def valid_after(self, user_id: str) -> Optional[datetime]:
+        return self._users.get(user_id)
+
+    async def sync(self) -> int:
+        """Дочитывает новые записи; при первом вызове и заполнении фильтра — пересобирает его целиком.
+
+        Возвращает число прочитанных записей.
+        """
+        rebuild = not self.loaded or len(self._filter) >= self._filter.capacity
+        async with async_session() as db:
+            if rebuild:
+                # Запас вдвое: до следующей пересборки помещается столько же новых отзывов
+                live = await db.scalar(select(func.count()).where(RevokedToken.expires_at > _now()))
+                bloom = BloomFilter(max(config.REVOCATION_FILTER_CAPACITY, 2 * live), config.REVOCATION_FILTER_ERROR_RATE)
+                users: Dict[str, datetime] = {}
+                start = 0
+            else:
+                bloom, users = self._filter, self._users
+                start = max(self.max_id - SYNC_LOOKBACK, 0)
+            max_id, read = start, 0
+            while True:
+                result = await db.execute(
+                    select(RevokedToken.id, RevokedToken.jti, RevokedToken.user_id, RevokedToken.revoked_at)
+                    .where(RevokedToken.id > max_id, RevokedToken.expires_at > _now())
+                    .order_by(RevokedToken.id)
+                    .limit(LOAD_BATCH_SIZE)
+                )
+                rows = result.all()
+                if not rows:
+                    break
+                max_id = rows[-1][0]
+                read += len(rows)
+                for _, jti, user_id, revoked_at in rows:
+                    if jti is not None:
+                        bloom.add(jti)
+                    elif revoked_at > users.get(user_id, revoked_at.min):
+                        users[user_id] = revoked_at
+        if rebuild:
+            # Отозванные этим процессом во время загрузки записи уже в БД: недочитанные подберёт SYNC_LOOKBACK
+            # Отзывы всех токенов, выполненные этим процессом во время загрузки, переносятся из прежнего словаря
+            for user_id, valid_after in self._users.items():
+                if valid_after > users.get(user_id, valid_after.min):
+                    users[user_id] = valid_after
+            self._filter, self._users, self.max_id = bloom, users, max_id
+            logger.info(
+                "Фильтр отозванных токенов %s: %s записей, %s байт",
+                "загружен" if not self.loaded else "пересобран", len(bloom), bloom.nbytes,
+            )
+            self.loaded = True
+        else:
+            self.max_id = max(self.max_id, max_id)
+        return read
+
+
+revocation_list = RevocationList()
+
+
+async def is_token_revoked(db: AsyncSession, payload: dict, user: User) -> bool:
+    """Отозван ли токен с расшифрованным payload, выданный пользователю user."""
+    valid_after = user.tokens_valid_after
+    if not revocation_list.loaded:
+        valid_after = await db.scalar(select(User.tokens_valid_after).where(User.id == user.id))
+    else:
+        # Пользователь мог попасть в кэш другого процесса до отзыва всех его токенов
+        revoked_after = revocation_list.valid_after(user.id)
+        if revoked_after is not None and (valid_after is None or revoked_after > valid_after):
+            valid_after = revoked_after
+    if valid_after is not None and payload.get("iat", 0) < valid_after.replace(tzinfo=UTC).timestamp():
+        return True
+    jti = payload.get("jti")
+    if jti is None:
+        return False
+    if not revocation_list.might_contain(jti):
+        token_revocation_checks_total.labels("filtered").inc()
+        return False
+    revoked = await db.scalar(select(RevokedToken.id).where(RevokedToken.jti == jti)) is not None
+    token_revocation_checks_total.labels("revoked" if revoked else "false_positive").inc()
+    return revoked
+
+
+async def revoke_token(db: AsyncSession, payload: dict, user_id: str) -> bool:
+    """Отзывает токен по jti. False — токен уже был отозван (например, параллельным обновлением)."""
+    jti = payload["jti"]
+    statement = (
+        pg_insert(RevokedToken)
+        .values(jti=jti, user_id=user_id, expires_at=datetime.fromtimestamp(payload["exp"], UTC).replace(tzinfo=None))
+        .on_conflict_do_nothing(index_elements=[RevokedToken.jti])
+        .returning(RevokedToken.id)
+    )
+    revoked_id: Optional[int] = (await db.execute(statement)).scalar()
+    await db.commit()
+    revocation_list.add(jti)
+    return revoked_id is not None
+
+
+def revoke_user_tokens(db: AsyncSession, user: User):
+    """Отзывает все токены пользователя в текущей транзакции (без commit), см. user_tokens_revoked."""
+    now = _now()
+    user.tokens_valid_after = now
+    # revoked_at совпадает с tokens_valid_after; токены, выпущенные до отзыва, истекают не позже refresh-токенов
+    db.add(RevokedToken(jti=None, user_id=user.id, revoked_at=now, expires_at=now + REFRESH_TOKEN_EXPIRE))
+
+
+def user_tokens_revoked(user: User):
+    """После фиксации revoke_user_tokens: отзыв сразу действует в этом процессе."""
+    revocation_list.add_user(user.id, user.tokens_valid_after)
+
+
+async def purge_expired_tokens() -> int:
+    """Удаляет записи об истёкших токенах. Возвращает количество удалённых."""
+    async with async_session() as db:
+        result = await db.execute(delete(RevokedToken).where(RevokedToken.expires_at < _now()))
+        await db.commit()
+    return result.rowcount
+
+
+async def run_sync_forever(interval: float):
+    while True:
+        try:
+            read = await revocation_list.sync()
+            if read:
+                logger.debug("В фильтр отозванных токенов прочитано %s записей", read)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Ошибка синхронизации отозванных токенов: %s", e)
+        await asyncio.sleep(interval)
+
+
+async def run_purge_forever(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            purged = await purge_expired_tokens()
+            if purged:
+                logger.info("Удалено %s записей об истёкших отозванных токенах", purged)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Ошибка очистки отозванных токенов: %s", e)
+
+
+CallbackGauge(
+    "qna_token_revocation_filter_entries", "Записей в фильтре отозванных токенов процесса", [],
+    lambda: {(): len(revocation_list)},
+)
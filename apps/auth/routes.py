@@ -1,15 +1,21 @@
 import logging
-from fastapi import APIRouter, HTTPException, Depends, status, Body
+from fastapi import APIRouter, HTTPException, Depends, status, Body, Request
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from apps.auth.schemas import UserCreate, Token, UserUpdate, PasswordChange, RefreshToken
 from apps.auth.crud import get_user_by_email, create_user, update_user, change_password, create_verification_token, \
-    verify_user_email
+    verify_user_email, rehash_password_if_needed, revoke_user_tokens
+from apps.auth.hashing import PasswordHasherBusy
 from apps.auth.utils import verify_password, create_access_token, create_refresh_token  # Импорт утилит
 from apps.auth.models import User
-from core.dependencies import get_db
+from apps.auth.cache import get_cached_user, cache_user, invalidate_user
+from apps.auth.revocation import is_token_revoked, revoke_token
+from apps.qna.crud import get_answered_question_ids, refresh_answer_stats
+from apps.qna.cache import invalidate_question
+from core.dependencies import get_db, read_session, use_replica
 from core.config import config
-from core.email import send_email
+from core.database import async_session
+from core.profiling import profiled
 from jose import jwt, JWTError
 from datetime import timedelta, UTC
 import traceback
@@ -22,7 +28,32 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login",
                                      auto_error=False)  # auto_error=False делает заголовок необязательным
 
 
-async def get_current_user(token: Optional[str] = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+async def _load_current_user(request: Request, db: AsyncSession, email: str) -> Optional[User]:
+    """Загружает пользователя для токена: из кэша, реплики или primary. Результат привязан к сессии db."""
+    user, recently_changed = await get_cached_user(email)
+    if user is not None:
+        # Подключаем пользователя из кэша к сессии запроса без обращения к БД
+        return await db.merge(user, load=False)
+    if use_replica(request) and not recently_changed:
+        async with read_session(request) as read_db:
+            user = await get_user_by_email(read_db, email)
+        # Отсутствие или неподтверждённость на реплике может быть отставанием репликации — перепроверяем в primary
+        if user is not None and user.is_verified:
+            user = await db.merge(user, load=False)
+            await cache_user(user)
+            return user
+    user = await get_user_by_email(db, email)
+    if user is not None:
+        await cache_user(user)
+    return user
+
+
+@profiled("auth")
+async def get_current_user(
+        request: Request,
+        token: Optional[str] = Depends(oauth2_scheme),
+        db: AsyncSession = Depends(get_db)
+):
     """Получает пользователя по JWT-токену."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -42,25 +73,51 @@ async def get_current_user(token: Optional[str] = Depends(oauth2_scheme), db: As
         if email is None:
             logger.warning("Токен не содержит email")
             raise credentials_exception
-        logger.debug(f"Извлечён email из токена: {email}")
+        logger.debug("Извлечён email из токена: %s", email)
     except JWTError as e:
-        logger.error(f"Ошибка декодирования токена: {str(e)}")
+        logger.error("Ошибка декодирования токена: %s", e)
         raise credentials_exception
 
-    user = await get_user_by_email(db, email)
+    user = await _load_current_user(request, db, email)
     if user is None:
-        logger.warning(f"Пользователь с email {email} не найден")
+        logger.warning("Пользователь с email %s не найден", email)
         raise credentials_exception
     if not user.is_verified:
-        logger.warning(f"Пользователь {email} не верифицирован")
+        logger.warning("Пользователь %s не верифицирован", email)
         raise HTTPException(status_code=401, detail="Email не подтверждён")
-    logger.debug(f"Пользователь успешно аутентифицирован: {email}")
+    if await is_token_revoked(db, payload, user):
+        logger.warning("Токен пользователя %s отозван", email)
+        raise credentials_exception
+    logger.debug("Пользователь успешно аутентифицирован: %s", email)
     return user
 
 
+async def get_current_superuser(current_user: User = Depends(get_current_user)):
+    """Текущий пользователь, если он администратор; иначе 403."""
+    if not current_user.is_superuser:
+        logger.error("Пользователь %s не является администратором", current_user.id)
+        raise HTTPException(status_code=403, detail="Доступно только администраторам")
+    return current_user
+
+
+async def is_superuser_token(token: str) -> bool:
+    """Принадлежит ли access-токен подтверждённому администратору (для служебных middleware)."""
+    try:
+        payload = jwt.decode(token, config.SECRET_KEY, algorithms=[config.ALGORITHM])
+    except JWTError:
+        return False
+    if payload.get("type") != "access" or not payload.get("sub"):
+        return False
+    async with async_session() as db:
+        user = await _load_current_user(None, db, payload["sub"])
+        if user is None or not user.is_verified or not user.is_superuser:
+            return False
+        return not await is_token_revoked(db, payload, user)
+
+
 @router.post("/register", response_model=Token, summary="Регистрация")
 async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
-    """Регистрирует пользователя и отправляет письмо для подтверждения.
+    """Регистрирует пользователя и ставит в очередь письмо для подтверждения.
 
     Args:
         user: Данные пользователя (username, email, password).
@@ -72,38 +129,31 @@ async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     Raises:
         HTTPException: Если email занят или ошибка сервера.
     """
-    logger.debug(f"Регистрация нового пользователя: {user.email}")
+    logger.debug("Регистрация нового пользователя: %s", user.email)
     try:
         if await get_user_by_email(db, user.email):
-            logger.warning(f"Попытка регистрации с занятым email: {user.email}")
+            logger.warning("Попытка регистрации с занятым email: %s", user.email)
             raise HTTPException(status_code=400, detail="Email уже зарегистрирован")
+        # Письмо с подтверждением записано в outbox в одной транзакции с пользователем
         db_user, verification_token = await create_user(db, user)
-        logger.info(f"Пользователь успешно создан: {db_user.email}")
-
-        verification_link = f"{config.BASE_URL}/auth/verify?token={verification_token}"
-        email_body = f"""
-        Здравствуйте, {db_user.username}!
-
-        Спасибо за регистрацию в QnA. Пожалуйста, подтвердите ваш email, перейдя по ссылке:
-        {verification_link}
-
-        Если вы не регистрировались, просто проигнорируйте это письмо.
-        """
-        logger.debug(f"Отправка письма для подтверждения email: {db_user.email}")
-        await send_email(db_user.email, "Подтверждение регистрации в QnA", email_body)
-        logger.info(f"Письмо с подтверждением отправлено: {db_user.email}")
+        logger.info("Пользователь успешно создан: %s", db_user.email)
 
         access_token = create_access_token(data={"sub": db_user.email})
         refresh_token = create_refresh_token(data={"sub": db_user.email})
-        logger.debug(f"Токены созданы для пользователя: {db_user.email}")
+        logger.debug("Токены созданы для пользователя: %s", db_user.email)
         return {
             "access_token": access_token,
             "refresh_token": refresh_token,
             "token_type": "bearer",
             "user_id": db_user.id
         }
+    except HTTPException:
+        raise
+    except PasswordHasherBusy as e:
+        logger.warning("Регистрация отклонена из-за перегрузки: %s", user.email)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
-        logger.error(f"Ошибка в register: {str(e)}")
+        logger.error("Ошибка в register: %s", e)
         logger.debug(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Внутренняя ошибка сервера: {str(e)}")
 
@@ -116,7 +166,7 @@ async def verify_email(token: str, db: AsyncSession = Depends(get_db)):
     if not user:
         logger.warning("Недействительный или истёкший токен подтверждения")
         raise HTTPException(status_code=400, detail="Недействительный или истёкший токен подтверждения")
-    logger.info(f"Email успешно подтверждён: {user.email}")
+    logger.info("Email успешно подтверждён: %s", user.email)
     return {"message": "Email успешно подтверждён"}
 
 
@@ -134,23 +184,29 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSessi
     Raises:
         HTTPException: Если email/пароль неверны.
     """
-    logger.debug(f"Попытка входа пользователя: {form_data.username}")
+    logger.debug("Попытка входа пользователя: %s", form_data.username)
     try:
         db_user = await get_user_by_email(db, form_data.username)  # username интерпретируется как email
-        if not db_user or not verify_password(form_data.password, db_user.hashed_password):
-            logger.warning(f"Неверный email или пароль: {form_data.username}")
+        if not db_user or not await verify_password(form_data.password, db_user.hashed_password):
+            logger.warning("Неверный email или пароль: %s", form_data.username)
             raise HTTPException(status_code=400, detail="Неверный email или пароль")
+        await rehash_password_if_needed(db, db_user, form_data.password)
         access_token = create_access_token(data={"sub": db_user.email})
         refresh_token = create_refresh_token(data={"sub": db_user.email})
-        logger.info(f"Успешный вход пользователя: {db_user.email}")
+        logger.info("Успешный вход пользователя: %s", db_user.email)
         return {
             "access_token": access_token,
             "refresh_token": refresh_token,
             "token_type": "bearer",
             "user_id": db_user.id
         }
+    except HTTPException:
+        raise
+    except PasswordHasherBusy as e:
+        logger.warning("Вход отклонён из-за перегрузки: %s", form_data.username)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
-        logger.error(f"Ошибка в login: {str(e)}")
+        logger.error("Ошибка в login: %s", e)
         logger.debug(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Внутренняя ошибка сервера: {str(e)}")
 
@@ -161,7 +217,7 @@ async def refresh_token(
         token_from_header: Optional[str] = Depends(oauth2_scheme),  # Токен из заголовка (опционально)
         db: AsyncSession = Depends(get_db)
 ):
-    """Обновляет токены по refresh-токену.
+    """Обновляет токены по refresh-токену. Использованный refresh-токен отзывается.
 
     Поддерживает передачу refresh_token в заголовке Authorization: Bearer <refresh_token> (рекомендуется для продакшена)
     или в теле запроса JSON {"refresh_token": "<refresh_token>"} (для удобства тестирования в Swagger).
@@ -195,19 +251,26 @@ async def refresh_token(
         if email is None or token_type != "refresh":
             logger.warning("Недействительный refresh-токен или неверный тип токена")
             raise credentials_exception
-        logger.debug(f"Извлечён email из refresh-токена: {email}")
+        logger.debug("Извлечён email из refresh-токена: %s", email)
     except JWTError as e:
-        logger.error(f"Ошибка декодирования refresh-токена: {str(e)}")
+        logger.error("Ошибка декодирования refresh-токена: %s", e)
         raise credentials_exception
 
     user = await get_user_by_email(db, email)
     if user is None:
-        logger.warning(f"Пользователь с email {email} не найден")
+        logger.warning("Пользователь с email %s не найден", email)
+        raise credentials_exception
+    if await is_token_revoked(db, payload, user):
+        logger.warning("Refresh-токен пользователя %s отозван", email)
+        raise credentials_exception
+    # Ротация: использованный refresh-токен отзывается; из параллельных обновлений одним токеном проходит одно
+    if payload.get("jti") and not await revoke_token(db, payload, user.id):
+        logger.warning("Refresh-токен пользователя %s уже использован", email)
         raise credentials_exception
 
     new_access_token = create_access_token(data={"sub": user.email})
     new_refresh_token = create_refresh_token(data={"sub": user.email})
-    logger.info(f"Токены успешно обновлены для пользователя: {user.email}")
+    logger.info("Токены успешно обновлены для пользователя: %s", user.email)
     return {
         "access_token": new_access_token,
         "refresh_token": new_refresh_token,
@@ -219,14 +282,21 @@ async def refresh_token(
 @router.delete("/delete", status_code=status.HTTP_204_NO_CONTENT, summary="Удаление пользователя")
 async def delete_user(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """Удаляет учетную запись пользователя."""
-    logger.debug(f"Удаление пользователя: {current_user.email}")
+    logger.debug("Удаление пользователя: %s", current_user.email)
     try:
+        # Ответы пользователя удаляются каскадно: статистику затронутых вопросов нужно пересчитать
+        answered_question_ids = await get_answered_question_ids(db, current_user.id)
         await db.delete(current_user)
+        await db.flush()
+        await refresh_answer_stats(db, answered_question_ids)
         await db.commit()
-        logger.info(f"Пользователь успешно удалён: {current_user.email}")
+        await invalidate_user(current_user.email)
+        for question_id in answered_question_ids:
+            await invalidate_question(question_id)
+        logger.info("Пользователь успешно удалён: %s", current_user.email)
         return None
     except Exception as e:
-        logger.error(f"Ошибка в delete_user: {str(e)}")
+        logger.error("Ошибка в delete_user: %s", e)
         logger.debug(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Внутренняя ошибка сервера: {str(e)}")
 
@@ -238,10 +308,10 @@ async def update_profile(
         db: AsyncSession = Depends(get_db)
 ):
     """Обновляет профиль пользователя."""
-    logger.debug(f"Обновление профиля пользователя: {current_user.email}")
+    logger.debug("Обновление профиля пользователя: %s", current_user.email)
     try:
         updated_user = await update_user(db, current_user, user_update)
-        logger.info(f"Профиль успешно обновлён: {updated_user.email}")
+        logger.info("Профиль успешно обновлён: %s", updated_user.email)
         return {
             "message": "Профиль успешно обновлен",
             "username": updated_user.username,
@@ -249,10 +319,10 @@ async def update_profile(
             "gender": updated_user.gender
         }
     except ValueError as e:
-        logger.warning(f"Ошибка валидации при обновлении профиля: {str(e)}")
+        logger.warning("Ошибка валидации при обновлении профиля: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"Ошибка в update_profile: {str(e)}")
+        logger.error("Ошибка в update_profile: %s", e)
         logger.debug(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Внутренняя ошибка сервера: {str(e)}")
 
@@ -263,16 +333,59 @@ async def change_user_password(
         current_user: User = Depends(get_current_user),
         db: AsyncSession = Depends(get_db)
 ):
-    """Изменяет пароль пользователя."""
-    logger.debug(f"Смена пароля для пользователя: {current_user.email}")
+    """Изменяет пароль пользователя и отзывает все его токены; в ответе — новая пара токенов."""
+    logger.debug("Смена пароля для пользователя: %s", current_user.email)
     try:
         await change_password(db, current_user, password_change)
-        logger.info(f"Пароль успешно изменён: {current_user.email}")
-        return {"message": "Пароль успешно изменен"}
+        logger.info("Пароль успешно изменён: %s", current_user.email)
+        # Прежние токены отозваны сменой пароля: текущий клиент продолжает работу с новыми
+        return {
+            "message": "Пароль успешно изменен",
+            "access_token": create_access_token(data={"sub": current_user.email}),
+            "refresh_token": create_refresh_token(data={"sub": current_user.email}),
+            "token_type": "bearer",
+        }
     except ValueError as e:
-        logger.warning(f"Ошибка валидации при смене пароля: {str(e)}")
+        logger.warning("Ошибка валидации при смене пароля: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
+    except PasswordHasherBusy as e:
+        logger.warning("Смена пароля отклонена из-за перегрузки: %s", current_user.email)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
-        logger.error(f"Ошибка в change_password: {str(e)}")
+        logger.error("Ошибка в change_password: %s", e)
         logger.debug(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Внутренняя ошибка сервера: {str(e)}")
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT, summary="Выход")
+async def logout(
+        refresh_body: RefreshToken = Body(None),
+        token: Optional[str] = Depends(oauth2_scheme),
+        current_user: User = Depends(get_current_user),
+        db: AsyncSession = Depends(get_db)
+):
+    """Отзывает access-токен запроса и refresh-токен из тела запроса, если он передан."""
+    logger.debug("Выход пользователя: %s", current_user.email)
+    payloads = [jwt.decode(token, config.SECRET_KEY, algorithms=[config.ALGORITHM])]
+    if refresh_body:
+        try:
+            refresh_payload = jwt.decode(refresh_body.refresh_token, config.SECRET_KEY, algorithms=[config.ALGORITHM])
+        except JWTError as e:
+            logger.warning("Ошибка декодирования refresh-токена при выходе: %s", e)
+            raise HTTPException(status_code=400, detail="Недействительный refresh token")
+        if refresh_payload.get("type") != "refresh" or refresh_payload.get("sub") != current_user.email:
+            logger.warning("Refresh-токен при выходе не принадлежит пользователю %s", current_user.email)
+            raise HTTPException(status_code=400, detail="Недействительный refresh token")
+        payloads.append(refresh_payload)
+    for payload in payloads:
+        if payload.get("jti"):
+            await revoke_token(db, payload, current_user.id)
+    logger.info("Выход пользователя: %s", current_user.email)
+    return None
+
+
+@router.post("/logout-all", status_code=status.HTTP_204_NO_CONTENT, summary="Выход на всех устройствах")
+async def logout_all(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """Отзывает все выпущенные пользователю токены, включая токен запроса."""
+    await revoke_user_tokens(db, current_user)
+    return None
@@ -1,32 +1,45 @@
 import logging
+import uuid
 from jose import jwt
 from datetime import datetime, timedelta, UTC
-import bcrypt
+from apps.auth.hashing import password_hasher
 from core.config import config
 
 logger = logging.getLogger(__name__)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Проверяет пароль."""
+REFRESH_TOKEN_EXPIRE = timedelta(days=30)
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Проверяет пароль (в пуле потоков, не блокируя event loop)."""
     logger.debug("Проверка пароля для входа")
-    return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
+    return await password_hasher.verify(plain_password, hashed_password)
+
+async def hash_password(plain_password: str) -> str:
+    """Хеширует пароль (в пуле потоков, не блокируя event loop)."""
+    logger.debug("Хеширование пароля")
+    return await password_hasher.hash(plain_password)
+
+def new_token_id() -> str:
+    """Идентификатор токена (jti) для отзыва отдельного токена."""
+    return uuid.uuid4().hex
 
 def create_access_token(data: dict, expires_delta: timedelta = timedelta(minutes=config.ACCESS_TOKEN_EXPIRE_MINUTES)):
     """Создает access-токен."""
     logger.debug("Создание access-токена")
     to_encode = data.copy()
-    expire = datetime.now(UTC) + expires_delta
-    to_encode.update({"exp": expire, "type": "access"})
+    now = datetime.now(UTC)
+    # iat с дробной частью: токен, выпущенный сразу после смены пароля в ту же секунду, остаётся действительным
+    to_encode.update({"exp": now + expires_delta, "iat": now.timestamp(), "jti": new_token_id(), "type": "access"})
     token = jwt.encode(to_encode, config.SECRET_KEY, config.ALGORITHM)
     logger.debug("Access-токен успешно создан")
     return token
 
-def create_refresh_token(data: dict, expires_delta: timedelta = timedelta(days=30)):
+def create_refresh_token(data: dict, expires_delta: timedelta = REFRESH_TOKEN_EXPIRE):
     """Создает refresh-токен."""
     logger.debug("Создание refresh-токена")
     to_encode = data.copy()
-    expire = datetime.now(UTC) + expires_delta
-    to_encode.update({"exp": expire, "type": "refresh"})
+    now = datetime.now(UTC)
+    to_encode.update({"exp": now + expires_delta, "iat": now.timestamp(), "jti": new_token_id(), "type": "refresh"})
     token = jwt.encode(to_encode, config.SECRET_KEY, config.ALGORITHM)
     logger.debug("Refresh-токен успешно создан")
     return token
\ No newline at end of file
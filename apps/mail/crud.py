@@ -0,0 +1,46 @@
+import logging
+from datetime import timedelta
+from typing import List
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from apps.mail.models import EmailOutbox
+from core.config import config
+
+logger = logging.getLogger(__name__)
+
+def enqueue_email(db: AsyncSession, to_email: str, subject: str, body: str) -> EmailOutbox:
+    """Добавляет письмо в outbox в текущей транзакции. Фиксация — вместе с вызывающим кодом."""
+    logger.debug("Письмо на %s поставлено в очередь: %s", to_email, subject)
+    message = EmailOutbox(to_email=to_email, subject=subject, body=body)
+    db.add(message)
+    return message
+
+async def claim_pending_emails(db: AsyncSession, limit: int) -> List[EmailOutbox]:
+    """Блокирует до limit готовых к отправке писем. Письма, занятые другим воркером, пропускаются."""
+    result = await db.execute(
+        select(EmailOutbox)
+        .where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= func.now())
+        .order_by(EmailOutbox.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return result.scalars().all()
+
+def mark_sent(message: EmailOutbox):
+    message.status = "sent"
+    message.attempts += 1
+    message.last_error = None
+    message.sent_at = func.now()
+
+def mark_failed(message: EmailOutbox, error: str):
+    """Планирует повторную попытку с экспоненциальной задержкой или помечает письмо как failed."""
+    message.attempts += 1
+    message.last_error = error[:1000]
+    if message.attempts >= config.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        message.status = "failed"
+        logger.error("Письмо %s на %s не отправлено после %s попыток: %s", message.id, message.to_email, message.attempts, error)
+        return
+    delay = min(config.EMAIL_OUTBOX_BACKOFF_SECONDS * 2 ** (message.attempts - 1), config.EMAIL_OUTBOX_MAX_BACKOFF_SECONDS)
+    message.next_attempt_at = func.now() + timedelta(seconds=delay)
+    logger.warning("Ошибка отправки письма %s (попытка %s), повтор через %s с: %s", message.id, message.attempts, delay, error)
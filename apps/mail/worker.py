@@ -0,0 +1,89 @@
+"""Фоновая доставка писем из email_outbox.
+
+Запускается в lifespan приложения (EMAIL_OUTBOX_WORKER_IN_APP=Yes) или отдельным процессом:
+    python -m apps.mail.worker
+"""
+import asyncio
+import logging
+from typing import Optional
+from apps.mail.crud import claim_pending_emails, mark_sent, mark_failed
+from core.config import config
+from core.database import async_session
+from core.email import send_batch
+from core.logs import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxWorker:
+    """Периодически выбирает пачку писем и отправляет её через одно SMTP-соединение.
+
+    Несколько воркеров (по одному на процесс uvicorn) не мешают друг другу:
+    строки блокируются через SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+
+    def __init__(self, batch_size: int, poll_interval: float):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def process_batch(self) -> int:
+        """Отправляет одну пачку писем. Возвращает количество обработанных писем."""
+        async with async_session() as db:
+            async with db.begin():
+                messages = await claim_pending_emails(db, self.batch_size)
+                if not messages:
+                    return 0
+                try:
+                    errors = await send_batch([(m.to_email, m.subject, m.body) for m in messages])
+                except Exception as e:
+                    logger.error("Ошибка SMTP-соединения, пачка из %s писем отложена: %s", len(messages), e)
+                    errors = [str(e)] * len(messages)
+                # Письма после разрыва соединения (errors короче пачки) не отправлялись: блокировка снимается
+                # с фиксацией транзакции, и они уходят со следующей пачкой без учёта попытки
+                for message, error in zip(messages, errors):
+                    if error is None:
+                        mark_sent(message)
+                    else:
+                        mark_failed(message, error)
+        return len(messages)
+
+    async def run_forever(self):
+        logger.info("Воркер отправки писем запущен")
+        while True:
+            try:
+                # Полная пачка — очередь не пуста, забираем следующую без паузы
+                while await self.process_batch() == self.batch_size:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Ошибка воркера отправки писем: %s", e, exc_info=True)
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self.run_forever(), name="email-outbox-worker")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("Воркер отправки писем остановлен")
+
+
+outbox_worker = OutboxWorker(
+    batch_size=config.EMAIL_OUTBOX_BATCH_SIZE,
+    poll_interval=config.EMAIL_OUTBOX_POLL_INTERVAL,
+)
+
+
+if __name__ == "__main__":
+    setup_logging()
+    if not config.SMTP_ENABLED:
+        raise SystemExit("SMTP отключен (SMTP_ENABLED=No), отправлять письма некуда")
+    asyncio.run(outbox_worker.run_forever())
@@ -0,0 +1,74 @@
+import hashlib
+import logging
+import uuid
+from typing import Optional, Tuple
+from core.cache import create_cache, cache_requests_total
+from core.config import config
+
+logger = logging.getLogger(__name__)
+
+# Кэш готовых JSON-ответов GET /questions/{id}.
+# Ключ тела включает версию вопроса: инвалидация меняет версию, поэтому ответ,
+# собранный из данных до изменения, записывается под старой версией и больше не читается.
+# Версия всегда новая и случайная: ключ версии живёт в том же кэше и может быть вытеснен или истечь раньше
+# тел, и постоянное значение по умолчанию снова открыло бы тела, записанные до инвалидации.
+question_cache = create_cache("question", config.QUESTION_CACHE_MAX_ENTRIES)
+
+
+def _version_key(question_id: int) -> str:
+    return f"{question_id}:version"
+
+
+def _body_key(question_id: int, version: str) -> str:
+    return f"{question_id}:body:{version}"
+
+
+def make_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def _new_version() -> bytes:
+    return uuid.uuid4().hex.encode("ascii")
+
+
+async def get_question_version(question_id: int) -> str:
+    """Текущая версия вопроса; если её нет в кэше — записывает новую."""
+    key = _version_key(question_id)
+    raw = await question_cache.get(key)
+    if raw is None:
+        version = _new_version()
+        # Параллельный запрос или инвалидация могли записать версию первыми — тогда используется их версия
+        if await question_cache.add(key, version, config.QUESTION_CACHE_TTL_SECONDS):
+            return version.decode("ascii")
+        raw = await question_cache.get(key)
+        if raw is None:
+            return version.decode("ascii")
+    return raw.decode("ascii")
+
+
+async def get_cached_question(question_id: int, version: str) -> Optional[Tuple[str, bytes]]:
+    """Возвращает (etag, тело ответа) или None."""
+    raw = await question_cache.get(_body_key(question_id, version))
+    if raw is None:
+        cache_requests_total.labels("question", "miss").inc()
+        return None
+    cache_requests_total.labels("question", "hit").inc()
+    etag, body = raw.split(b"\n", 1)
+    return etag.decode("ascii"), body
+
+
+async def cache_question(question_id: int, version: str, body: bytes) -> str:
+    """Сохраняет сериализованный ответ и возвращает его ETag."""
+    etag = make_etag(body)
+    await question_cache.set(
+        _body_key(question_id, version), etag.encode("ascii") + b"\n" + body, config.QUESTION_CACHE_TTL_SECONDS
+    )
+    return etag
+
+
+async def invalidate_question(question_id: int):
+    """Сбрасывает кэш вопроса. Вызывается после фиксации изменений вопроса или его ответов."""
+    logger.debug("Инвалидация кэша вопроса %s", question_id)
+    version = await get_question_version(question_id)
+    await question_cache.delete(_body_key(question_id, version))
+    await question_cache.set(_version_key(question_id), _new_version(), config.QUESTION_CACHE_TTL_SECONDS)
@@ -1,39 +1,352 @@
+import math
+from datetime import datetime
+from sqlalchemy import Row, tuple_, update, delete, insert, func, distinct, union_all, cast, literal_column, Float, Integer, literal, any_
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
-from typing import List, Optional
-from apps.qna.models import Question, Answer
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from apps.qna.models import Question, Answer, QuestionTrend, SEARCH_TS_CONFIG, TRENDING_HALF_LIFE_HOURS
+from apps.qna.utils import encode_cursor, encode_rank_cursor
+from apps.qna.cache import invalidate_question
+from apps.qna.dedup import duplicate_index, find_duplicates, NearDuplicateQuestions
+from apps.qna.related import related_index
+from apps.qna.events import publish_answer_created, publish_answer_deleted, publish_question_deleted
+from apps.qna.utils import lsh_bands
+from core.config import config
 
-async def get_all_questions(db: AsyncSession) -> List[Question]:
-    result = await db.execute(select(Question))
-    return result.scalars().all()
+# Колонки, которые отдают списочные эндпоинты (поля QuestionResponse/AnswerResponse).
+# Страницы читаются строками Row без создания ORM-объектов и сериализуются напрямую в JSON.
+QUESTION_ROW_COLUMNS = (
+    Question.id, Question.text, Question.author_id, Question.created_at,
+    Question.answer_count, Question.last_answer_at,
+)
+ANSWER_ROW_COLUMNS = (Answer.id, Answer.question_id, Answer.user_id, Answer.text, Answer.created_at)
+
+async def get_questions_page(
+    db: AsyncSession,
+    limit: int,
+    cursor: Optional[Tuple[datetime, int]] = None,
+    author_id: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+) -> Tuple[List[Row], Optional[str]]:
+    """Возвращает страницу вопросов (строки QUESTION_ROW_COLUMNS, от новых к старым) и курсор следующей страницы.
+
+    Пагинация keyset по (created_at, id): стоимость глубоких страниц не растёт,
+    так как запрос идёт по индексу ix_question_created_at_id (или ix_question_author_id_created_at_id).
+    """
+    query = select(*QUESTION_ROW_COLUMNS)
+    if author_id is not None:
+        query = query.where(Question.author_id == author_id)
+    if created_from is not None:
+        query = query.where(Question.created_at >= created_from)
+    if created_to is not None:
+        query = query.where(Question.created_at < created_to)
+    if cursor is not None:
+        query = query.where(tuple_(Question.created_at, Question.id) < tuple_(*cursor))
+    query = query.order_by(Question.created_at.desc(), Question.id.desc()).limit(limit + 1)
+    result = await db.execute(query)
+    questions = result.all()
+    next_cursor = None
+    if len(questions) > limit:
+        questions = questions[:limit]
+        next_cursor = encode_cursor(questions[-1].created_at, questions[-1].id)
+    return questions, next_cursor
+
+_TS_CONFIG = literal_column(f"'{SEARCH_TS_CONFIG}'::regconfig")
+_HEADLINE_OPTIONS = "StartSel=<b>, StopSel=</b>, MaxWords=35, MinWords=15, MaxFragments=2"
+
+def to_tsquery(text: str):
+    """Поисковый запрос в синтаксисе веб-поиска: слова, "фразы", OR, -исключение."""
+    return func.websearch_to_tsquery(_TS_CONFIG, text)
+
+def search_matches(search_vector, tsquery):
+    """Условие совпадения, использующее GIN-индекс по search_vector."""
+    return search_vector.bool_op("@@")(tsquery)
+
+async def search_questions(
+    db: AsyncSession,
+    text: str,
+    limit: int,
+    cursor: Optional[Tuple[float, int]] = None,
+) -> Tuple[List[Tuple[Question, float, str, Optional[str]]], Optional[str]]:
+    """Полнотекстовый поиск по тексту вопросов и ответов.
+
+    Возвращает страницу (вопрос, ранг, фрагмент вопроса, фрагмент лучшего ответа или None),
+    отсортированную по убыванию ранга, и курсор следующей страницы. Ранг вопроса — максимальный
+    ранг среди совпадений в нём самом и в его ответах. Фрагменты с подсветкой строятся только
+    для строк страницы.
+    """
+    tsquery = to_tsquery(text)
+    hits = union_all(
+        select(Question.id.label("question_id"), func.ts_rank(Question.search_vector, tsquery).label("rank"))
+        .where(search_matches(Question.search_vector, tsquery)),
+        select(Answer.question_id.label("question_id"), func.ts_rank(Answer.search_vector, tsquery).label("rank"))
+        .where(search_matches(Answer.search_vector, tsquery)),
+    ).subquery()
+    # ts_rank возвращает real; в double precision значение точно совпадает с тем, что попадёт в курсор
+    ranked = (
+        select(hits.c.question_id, cast(func.max(hits.c.rank), Float).label("rank"))
+        .group_by(hits.c.question_id)
+        .subquery()
+    )
+    page = select(ranked)
+    if cursor is not None:
+        page = page.where(tuple_(ranked.c.rank, ranked.c.question_id) < tuple_(*cursor))
+    page = page.order_by(ranked.c.rank.desc(), ranked.c.question_id.desc()).limit(limit + 1).subquery()
+
+    best_answer_snippet = (
+        select(func.ts_headline(_TS_CONFIG, Answer.text, tsquery, _HEADLINE_OPTIONS))
+        .where(Answer.question_id == Question.id, search_matches(Answer.search_vector, tsquery))
+        .order_by(func.ts_rank(Answer.search_vector, tsquery).desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    query = (
+        select(
+            Question,
+            page.c.rank,
+            func.ts_headline(_TS_CONFIG, Question.text, tsquery, _HEADLINE_OPTIONS),
+            best_answer_snippet,
+        )
+        .join(page, Question.id == page.c.question_id)
+        .order_by(page.c.rank.desc(), page.c.question_id.desc())
+    )
+    result = await db.execute(query)
+    rows = [tuple(row) for row in result.all()]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_question, last_rank = rows[-1][0], rows[-1][1]
+        next_cursor = encode_rank_cursor(last_rank, last_question.id)
+    return rows, next_cursor
 
 async def get_question_by_id(db: AsyncSession, question_id: int) -> Optional[Question]:
+    """Вопрос без ответов; ответы читаются постранично через get_answers_page/get_first_answer_pages."""
+    result = await db.execute(select(Question).where(Question.id == question_id))
+    return result.scalar_one_or_none()
+
+def _id_in(column, ids: List[int]):
+    # Один параметр-массив вместо IN (...): текст запроса и подготовленное выражение не зависят от числа id
+    return column == any_(literal(ids, ARRAY(Integer)))
+
+async def get_questions_by_ids(db: AsyncSession, ids: List[int]) -> List[Question]:
+    """Вопросы по списку id одним запросом. Порядок не гарантирован."""
+    result = await db.execute(select(Question).where(_id_in(Question.id, ids)))
+    return result.scalars().all()
+
+ANSWER_ORDERS = ("oldest", "newest")
+
+async def get_answers_page(
+    db: AsyncSession,
+    question_id: int,
+    limit: int,
+    cursor: Optional[Tuple[datetime, int]] = None,
+    order: str = "oldest",
+) -> Tuple[List[Row], Optional[str]]:
+    """Возвращает страницу ответов вопроса (строки ANSWER_ROW_COLUMNS) и курсор следующей страницы.
+
+    Пагинация keyset по (created_at, id) по индексу ix_answer_question_id_created_at_id,
+    order — "oldest" (сначала старые) или "newest".
+    """
+    query = select(*ANSWER_ROW_COLUMNS).where(Answer.question_id == question_id)
+    position = tuple_(Answer.created_at, Answer.id)
+    if order == "newest":
+        if cursor is not None:
+            query = query.where(position < tuple_(*cursor))
+        query = query.order_by(Answer.created_at.desc(), Answer.id.desc())
+    else:
+        if cursor is not None:
+            query = query.where(position > tuple_(*cursor))
+        query = query.order_by(Answer.created_at, Answer.id)
+    result = await db.execute(query.limit(limit + 1))
+    answers = result.all()
+    next_cursor = None
+    if len(answers) > limit:
+        answers = answers[:limit]
+        next_cursor = encode_cursor(answers[-1].created_at, answers[-1].id)
+    return answers, next_cursor
+
+async def get_first_answer_pages(
+    db: AsyncSession,
+    question_ids: List[int],
+    limit: int,
+) -> Dict[int, Tuple[List[Row], Optional[str]]]:
+    """Первые страницы ответов (order="oldest") сразу для нескольких вопросов одним запросом.
+
+    Курсоры совместимы с get_answers_page(order="oldest").
+    """
+    row_number = (
+        func.row_number()
+        .over(partition_by=Answer.question_id, order_by=(Answer.created_at, Answer.id))
+        .label("row_number")
+    )
+    ranked = select(Answer.id, row_number).where(_id_in(Answer.question_id, question_ids)).subquery()
     result = await db.execute(
-        select(Question)
-        .options(selectinload(Question.answers))
-        .where(Question.id == question_id)
+        select(*ANSWER_ROW_COLUMNS)
+        .join(ranked, Answer.id == ranked.c.id)
+        .where(ranked.c.row_number <= limit + 1)
+        .order_by(Answer.question_id, Answer.created_at, Answer.id)
     )
-    return result.scalar_one_or_none()
+    pages = {question_id: ([], None) for question_id in question_ids}
+    for answer in result:
+        pages[answer.question_id][0].append(answer)
+    for question_id, (answers, _) in pages.items():
+        if len(answers) > limit:
+            del answers[limit:]
+            pages[question_id] = (answers, encode_cursor(answers[-1].created_at, answers[-1].id))
+    return pages
 
-async def create_question(db: AsyncSession, text: str, author_id: str) -> Question:  # Изменено на str
+async def create_question(
+        db: AsyncSession, text: str, author_id: str, allow_duplicates: bool = False,
+        before_commit: Optional[Callable[[Question], Awaitable[None]]] = None,
+) -> Question:
+    """Создаёт вопрос. Если есть похожие вопросы и allow_duplicates не задан — NearDuplicateQuestions.
+
+    Точный повтор текста отклоняет уникальный индекс по text_hash (IntegrityError). before_commit
+    получает записанный вопрос и выполняется в той же транзакции (например, сохранение ответа
+    для Idempotency-Key).
+    """
+    if config.DEDUP_ENABLED and not allow_duplicates:
+        duplicates = await find_duplicates(db, text)
+        if duplicates:
+            raise NearDuplicateQuestions(duplicates)
     question = Question(text=text, author_id=author_id)
+    bands = question.lsh_bands  # вычислены при присваивании text
     db.add(question)
+    if before_commit is not None:
+        await db.flush()
+        await db.refresh(question)
+        await before_commit(question)
     await db.commit()
     await db.refresh(question)
+    if config.DEDUP_ENABLED:
+        duplicate_index.add(question.id, bands)
+    if config.RELATED_ENABLED:
+        related_index.add(question.id, question.text)
     return question
 
 async def delete_question(db: AsyncSession, question: Question):
     await db.delete(question)
     await db.commit()
+    await invalidate_question(question.id)
+    await publish_question_deleted(question.id)
+    if config.DEDUP_ENABLED:
+        duplicate_index.remove(question.id, lsh_bands(question.text))
+    if config.RELATED_ENABLED:
+        related_index.remove(question.id)
+
+# Лента популярных вопросов: показатель ответа — ln его веса 2^(t / T½), см. QuestionTrend
+_TREND_RATE = math.log(2) / (TRENDING_HALF_LIFE_HOURS * 3600)
+# Ограничение разности показателей перед exp: exp(-746) в double уже 0, и PostgreSQL сообщает об underflow
+_MAX_EXPONENT_GAP = 700
+
+def _trend_exponent(created_at):
+    return cast(func.extract("epoch", created_at), Float) * _TREND_RATE
+
+def _log_add(a, b):
+    """ln(e^a + e^b) без переполнения."""
+    return func.greatest(a, b) + func.ln(1 + func.exp(-func.least(func.abs(a - b), _MAX_EXPONENT_GAP)))
+
+async def _add_trend_answer(db: AsyncSession, question_id: int):
+    """Учитывает в question_trend ответ, созданный в текущей транзакции."""
+    # LOCALTIMESTAMP постоянен в пределах транзакции и совпадает с created_at нового ответа
+    statement = pg_insert(QuestionTrend).values(question_id=question_id, score=_trend_exponent(func.localtimestamp()))
+    statement = statement.on_conflict_do_update(
+        index_elements=[QuestionTrend.question_id],
+        set_={"score": _log_add(QuestionTrend.score, statement.excluded.score)},
+    )
+    await db.execute(statement)
+
+async def _refresh_trend_scores(db: AsyncSession, question_ids: List[int]):
+    """Пересчитывает question_trend вопросов по их ответам; вопросы без ответов убираются из ленты."""
+    exponent = _trend_exponent(Answer.created_at)
+    answers = (
+        select(
+            Answer.question_id,
+            exponent.label("exponent"),
+            func.max(exponent).over(partition_by=Answer.question_id).label("newest"),
+        )
+        .where(Answer.question_id.in_(question_ids))
+        .subquery()
+    )
+    # ln Σ e^x = max + ln Σ e^(x - max): слагаемые не переполняются
+    score = func.max(answers.c.newest) + func.ln(func.sum(
+        func.exp(func.greatest(answers.c.exponent - answers.c.newest, -_MAX_EXPONENT_GAP))
+    ))
+    await db.execute(delete(QuestionTrend).where(QuestionTrend.question_id.in_(question_ids)))
+    await db.execute(
+        insert(QuestionTrend).from_select(
+            ["question_id", "score"], select(answers.c.question_id, score).group_by(answers.c.question_id)
+        )
+    )
+
+async def get_trending_page(
+    db: AsyncSession,
+    limit: int,
+    cursor: Optional[Tuple[float, int]] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """Страница ленты популярных вопросов по убыванию question_trend.score.
+
+    Кроме полей QuestionResponse у вопроса есть hot — число ответов с учётом затухания на текущий
+    момент. Вопросы, у которых hot меньше веса одного ответа возрастом TRENDING_WINDOW_HOURS,
+    в ленту не попадают.
+    """
+    now = _trend_exponent(func.localtimestamp())
+    query = (
+        select(*QUESTION_ROW_COLUMNS, func.exp(QuestionTrend.score - now).label("hot"), QuestionTrend.score)
+        .join(QuestionTrend, QuestionTrend.question_id == Question.id)
+        .where(QuestionTrend.score > now - config.TRENDING_WINDOW_HOURS * 3600 * _TREND_RATE)
+    )
+    if cursor is not None:
+        query = query.where(tuple_(QuestionTrend.score, QuestionTrend.question_id) < tuple_(*cursor))
+    query = query.order_by(QuestionTrend.score.desc(), QuestionTrend.question_id.desc()).limit(limit + 1)
+    rows = (await db.execute(query)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_rank_cursor(rows[-1].score, rows[-1].id)
+    items = [row._asdict() for row in rows]
+    for item in items:
+        del item["score"]
+    return items, next_cursor
 
-async def create_answer(db: AsyncSession, question_id: int, user_id: str, text: str) -> Answer:
+def _last_answer_at(question_id):
+    return select(func.max(Answer.created_at)).where(Answer.question_id == question_id).scalar_subquery()
+
+async def create_answer(
+        db: AsyncSession, question_id: int, user_id: str, text: str,
+        before_commit: Optional[Callable[[Answer], Awaitable[None]]] = None,
+) -> Answer:
+    """Создаёт ответ и в той же транзакции обновляет answer_count, last_answer_at и популярность вопроса.
+
+    before_commit, как в create_question, выполняется в транзакции ответа.
+    """
     answer = Answer(question_id=question_id, user_id=user_id, text=text)
     db.add(answer)
+    await db.flush()
+    # now() постоянен в пределах транзакции и совпадает с created_at нового ответа
+    await db.execute(
+        update(Question)
+        .where(Question.id == question_id)
+        .values(answer_count=Question.answer_count + 1, last_answer_at=func.now())
+        .execution_options(synchronize_session=False)
+    )
+    await _add_trend_answer(db, question_id)
+    if before_commit is not None:
+        await db.refresh(answer)
+        await before_commit(answer)
     await db.commit()
+    await invalidate_question(question_id)
     await db.refresh(answer)
+    await publish_answer_created(answer)
     return answer
 
+async def get_answers_by_ids(db: AsyncSession, ids: List[int]) -> List[Answer]:
+    """Ответы по списку id одним запросом. Порядок не гарантирован."""
+    result = await db.execute(select(Answer).where(_id_in(Answer.id, ids)))
+    return result.scalars().all()
+
 async def get_answer_by_id(db: AsyncSession, answer_id: int) -> Optional[Answer]:
     result = await db.execute(
         select(Answer)
@@ -42,5 +355,39 @@ async def get_answer_by_id(db: AsyncSession, answer_id: int) -> Optional[Answer]
     return result.scalar_one_or_none()
 
 async def delete_answer(db: AsyncSession, answer: Answer):
+    """Удаляет ответ и в той же транзакции обновляет answer_count, last_answer_at и популярность вопроса."""
     await db.delete(answer)
+    await db.flush()
+    await db.execute(
+        update(Question)
+        .where(Question.id == answer.question_id)
+        .values(answer_count=Question.answer_count - 1, last_answer_at=_last_answer_at(answer.question_id))
+        .execution_options(synchronize_session=False)
+    )
+    await _refresh_trend_scores(db, [answer.question_id])
     await db.commit()
+    await invalidate_question(answer.question_id)
+    await publish_answer_deleted(answer)
+
+async def get_answered_question_ids(db: AsyncSession, user_id: str) -> List[int]:
+    """ID вопросов, на которые отвечал пользователь."""
+    result = await db.execute(select(distinct(Answer.question_id)).where(Answer.user_id == user_id))
+    return result.scalars().all()
+
+async def refresh_answer_stats(db: AsyncSession, question_ids: List[int]):
+    """Пересчитывает answer_count, last_answer_at и популярность вопросов (без commit).
+
+    Нужен, когда ответы удаляются каскадно, например вместе с пользователем.
+    """
+    if not question_ids:
+        return
+    await db.execute(
+        update(Question)
+        .where(Question.id.in_(question_ids))
+        .values(
+            answer_count=select(func.count(Answer.id)).where(Answer.question_id == Question.id).scalar_subquery(),
+            last_answer_at=_last_answer_at(Question.id),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await _refresh_trend_scores(db, question_ids)
@@ -0,0 +1,210 @@
+"""Поиск похожих вопросов: MinHash LSH-индекс в памяти процесса.
+
+Для каждой из LSH_BANDS полос хранится отсортированный array('Q') значений (ключ полосы << 32 | id
+вопроса) — 8 байт на вопрос и полосу, без объекта Python на запись. Кандидаты — вопросы, у которых
+совпала хотя бы одна полоса; они упорядочиваются по числу совпавших полос, проверяются по
+коэффициенту Жаккара шинглов текста и отдаются, если сходство не ниже DEDUP_MIN_SIMILARITY.
+
+Ключи полос хранятся в question.lsh_bands, поэтому индекс строится без пересчёта сигнатур:
+при старте загружаются все вопросы, затем периодически — новые (id больше уже загруженных).
+Вопросы, созданные и удалённые этим процессом, попадают в индекс сразу.
+"""
+import asyncio
+import heapq
+import logging
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from itertools import groupby
+from typing import List, Optional, Sequence, Tuple
+from sqlalchemy import case, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from core.config import config
+from core.database import async_session
+from .models import Question
+from .utils import LSH_BANDS, lsh_bands, shingles, jaccard
+
+logger = logging.getLogger(__name__)
+
+_ID_MASK = 0xFFFFFFFF
+# Ограничение числа id из одной полосы: очень короткие тексты дают одинаковые ключи у многих вопросов
+MAX_BUCKET_SCAN = 1000
+# Вставки больше этого размера добавляются слиянием массивов в пуле потоков, меньше — вставкой по одному
+BULK_THRESHOLD = 1000
+# Сколько последних id перечитывается при обновлении: транзакции с меньшим id могут зафиксироваться позже.
+# Уже проиндексированные вопросы из них не добавляются повторно
+REFRESH_LOOKBACK = 1000
+# Размер куска сортировки при слиянии: сколько event loop ждёт, пока поток удерживает GIL
+SORT_CHUNK = 20000
+LOAD_BATCH_SIZE = 10000
+
+
+class NearDuplicateQuestions(Exception):
+    """Найдены похожие вопросы; candidates — пары (вопрос, сходство)."""
+
+    def __init__(self, candidates: List[Tuple[Question, float]]):
+        super().__init__(f"Найдено похожих вопросов: {len(candidates)}")
+        self.candidates = candidates
+
+
+def _value(band_key: int, question_id: int) -> int:
+    return ((band_key & _ID_MASK) << 32) | question_id
+
+
+def _insert(values: array, value: int):
+    position = bisect_left(values, value)
+    if position == len(values) or values[position] != value:
+        values.insert(position, value)
+
+
+def _contains(values: array, value: int) -> bool:
+    position = bisect_left(values, value)
+    return position < len(values) and values[position] == value
+
+
+def _merged(indexed: array, staged: array) -> array:
+    """Сливает отсортированный массив индекса с новыми значениями (выполняется в пуле потоков).
+
+    Сортировка и слияние — кусками и через генераторы: sorted() большого массива удерживает GIL
+    и останавливает event loop, а код генераторов отпускает GIL каждые несколько миллисекунд.
+    Повторы — вопросы, добавленные add между чтением из БД и слиянием.
+    """
+    chunks = [sorted(staged[start:start + SORT_CHUNK]) for start in range(0, len(staged), SORT_CHUNK)]
+    return array("Q", (value for value, _ in groupby(heapq.merge(indexed, *chunks))))
+
+
+class DuplicateIndex:
+    def __init__(self, bands: int = LSH_BANDS):
+        self._bands = [array("Q") for _ in range(bands)]
+        self.max_id = 0
+        self.loaded = False
+        # Изменения add/remove во время слияния в пуле потоков: повторяются на слитых массивах
+        self._journal: Optional[List[Tuple[bool, int, Sequence[int]]]] = None
+
+    def __len__(self):
+        return len(self._bands[0])
+
+    def add(self, question_id: int, bands: Sequence[int]):
+        if self._journal is not None:
+            self._journal.append((True, question_id, bands))
+        for values, band_key in zip(self._bands, bands):
+            _insert(values, _value(band_key, question_id))
+        self.max_id = max(self.max_id, question_id)
+
+    def remove(self, question_id: int, bands: Sequence[int]):
+        if self._journal is not None:
+            self._journal.append((False, question_id, bands))
+        for values, band_key in zip(self._bands, bands):
+            value = _value(band_key, question_id)
+            position = bisect_left(values, value)
+            if position < len(values) and values[position] == value:
+                del values[position]
+
+    def contains(self, question_id: int, bands: Sequence[int]) -> bool:
+        return bool(bands) and _contains(self._bands[0], _value(bands[0], question_id))
+
+    async def _merge(self, staged: List[array]):
+        """Добавляет подготовленные значения: мелкие пачки — вставкой, крупные — слиянием в пуле потоков."""
+        if len(staged[0]) < BULK_THRESHOLD:
+            for band, values in enumerate(staged):
+                for value in values:
+                    _insert(self._bands[band], value)
+            return
+        self._journal = []
+        try:
+            for band, values in enumerate(staged):
+                # Копия — в event loop: add может изменить массив, пока поток его читает
+                indexed = array("Q", self._bands[band])
+                self._bands[band] = await asyncio.to_thread(_merged, indexed, values)
+            journal = self._journal
+        finally:
+            self._journal = None
+        for added, question_id, bands in journal:
+            if added:
+                self.add(question_id, bands)
+            else:
+                self.remove(question_id, bands)
+
+    def candidates(self, bands: Sequence[int], limit: int) -> List[int]:
+        """id вопросов с совпадающими полосами, по убыванию числа совпадений."""
+        matches = Counter()
+        for values, band_key in zip(self._bands, bands):
+            start = bisect_left(values, _value(band_key, 0))
+            stop = bisect_left(values, _value(band_key, _ID_MASK), start, min(start + MAX_BUCKET_SCAN, len(values)))
+            matches.update(value & _ID_MASK for value in values[start:stop])
+        return [question_id for question_id, _ in matches.most_common(limit)]
+
+    async def refresh(self) -> int:
+        """Загружает вопросы, появившиеся после последнего обновления (при первом вызове — все).
+
+        Возвращает число прочитанных вопросов.
+        """
+        start = last_id = max(self.max_id - REFRESH_LOOKBACK, 0) if self.loaded else 0
+        staged = [array("Q") for _ in self._bands]
+        read = 0
+        async with async_session() as db:
+            while True:
+                result = await db.execute(
+                    select(Question.id, Question.lsh_bands, case((Question.lsh_bands.is_(None), Question.text)))
+                    .where(Question.id > start)
+                    .order_by(Question.id)
+                    .limit(LOAD_BATCH_SIZE)
+                )
+                rows = result.all()
+                if not rows:
+                    break
+                start = last_id = rows[-1][0]
+                read += len(rows)
+                missing = {question_id: lsh_bands(text) for question_id, bands, text in rows if bands is None}
+                if missing:
+                    # Вопросы, вставленные без заполнения колонки (например, до её появления)
+                    await db.execute(update(Question), [{"id": id, "lsh_bands": bands} for id, bands in missing.items()])
+                    await db.commit()
+                for question_id, bands, _ in rows:
+                    bands = bands or missing[question_id]
+                    if self.contains(question_id, bands):
+                        continue
+                    for values, band_key in zip(staged, bands):
+                        values.append(_value(band_key, question_id))
+        await self._merge(staged)
+        self.max_id = max(self.max_id, last_id)
+        if not self.loaded:
+            self.loaded = True
+            logger.info("Индекс похожих вопросов загружен: %s вопросов", len(self))
+        return read
+
+
+duplicate_index = DuplicateIndex()
+
+
+async def find_duplicates(db: AsyncSession, text: str, limit: Optional[int] = None) -> List[Tuple[Question, float]]:
+    """Похожие на text вопросы с коэффициентом сходства, по убыванию сходства."""
+    limit = limit or config.DEDUP_MAX_CANDIDATES
+    # Кандидатов берётся с запасом: часть отсеется проверкой сходства или уже удалена
+    ids = duplicate_index.candidates(lsh_bands(text), limit * 4)
+    if not ids:
+        return []
+    # Удалённые другими процессами вопросы остаются в индексе и отсеиваются здесь
+    questions = (await db.execute(select(Question).where(Question.id.in_(ids)))).scalars().all()
+    target = shingles(text)
+    similar = []
+    for question in questions:
+        similarity = jaccard(target, shingles(question.text))
+        if similarity >= config.DEDUP_MIN_SIMILARITY:
+            similar.append((question, round(similarity, 3)))
+    similar.sort(key=lambda item: (-item[1], item[0].id))
+    return similar[:limit]
+
+
+async def run_refresh_forever(interval: float):
+    while True:
+        try:
+            added = await duplicate_index.refresh()
+            if added:
+                logger.debug("В индекс похожих вопросов добавлено %s вопросов", added)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Ошибка обновления индекса похожих вопросов: %s", e)
+        await asyncio.sleep(interval)
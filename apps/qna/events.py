@@ -0,0 +1,110 @@
+"""События вопроса для подписчиков GET /questions/{id}/events (Server-Sent Events).
+
+Событие публикуется в канал вопроса уже готовым кадром SSE: брокер раздаёт подписчикам
+одни и те же байты, без сериализации на каждого. События:
+- answer_created — новый ответ (поля AnswerResponse; если ответ не помещается в сообщение
+  брокера, без text и с "truncated": true — клиент читает его через GET /answers/{id});
+- answer_deleted — удалён ответ: id и question_id;
+- question_deleted — вопрос удалён, поток завершается.
+
+Публикация выполняется после фиксации транзакции; ошибка публикации не ломает запрос.
+"""
+import logging
+from typing import AsyncIterator
+import orjson
+from fastapi.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+from core.pubsub import broker, Subscription, SubscriptionOverflow
+from .models import Answer
+
+logger = logging.getLogger(__name__)
+
+# Первое событие потока: подписка уже оформлена, после него клиент читает текущее состояние вопроса.
+# retry — пауза перед переподключением браузера (EventSource) в миллисекундах
+READY_EVENT = b"retry: 3000\nevent: ready\ndata: {}\n\n"
+# Очередь подписки переполнилась: события потеряны, клиент должен переподключиться и перечитать вопрос
+OVERFLOW_EVENT = b"event: overflow\ndata: {}\n\n"
+KEEPALIVE = b": keepalive\n\n"
+_QUESTION_DELETED = "question_deleted"
+
+
+def question_channel(question_id: int) -> str:
+    return f"question:{question_id}"
+
+
+def _frame(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {orjson.dumps(data).decode('utf-8')}\n\n"
+
+
+async def _publish(question_id: int, event: str, data: dict):
+    message = _frame(event, data)
+    if broker.max_message_size and len(message.encode("utf-8")) > broker.max_message_size:
+        data = {key: value for key, value in data.items() if key != "text"} | {"truncated": True}
+        message = _frame(event, data)
+    try:
+        await broker.publish(question_channel(question_id), message)
+    except Exception as e:
+        logger.error("Ошибка публикации события %s вопроса %s: %s", event, question_id, e)
+
+
+async def publish_answer_created(answer: Answer):
+    await _publish(answer.question_id, "answer_created", {
+        "id": answer.id,
+        "question_id": answer.question_id,
+        "user_id": answer.user_id,
+        "text": answer.text,
+        "created_at": answer.created_at,
+    })
+
+
+async def publish_answer_deleted(answer: Answer):
+    await _publish(answer.question_id, "answer_deleted", {"id": answer.id, "question_id": answer.question_id})
+
+
+async def publish_question_deleted(question_id: int):
+    await _publish(question_id, _QUESTION_DELETED, {"id": question_id})
+
+
+async def stream_events(subscription: Subscription) -> AsyncIterator[bytes]:
+    """Кадры SSE подписки; подписка закрывается, когда поток завершается или клиент отключается."""
+    try:
+        yield READY_EVENT
+        while True:
+            try:
+                message = await subscription.get()
+            except SubscriptionOverflow:
+                logger.warning("Подписка на %s переполнена, поток закрыт", subscription.channel)
+                yield OVERFLOW_EVENT
+                return
+            if message is None:
+                yield KEEPALIVE
+                continue
+            yield message
+            if message.startswith(b"event: " + _QUESTION_DELETED.encode("ascii")):
+                return
+    finally:
+        subscription.close()
+
+
+class EventStreamResponse(StreamingResponse):
+    """Ответ text/event-stream с кадрами подписки.
+
+    Подписка закрывается и тогда, когда поток так и не начался: клиент отключился до первого кадра
+    или отправка заголовков завершилась ошибкой. finally генератора в этих случаях не выполняется,
+    а фоновая задача ответа не запускается при исключении.
+    """
+
+    def __init__(self, subscription: Subscription):
+        super().__init__(
+            stream_events(subscription),
+            media_type="text/event-stream",
+            # X-Accel-Buffering: nginx отдаёт события сразу, без буферизации ответа
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+        self.subscription = subscription
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.subscription.close()
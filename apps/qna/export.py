@@ -0,0 +1,148 @@
+"""Потоковая выгрузка вопросов с ответами в NDJSON или CSV.
+
+Строки читаются серверным курсором порциями по EXPORT_FETCH_SIZE и сразу сериализуются
+в буфер, который отдаётся блоками по EXPORT_CHUNK_SIZE байт: память не зависит от размера таблиц.
+"""
+import csv
+import io
+import json
+import logging
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Optional
+from fastapi import Request
+from sqlalchemy import or_, text
+from sqlalchemy.future import select
+from apps.qna.models import Question, Answer
+from core.config import config
+from core.dependencies import read_session
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("ndjson", "csv")
+
+CSV_HEADER = [
+    "question_id", "question_text", "question_author_id", "question_created_at",
+    "answer_id", "answer_user_id", "answer_text", "answer_created_at",
+]
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def _export_query(updated_since: Optional[datetime]):
+    # Один проход по question LEFT JOIN answer, упорядоченный по вопросу:
+    # ответы вопроса идут подряд и собираются без отдельного запроса на каждый вопрос
+    query = (
+        select(
+            Question.id, Question.text, Question.author_id, Question.created_at,
+            Question.answer_count, Question.last_answer_at,
+            Answer.id.label("answer_id"), Answer.user_id.label("answer_user_id"),
+            Answer.text.label("answer_text"), Answer.created_at.label("answer_created_at"),
+        )
+        .outerjoin(Answer, Answer.question_id == Question.id)
+        .order_by(Question.id, Answer.id)
+    )
+    if updated_since is not None:
+        # Изменением вопроса считается его создание или новый ответ; удаления в инкрементальную выгрузку не попадают
+        query = query.where(or_(Question.created_at >= updated_since, Question.last_answer_at >= updated_since))
+    return query.execution_options(yield_per=config.EXPORT_FETCH_SIZE)
+
+
+class _NdjsonWriter:
+    """Одна строка на вопрос, ответы — вложенный массив answers."""
+
+    def __init__(self, buffer: io.StringIO):
+        self.buffer = buffer
+        self.current = None
+
+    def _flush_question(self):
+        if self.current is not None:
+            self.buffer.write(json.dumps(self.current, ensure_ascii=False))
+            self.buffer.write("\n")
+            self.current = None
+
+    def add_row(self, row):
+        if self.current is None or self.current["id"] != row.id:
+            self._flush_question()
+            self.current = {
+                "id": row.id,
+                "text": row.text,
+                "author_id": row.author_id,
+                "created_at": _isoformat(row.created_at),
+                "answer_count": row.answer_count,
+                "last_answer_at": _isoformat(row.last_answer_at),
+                "answers": [],
+            }
+        if row.answer_id is not None:
+            self.current["answers"].append({
+                "id": row.answer_id,
+                "user_id": row.answer_user_id,
+                "text": row.answer_text,
+                "created_at": _isoformat(row.answer_created_at),
+            })
+
+    def finish(self):
+        self._flush_question()
+
+
+class _CsvWriter:
+    """Одна строка на ответ с повтором полей вопроса; вопрос без ответов — строка с пустыми полями ответа."""
+
+    def __init__(self, buffer: io.StringIO):
+        self.writer = csv.writer(buffer)
+        self.writer.writerow(CSV_HEADER)
+
+    def add_row(self, row):
+        self.writer.writerow([
+            row.id, row.text, row.author_id, _isoformat(row.created_at),
+            row.answer_id, row.answer_user_id, row.answer_text, _isoformat(row.answer_created_at),
+        ])
+
+    def finish(self):
+        pass
+
+
+async def stream_export(
+    fmt: str,
+    updated_since: Optional[datetime] = None,
+    compress: bool = False,
+    request: Optional[Request] = None,
+) -> AsyncIterator[bytes]:
+    """Генерирует выгрузку блоками bytes; при compress=True — поток gzip.
+
+    Сессия открывается внутри генератора и живёт, пока отдаётся ответ.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Неизвестный формат выгрузки: {fmt}")
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31 — формат gzip
+    buffer = io.StringIO()
+    writer = _NdjsonWriter(buffer) if fmt == "ndjson" else _CsvWriter(buffer)
+
+    def take_chunk() -> bytes:
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(data) if compressor is not None else data
+
+    rows = 0
+    logger.info("Начало выгрузки: format=%s, updated_since=%s, gzip=%s", fmt, updated_since, compress)
+    async with read_session(request) as db:
+        # Выгрузка — один долгий запрос с курсором; общий statement_timeout к нему не применяем
+        await db.execute(text("SET LOCAL statement_timeout = 0"))
+        result = await db.stream(_export_query(updated_since))
+        async for row in result:
+            writer.add_row(row)
+            rows += 1
+            if buffer.tell() >= config.EXPORT_CHUNK_SIZE:
+                chunk = take_chunk()
+                if chunk:
+                    yield chunk
+    writer.finish()
+    chunk = take_chunk()
+    if compressor is not None:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
+    logger.info("Выгрузка завершена: %s строк", rows)
@@ -0,0 +1,169 @@
+"""Пакетный импорт вопросов с ответами из NDJSON.
+
+Формат строки совпадает с выгрузкой apps.qna.export: вопрос с вложенным массивом answers
+(поля id игнорируются). Вопросы пачки вставляются одним многострочным
+INSERT ... ON CONFLICT (text_hash) DO NOTHING, ответы — executemany; каждая пачка — отдельная транзакция.
+COPY не используется: он не умеет пропускать конфликты уникальности.
+"""
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, UTC
+from typing import AsyncIterable, AsyncIterator, Dict, List, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from apps.auth.models import User
+from apps.qna.crud import refresh_answer_stats
+from apps.qna.models import Question, Answer
+from apps.qna.schemas import QuestionImport
+from apps.qna.utils import to_naive_utc
+from core.config import config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ImportBatchResult:
+    batch: int
+    questions_inserted: int = 0
+    questions_skipped: int = 0
+    answers_inserted: int = 0
+    answers_skipped: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)  # (номер строки, причина)
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Разбивает поток байтов (например, тело запроса) на строки."""
+    tail = b""
+    async for chunk in chunks:
+        lines = (tail + chunk).split(b"\n")
+        tail = lines.pop()
+        for line in lines:
+            yield line
+    if tail:
+        yield tail
+
+
+async def _existing_user_ids(db: AsyncSession, user_ids: set) -> set:
+    if not user_ids:
+        return set()
+    result = await db.execute(select(User.id).where(User.id.in_(user_ids)))
+    return set(result.scalars().all())
+
+
+async def _import_batch(db: AsyncSession, result: ImportBatchResult, records: List[Tuple[int, QuestionImport]]):
+    now = datetime.now(UTC).replace(tzinfo=None)
+    known_users = await _existing_user_ids(
+        db,
+        {record.author_id for _, record in records} | {a.user_id for _, record in records for a in record.answers},
+    )
+
+    # Дубликаты внутри пачки и вопросы неизвестных авторов отбрасываются до обращения к БД
+    pending: Dict[str, Tuple[int, QuestionImport]] = {}
+    for line_number, record in records:
+        if record.author_id not in known_users:
+            result.questions_skipped += 1
+            result.answers_skipped += len(record.answers)
+            result.errors.append((line_number, f"Автор {record.author_id} не найден"))
+        elif record.text in pending:
+            result.questions_skipped += 1
+            result.answers_skipped += len(record.answers)
+            result.errors.append((line_number, "Вопрос с таким текстом уже есть в файле"))
+        else:
+            pending[record.text] = (line_number, record)
+    if not pending:
+        return
+
+    question_rows = [
+        {"text": record.text, "author_id": record.author_id, "created_at": to_naive_utc(record.created_at) or now}
+        for _, record in pending.values()
+    ]
+    inserted = await db.execute(
+        pg_insert(Question)
+        .on_conflict_do_nothing(index_elements=[Question.text_hash])
+        .returning(Question.id, Question.text),
+        question_rows,
+    )
+    question_ids = {text: id for id, text in inserted.all()}
+
+    answer_rows = []
+    for text, (line_number, record) in pending.items():
+        question_id = question_ids.get(text)
+        if question_id is None:
+            # Вопрос уже есть в БД: пропускаем вместе с ответами, чтобы повторный импорт не дублировал ответы
+            result.questions_skipped += 1
+            result.answers_skipped += len(record.answers)
+            result.errors.append((line_number, "Вопрос с таким текстом уже существует"))
+            continue
+        for answer in record.answers:
+            if answer.user_id not in known_users:
+                result.answers_skipped += 1
+                result.errors.append((line_number, f"Автор ответа {answer.user_id} не найден"))
+                continue
+            answer_rows.append({
+                "question_id": question_id,
+                "user_id": answer.user_id,
+                "text": answer.text,
+                "created_at": to_naive_utc(answer.created_at) or now,
+            })
+    if answer_rows:
+        await db.execute(insert(Answer), answer_rows)
+        await refresh_answer_stats(db, list({row["question_id"] for row in answer_rows}))
+    result.questions_inserted = len(question_ids)
+    result.answers_inserted = len(answer_rows)
+
+
+async def import_ndjson(
+    db: AsyncSession,
+    lines: AsyncIterable[bytes],
+    batch_size: int = config.IMPORT_BATCH_SIZE,
+) -> AsyncIterator[ImportBatchResult]:
+    """Импортирует строки NDJSON пачками по batch_size вопросов, отдавая результат каждой пачки.
+
+    Некорректные строки, дубликаты и ссылки на несуществующих пользователей пропускаются и попадают
+    в errors. Если пачка не записалась из-за ошибки БД, она откатывается целиком, импорт продолжается.
+    """
+    batch_number = 0
+    result = ImportBatchResult(batch=batch_number)
+    records: List[Tuple[int, QuestionImport]] = []
+
+    async def flush():
+        try:
+            await _import_batch(db, result, records)
+            await db.commit()
+        except SQLAlchemyError as e:
+            await db.rollback()
+            logger.error("Ошибка импорта пачки %s: %s", result.batch, e)
+            result.questions_inserted = result.answers_inserted = 0
+            result.questions_skipped = len(records)
+            result.answers_skipped = sum(len(record.answers) for _, record in records)
+            result.errors.append((records[0][0], f"Пачка не записана: {e.__class__.__name__}"))
+        logger.info(
+            "Импорт, пачка %s: вопросов добавлено %s, пропущено %s; ответов добавлено %s, пропущено %s",
+            result.batch, result.questions_inserted, result.questions_skipped,
+            result.answers_inserted, result.answers_skipped,
+        )
+
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            records.append((line_number, QuestionImport.model_validate_json(line)))
+        except ValidationError as e:
+            result.errors.append((line_number, f"Некорректная строка: {e.errors()[0]['msg']}"))
+            continue
+        if len(records) >= batch_size:
+            await flush()
+            yield result
+            batch_number += 1
+            result = ImportBatchResult(batch=batch_number)
+            records = []
+    if records or result.errors:
+        if records:
+            await flush()
+        yield result
@@ -1,27 +1,100 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, func
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Index, Computed, LargeBinary, func
+from sqlalchemy.dialects.postgresql import TSVECTOR, ARRAY
+from sqlalchemy.orm import relationship, deferred, validates
 from core.database import Base
+from .utils import text_hash as compute_text_hash, lsh_bands as compute_lsh_bands
+
+# Конфигурация полнотекстового поиска. Входит в выражение генерируемых колонок search_vector,
+# поэтому её смена требует миграции, пересоздающей эти колонки
+SEARCH_TS_CONFIG = "russian"
+
+# Период полураспада веса ответа в ленте популярных вопросов, часов. С ним посчитаны хранимые
+# question_trend.score, поэтому его смена требует миграции, пересчитывающей таблицу
+TRENDING_HALF_LIFE_HOURS = 6
 
 class Question(Base):
     __tablename__ = "question"
+    __table_args__ = (
+        # Keyset-пагинация списка вопросов по (created_at, id), в том числе с фильтром по автору
+        Index("ix_question_created_at_id", "created_at", "id"),
+        Index("ix_question_author_id_created_at_id", "author_id", "created_at", "id"),
+        Index("ix_question_search_vector", "search_vector", postgresql_using="gin"),
+        # Уникальность текста проверяется по хешу фиксированного размера, а не B-tree по всему тексту
+        Index("ix_question_text_hash", "text_hash", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    text = Column(String, nullable=False, unique=True)
+    text = Column(String, nullable=False)
     author_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)  # Изменено на String
     created_at = Column(DateTime, server_default=func.now())
+    # Денормализованная статистика ответов, обновляется в crud.create_answer/delete_answer
+    answer_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_answer_at = Column(DateTime, nullable=True)
+    # Поисковый вектор текста вопроса (вес A — совпадение в вопросе важнее, чем в ответе)
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(f"setweight(to_tsvector('{SEARCH_TS_CONFIG}', coalesce(text, '')), 'A')", persisted=True),
+    ))
+
+    # sha256 текста и ключи полос MinHash для поиска похожих вопросов (apps.qna.dedup).
+    # Заполняются из text: в ORM — validates ниже, во вставках Core (импорт) — значения по умолчанию
+    text_hash = deferred(Column(
+        LargeBinary, nullable=False,
+        default=lambda context: compute_text_hash(context.get_current_parameters()["text"]),
+    ))
+    lsh_bands = deferred(Column(
+        ARRAY(Integer), nullable=True,
+        default=lambda context: compute_lsh_bands(context.get_current_parameters()["text"]),
+    ))
 
     author = relationship("User", back_populates="questions")
-    answers = relationship("Answer", back_populates="question", cascade="all, delete-orphan")
+    # Ответы удаляет ON DELETE CASCADE в БД: при удалении вопроса коллекция не загружается в память
+    answers = relationship("Answer", back_populates="question", cascade="all, delete-orphan", passive_deletes=True)
+
+    @validates("text")
+    def _update_text_signatures(self, key, value):
+        self.text_hash = compute_text_hash(value)
+        self.lsh_bands = compute_lsh_bands(value)
+        return value
 
 class Answer(Base):
     __tablename__ = "answer"
-    __table_args__ = {'comment': 'Answers'}
+    __table_args__ = (
+        # Ответы вопроса по времени: пересчёт last_answer_at и постраничный вывод
+        Index("ix_answer_question_id_created_at_id", "question_id", "created_at", "id"),
+        Index("ix_answer_search_vector", "search_vector", postgresql_using="gin"),
+        {'comment': 'Answers'},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     question_id = Column(Integer, ForeignKey("question.id", ondelete="CASCADE"), nullable=False)
     user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     text = Column(String, nullable=False)
     created_at = Column(DateTime, server_default=func.now())
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(f"setweight(to_tsvector('{SEARCH_TS_CONFIG}', coalesce(text, '')), 'C')", persisted=True),
+    ))
 
     question = relationship("Question", back_populates="answers")
     user = relationship("User", back_populates="answers")
+
+class QuestionTrend(Base):
+    """Популярность вопроса по свежим ответам для GET /questions/trending.
+
+    score = ln Σ 2^(t / T½) по времени t всех ответов, T½ — TRENDING_HALF_LIFE_HOURS. Вес ответа
+    со временем падает вдвое за каждые T½ относительно новых ответов, но сами хранимые значения
+    не устаревают: порядок вопросов по score совпадает с порядком по затухающему числу ответов
+    в любой момент. Поэтому score обновляется только при изменении ответов (apps.qna.crud),
+    без периодического пересчёта. Отдельная таблица, а не колонка question: индекс по score
+    в question сделал бы каждое обновление строки вопроса при ответе не-HOT.
+    """
+    __tablename__ = "question_trend"
+    __table_args__ = (
+        # Лента по убыванию (score, question_id) с keyset-пагинацией
+        Index("ix_question_trend_score_question_id", "score", "question_id"),
+        {'comment': 'Question trending scores'},
+    )
+
+    question_id = Column(Integer, ForeignKey("question.id", ondelete="CASCADE"), primary_key=True)
+    score = Column(Float, nullable=False)
@@ -0,0 +1,248 @@
+"""Связанные вопросы: TF-IDF-индекс вопросов в памяти процесса.
+
+Признаки текста — хеши основ слов (hashing trick: словарь не хранится). Для каждого признака хранится
+array('I') id вопросов (инвертированный индекс), для каждого вопроса — его признаки в общем плоском
+массиве. Веса считаются при запросе по текущим частотам: idf = ln((1 + N) / (1 + df)) + 1,
+tf не учитывается — в коротких вопросах слова почти не повторяются.
+
+Поиск в два шага: кандидаты — вопросы из списков самых редких признаков запроса (не больше MAX_SCAN
+id, счёт совпадений в C через Counter), затем для RERANK_CANDIDATES лучших считается точный косинус.
+
+Индекс строится при старте из БД или загружается из снимка rebuild_related.py (RELATED_INDEX_PATH),
+затем периодически подгружает новые вопросы; снимок перечитывается, когда файл обновляется.
+Вопросы, созданные и удалённые этим процессом, попадают в индекс сразу, удалённые другими
+процессами отсеиваются при чтении вопросов из БД.
+"""
+import asyncio
+import logging
+import math
+import os
+import re
+import struct
+import zlib
+from array import array
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from core.config import config
+from core.database import async_session
+from .models import Question
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+# Основа слова — первые STEM_LENGTH букв: грубая, но дешёвая замена стемминга для русского языка
+STEM_LENGTH = 6
+MAX_FEATURES = 64
+# Сколько id из списков признаков просматривается при поиске кандидатов
+MAX_SCAN = 10000
+RERANK_CANDIDATES = 100
+REFRESH_LOOKBACK = 1000
+LOAD_BATCH_SIZE = 2000
+
+_EMPTY = array("I")
+_SNAPSHOT_MAGIC = b"QNAREL1\0"
+_SNAPSHOT_HEADER = struct.Struct("<8s6Q")
+
+
+def text_features(text: str) -> List[int]:
+    """Признаки текста: crc32 основ слов без повторов, не больше MAX_FEATURES."""
+    words = _WORD.findall(text.lower().replace("ё", "е"))
+    features = dict.fromkeys(zlib.crc32(word[:STEM_LENGTH].encode("utf-8")) for word in words if len(word) > 1)
+    return list(features)[:MAX_FEATURES]
+
+
+class RelatedIndex:
+    def __init__(self):
+        self._postings: Dict[int, array] = {}  # признак -> id вопросов
+        self._start = array("I")  # id вопроса -> начало его признаков в _features
+        self._count = array("B")  # id вопроса -> число признаков, 0 — вопроса нет в индексе
+        self._features = array("I")
+        self.documents = 0
+        self.max_id = 0
+        self.loaded = False
+        self.snapshot_mtime: Optional[float] = None
+
+    def __len__(self):
+        return self.documents
+
+    def _idf(self, document_frequency: int) -> float:
+        return math.log((1 + self.documents) / (1 + document_frequency)) + 1
+
+    def add(self, question_id: int, text: str):
+        if question_id < len(self._count) and self._count[question_id]:
+            return
+        features = text_features(text)
+        if not features:
+            return
+        missing = question_id + 1 - len(self._count)
+        if missing > 0:
+            self._start.frombytes(bytes(missing * self._start.itemsize))
+            self._count.frombytes(bytes(missing))
+        self._start[question_id] = len(self._features)
+        self._count[question_id] = len(features)
+        self._features.extend(features)
+        for feature in features:
+            postings = self._postings.get(feature)
+            if postings is None:
+                postings = self._postings[feature] = array("I")
+            postings.append(question_id)
+        self.documents += 1
+        self.max_id = max(self.max_id, question_id)
+
+    def remove(self, question_id: int):
+        # Признаки и записи в списках остаются до пересборки, вопрос только помечается отсутствующим
+        if question_id < len(self._count) and self._count[question_id]:
+            self._count[question_id] = 0
+            self.documents -= 1
+
+    def related(self, text: str, limit: int, exclude_id: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Ближайшие к text вопросы по косинусу TF-IDF: пары (id, косинус) по убыванию косинуса."""
+        features = text_features(text)
+        postings = [self._postings.get(feature, _EMPTY) for feature in features]
+        # Вес признака в запросе и в документе — idf, поэтому вклад общего признака в скалярное произведение — idf²
+        weights = {feature: self._idf(len(values)) ** 2 for feature, values in zip(features, postings)}
+        if not weights or not self.documents:
+            return []
+        query_norm = math.sqrt(sum(weights.values()))
+
+        matches = Counter()
+        scanned = 0
+        # Сначала самые редкие признаки: при равном числе совпадений выше остаются вопросы с редкими словами
+        for values in sorted(postings, key=len):
+            if scanned and scanned + len(values) > MAX_SCAN:
+                break
+            matches.update(values[-MAX_SCAN:])
+            scanned += len(values)
+        matches.pop(exclude_id, None)
+
+        squared_idf = {}
+        log, documents, all_postings = math.log, 1 + self.documents, self._postings
+        scored = []
+        for question_id, _ in matches.most_common(RERANK_CANDIDATES):
+            count = self._count[question_id]
+            if not count:
+                continue
+            start = self._start[question_id]
+            dot = norm = 0.0
+            for feature in self._features[start:start + count]:
+                weight = squared_idf.get(feature)
+                if weight is None:
+                    # То же, что _idf(...) ** 2: цикл по признакам кандидатов — самая горячая часть поиска
+                    weight = squared_idf[feature] = (log(documents / (1 + len(all_postings[feature]))) + 1) ** 2
+                norm += weight
+                if feature in weights:
+                    dot += weight
+            scored.append((question_id, dot / (math.sqrt(norm) * query_norm)))
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored[:limit]
+
+    async def refresh(self) -> int:
+        """Загружает вопросы, появившиеся после последнего обновления (при первом вызове — все).
+
+        Возвращает число прочитанных вопросов.
+        """
+        start = max(self.max_id - REFRESH_LOOKBACK, 0) if self.loaded else 0
+        read = 0
+        async with async_session() as db:
+            while True:
+                result = await db.execute(
+                    select(Question.id, Question.text)
+                    .where(Question.id > start)
+                    .order_by(Question.id)
+                    .limit(LOAD_BATCH_SIZE)
+                )
+                rows = result.all()
+                if not rows:
+                    break
+                start = rows[-1][0]
+                read += len(rows)
+                for question_id, text in rows:
+                    self.add(question_id, text)
+        if not self.loaded:
+            self.loaded = True
+            logger.info("Индекс связанных вопросов загружен: %s вопросов", len(self))
+        return read
+
+    def save(self, path: str):
+        """Записывает снимок индекса (порядок байт платформы). Файл заменяется атомарно."""
+        keys = array("I", self._postings)
+        lengths = array("I", map(len, self._postings.values()))
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(_SNAPSHOT_HEADER.pack(
+                _SNAPSHOT_MAGIC, self.max_id, self.documents,
+                len(self._count), len(self._features), len(keys), sum(lengths),
+            ))
+            for values in (self._start, self._count, self._features, keys, lengths):
+                values.tofile(file)
+            for values in self._postings.values():
+                values.tofile(file)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str) -> "RelatedIndex":
+        index = cls()
+        with open(path, "rb") as file:
+            magic, index.max_id, index.documents, ids, features, keys_count, postings_count = (
+                _SNAPSHOT_HEADER.unpack(file.read(_SNAPSHOT_HEADER.size))
+            )
+            if magic != _SNAPSHOT_MAGIC:
+                raise ValueError(f"{path} не является снимком индекса связанных вопросов")
+            keys, lengths, postings = array("I"), array("I"), array("I")
+            for values, size in (
+                (index._start, ids), (index._count, ids), (index._features, features),
+                (keys, keys_count), (lengths, keys_count), (postings, postings_count),
+            ):
+                values.fromfile(file, size)
+        offset = 0
+        for key, length in zip(keys, lengths):
+            index._postings[key] = postings[offset:offset + length]
+            offset += length
+        index.loaded = True
+        return index
+
+
+related_index = RelatedIndex()
+
+
+async def find_related(db: AsyncSession, question: Question, limit: int) -> List[Tuple[Question, float]]:
+    """Связанные с question вопросы с косинусом TF-IDF, по убыванию."""
+    # С запасом: часть кандидатов могла быть удалена другими процессами
+    scored = related_index.related(question.text, limit * 2, exclude_id=question.id)
+    if not scored:
+        return []
+    questions = {
+        item.id: item
+        for item in (await db.execute(select(Question).where(Question.id.in_([id for id, _ in scored])))).scalars()
+    }
+    return [(questions[id], round(score, 3)) for id, score in scored if id in questions][:limit]
+
+
+async def _reload_snapshot(path: str):
+    """Загружает снимок, если он появился или обновился с прошлой загрузки."""
+    if not path or not os.path.exists(path):
+        return
+    mtime = os.path.getmtime(path)
+    if mtime == related_index.snapshot_mtime:
+        return
+    # Чтение файла — в потоке; подмена содержимого — в event loop, между запросами
+    loaded = await asyncio.to_thread(RelatedIndex.load, path)
+    loaded.snapshot_mtime = mtime
+    related_index.__dict__.update(loaded.__dict__)
+    logger.info("Снимок индекса связанных вопросов %s загружен: %s вопросов", path, len(related_index))
+
+
+async def run_refresh_forever(interval: float):
+    while True:
+        try:
+            await _reload_snapshot(config.RELATED_INDEX_PATH)
+            added = await related_index.refresh()
+            if added:
+                logger.debug("В индекс связанных вопросов добавлено %s вопросов", added)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Ошибка обновления индекса связанных вопросов: %s", e)
+        await asyncio.sleep(interval)
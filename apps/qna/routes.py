@@ -1,47 +1,287 @@
 import logging
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Header, Response, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse, ORJSONResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from core.dependencies import get_db
+from core.dependencies import get_db, get_read_db, read_session
 from . import schemas, crud, models
-from apps.auth.routes import get_current_user
+from .utils import decode_cursor, decode_rank_cursor, to_naive_utc, parse_ids, MAX_ID
+from .cache import get_question_version, get_cached_question, cache_question
+from .export import stream_export
+from .importer import import_ndjson, iter_lines
+from .dedup import find_duplicates, NearDuplicateQuestions
+from .related import find_related
+from .events import question_channel, EventStreamResponse
+from core.config import config
+from core.idempotency import idempotent, IDEMPOTENCY_HEADER
+from core.pubsub import broker, TooManySubscribers
+from apps.auth.routes import get_current_user, get_current_superuser
 from apps.auth.models import User
 
-# Настройка логирования
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/questions", tags=["Вопросы"])
 
-@router.get("/", response_model=list[schemas.QuestionResponse], summary="Получить список всех вопросов")
-async def get_questions(db: AsyncSession = Depends(get_db)):
-    """Получить список всех вопросов (публичный доступ)."""
-    logger.info("Запрос на получение списка всех вопросов")
-    questions = await crud.get_all_questions(db)
-    logger.info(f"Успешно возвращено {len(questions)} вопросов")
-    return questions
+def _rows_response(rows, next_cursor: Optional[str]) -> ORJSONResponse:
+    # Строки crud.*_ROW_COLUMNS совпадают по полям со схемами ответа и не требуют проверки Pydantic:
+    # response_model остаётся для документации, а тело сразу кодируется orjson
+    return ORJSONResponse({"items": [row._asdict() for row in rows], "next_cursor": next_cursor})
 
-@router.post("/", response_model=schemas.QuestionResponse, summary="Создать новый вопрос")
+@router.get("/", response_model=schemas.QuestionListResponse, summary="Получить список вопросов")
+async def get_questions(
+    limit: int = Query(20, ge=1, le=100, description="Размер страницы"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (next_cursor из предыдущего ответа)"),
+    author_id: Optional[str] = Query(None, description="Только вопросы указанного автора"),
+    created_from: Optional[datetime] = Query(None, description="Созданные не раньше этого момента"),
+    created_to: Optional[datetime] = Query(None, description="Созданные раньше этого момента"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Получить страницу вопросов от новых к старым (публичный доступ).
+
+    Пагинация курсорная: для следующей страницы передайте next_cursor из ответа.
+    """
+    logger.info("Запрос на получение списка вопросов: limit=%s, author_id=%s", limit, author_id)
+    try:
+        position = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        logger.warning("Некорректный курсор: %s", cursor)
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+    questions, next_cursor = await crud.get_questions_page(
+        db,
+        limit=limit,
+        cursor=position,
+        author_id=author_id,
+        created_from=to_naive_utc(created_from),
+        created_to=to_naive_utc(created_to),
+    )
+    logger.info("Успешно возвращено %s вопросов", len(questions))
+    return _rows_response(questions, next_cursor)
+
+_IDEMPOTENCY_KEY_DESCRIPTION = "Ключ идемпотентности: повтор с тем же ключом вернёт первый ответ, не создавая копию"
+
+def _similar(duplicates) -> List[dict]:
+    return [
+        {"question": schemas.QuestionResponse.model_validate(question), "similarity": similarity}
+        for question, similarity in duplicates
+    ]
+
+@router.post("/", response_model=schemas.QuestionResponse, summary="Создать новый вопрос",
+             responses={409: {"description": "Вопрос с таким текстом уже существует или найдены похожие вопросы"}})
 async def create_question(
+    request: Request,
     question: schemas.QuestionCreate,
+    allow_duplicates: bool = Query(False, description="Создать вопрос, даже если найдены похожие"),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER, description=_IDEMPOTENCY_KEY_DESCRIPTION),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Создать новый вопрос (только для авторизованных пользователей)."""
-    logger.info(f"Пользователь {current_user.id} создает новый вопрос: {question.text}")
-    result = await crud.create_question(db, text=question.text, author_id=current_user.id)
-    logger.info(f"Вопрос успешно создан с ID: {result.id}")
-    return result
-
-@router.get("/{id}", response_model=schemas.QuestionDetailResponse, summary="Получить информацию о вопросе")
-async def get_question(id: int, db: AsyncSession = Depends(get_db)):
-    """Получить информацию о вопросе и его ответах (публичный доступ)."""
-    logger.info(f"Запрос на получение вопроса с ID: {id}")
-    question = await crud.get_question_by_id(db, id)
-    if not question:
-        logger.warning(f"Вопрос с ID {id} не найден")
-        raise HTTPException(status_code=404, detail="Вопрос не найден")
-    logger.info(f"Успешно возвращен вопрос с ID: {id}")
-    return question
+    """Создать новый вопрос (только для авторизованных пользователей).
+
+    Если уже есть похожие вопросы, возвращается 409 со списком duplicates; чтобы всё равно создать
+    вопрос, повторите запрос с allow_duplicates=true.
+    """
+    logger.info("Пользователь %s создает новый вопрос: %s", current_user.id, question.text)
+
+    async def handler(complete):
+        try:
+            result = await crud.create_question(
+                db, text=question.text, author_id=current_user.id, allow_duplicates=allow_duplicates,
+                before_commit=complete and (lambda created: complete(schemas.QuestionResponse.model_validate(created))),
+            )
+        except NearDuplicateQuestions as e:
+            logger.info("Для вопроса %s найдено похожих: %s", question.text, len(e.candidates))
+            raise HTTPException(status_code=409, detail=jsonable_encoder({
+                "message": "Найдены похожие вопросы", "duplicates": _similar(e.candidates),
+            }))
+        except IntegrityError:
+            await db.rollback()
+            logger.warning("Вопрос с текстом %s уже существует", question.text)
+            raise HTTPException(status_code=409, detail="Вопрос с таким текстом уже существует")
+        logger.info("Вопрос успешно создан с ID: %s", result.id)
+        return schemas.QuestionResponse.model_validate(result)
+
+    return await idempotent(request, db, current_user.id, idempotency_key, handler)
+
+@router.get("/similar", response_model=schemas.SimilarQuestionsResponse, summary="Найти похожие вопросы")
+async def get_similar_questions(
+    text: str = Query(..., min_length=1, max_length=1000, description="Текст нового вопроса"),
+    limit: int = Query(5, ge=1, le=20, description="Сколько похожих вопросов вернуть"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Похожие вопросы для текста (публичный доступ): подсказка перед созданием вопроса."""
+    logger.info("Поиск похожих вопросов: %s", text)
+    return {"items": _similar(await find_duplicates(db, text, limit=limit))}
+
+@router.get("/trending", response_model=schemas.TrendingQuestionsResponse, summary="Лента популярных вопросов")
+async def get_trending_questions(
+    limit: int = Query(20, ge=1, le=100, description="Размер страницы"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (next_cursor из предыдущего ответа)"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Вопросы по убыванию числа свежих ответов: вес ответа падает вдвое каждые 6 часов (публичный доступ).
+
+    Популярность хранится готовой и обновляется вместе с ответами, поэтому страница — чтение по индексу.
+    Ответ можно кэшировать TRENDING_MAX_AGE_SECONDS секунд.
+    """
+    logger.info("Запрос ленты популярных вопросов: limit=%s", limit)
+    try:
+        position = decode_rank_cursor(cursor) if cursor else None
+    except ValueError:
+        logger.warning("Некорректный курсор: %s", cursor)
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+    items, next_cursor = await crud.get_trending_page(db, limit=limit, cursor=position)
+    logger.info("Успешно возвращено %s популярных вопросов", len(items))
+    return ORJSONResponse(
+        {"items": items, "next_cursor": next_cursor},
+        headers={"Cache-Control": f"public, max-age={config.TRENDING_MAX_AGE_SECONDS}"},
+    )
+
+@router.get("/search", response_model=schemas.QuestionSearchResponse, summary="Полнотекстовый поиск по вопросам и ответам")
+async def search_questions(
+    q: str = Query(..., min_length=1, max_length=200, description='Запрос: слова, "фраза", OR, -исключение'),
+    limit: int = Query(20, ge=1, le=100, description="Размер страницы"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (next_cursor из предыдущего ответа)"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Найти вопросы по тексту вопроса и его ответов (публичный доступ).
+
+    Результаты отсортированы по релевантности и содержат фрагменты с подсвеченными совпадениями.
+    """
+    logger.info("Поиск вопросов: q=%s, limit=%s", q, limit)
+    try:
+        position = decode_rank_cursor(cursor) if cursor else None
+    except ValueError:
+        logger.warning("Некорректный курсор: %s", cursor)
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+    rows, next_cursor = await crud.search_questions(db, text=q, limit=limit, cursor=position)
+    logger.info("Найдено %s вопросов по запросу %s", len(rows), q)
+    items = [
+        {"question": question, "rank": rank, "snippet": snippet, "answer_snippet": answer_snippet}
+        for question, rank, snippet, answer_snippet in rows
+    ]
+    return {"items": items, "next_cursor": next_cursor}
+
+BATCH_MAX_IDS = 100
+
+def _question_detail(question: models.Question, answers, answers_next_cursor: Optional[str]) -> schemas.QuestionDetailResponse:
+    # Ответы передаются явно: обращение к question.answers загрузило бы их все
+    return schemas.QuestionDetailResponse(
+        **schemas.QuestionResponse.model_validate(question).model_dump(),
+        answers=[schemas.AnswerResponse.model_validate(answer) for answer in answers],
+        answers_next_cursor=answers_next_cursor,
+    )
+
+def _batch_ids(ids: List[str]) -> List[int]:
+    try:
+        parsed = parse_ids(ids)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"id должны быть целыми числами от 1 до {MAX_ID}")
+    if len(parsed) > BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"Не больше {BATCH_MAX_IDS} id за запрос")
+    return parsed
+
+@router.get("/batch", response_model=schemas.QuestionBatchResponse, summary="Получить несколько вопросов по id")
+async def get_questions_batch(
+    ids: List[str] = Query(..., description="id вопросов: ids=1,2,3 или ids=1&ids=2"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Получить вопросы с ответами по списку id одним запросом (публичный доступ).
+
+    Вопросы возвращаются в порядке запрошенных id, ненайденные id перечислены в missing_ids.
+    """
+    requested = _batch_ids(ids)
+    logger.info("Запрос на получение %s вопросов по id", len(requested))
+    found = {question.id: question for question in await crud.get_questions_by_ids(db, requested)}
+    pages = await crud.get_first_answer_pages(db, list(found), config.QUESTION_DETAIL_ANSWERS) if found else {}
+    return {
+        "items": [_question_detail(found[id], *pages[id]) for id in requested if id in found],
+        "missing_ids": [id for id in requested if id not in found],
+    }
+
+@router.get("/export", summary="Выгрузить вопросы с ответами",
+            responses={200: {"content": {"application/x-ndjson": {}, "text/csv": {}, "application/gzip": {}}}})
+async def export_questions(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Формат: ndjson или csv"),
+    gzip: bool = Query(False, description="Сжимать выгрузку gzip"),
+    updated_since: Optional[datetime] = Query(None, description="Только вопросы, созданные или получившие ответ с этого момента"),
+    current_user: User = Depends(get_current_superuser)
+):
+    """Потоковая выгрузка всех вопросов с ответами (только для администраторов)."""
+    logger.info("Пользователь %s запросил выгрузку: format=%s, gzip=%s", current_user.id, format, gzip)
+    filename = f"qna-export.{format}" + (".gz" if gzip else "")
+    media_type = "application/gzip" if gzip else ("application/x-ndjson" if format == "ndjson" else "text/csv")
+    return StreamingResponse(
+        stream_export(format, updated_since=to_naive_utc(updated_since), compress=gzip, request=request),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.post("/import", response_model=schemas.ImportResponse, summary="Импортировать вопросы с ответами",
+             openapi_extra={"requestBody": {"content": {"application/x-ndjson": {"schema": {"type": "string"}}}}})
+async def import_questions(
+    request: Request,
+    current_user: User = Depends(get_current_superuser),
+    db: AsyncSession = Depends(get_db)
+):
+    """Пакетный импорт из NDJSON в теле запроса (только для администраторов).
+
+    Формат строки — как в GET /questions/export. Вопросы с уже существующим текстом пропускаются
+    и попадают в errors вместе с некорректными строками.
+    """
+    logger.info("Пользователь %s запустил импорт", current_user.id)
+    summary = {"batches": 0, "questions_inserted": 0, "questions_skipped": 0,
+               "answers_inserted": 0, "answers_skipped": 0, "errors": [], "errors_total": 0}
+    async for batch in import_ndjson(db, iter_lines(request.stream())):
+        summary["batches"] += 1
+        for key in ("questions_inserted", "questions_skipped", "answers_inserted", "answers_skipped"):
+            summary[key] += getattr(batch, key)
+        summary["errors_total"] += len(batch.errors)
+        free = config.IMPORT_MAX_REPORTED_ERRORS - len(summary["errors"])
+        summary["errors"].extend({"line": line, "error": error} for line, error in batch.errors[:free])
+    logger.info("Импорт завершён: %s", {k: v for k, v in summary.items() if k != "errors"})
+    return summary
+
+def _etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+@router.get("/{id}", response_model=schemas.QuestionDetailResponse, summary="Получить информацию о вопросе",
+            responses={304: {"description": "Вопрос не изменился (If-None-Match)"}})
+async def get_question(
+    id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Получить информацию о вопросе и первую страницу его ответов (публичный доступ).
+
+    Всего ответов — answer_count, следующие страницы — GET /questions/{id}/answers с answers_next_cursor.
+    Ответ кэшируется в готовом виде и отдаётся с ETag; при совпадении If-None-Match возвращается 304.
+    """
+    logger.info("Запрос на получение вопроса с ID: %s", id)
+    version = await get_question_version(id)
+    cached = await get_cached_question(id, version)
+    if cached is not None:
+        etag, body = cached
+    else:
+        question = await crud.get_question_by_id(db, id)
+        if not question:
+            logger.warning("Вопрос с ID %s не найден", id)
+            raise HTTPException(status_code=404, detail="Вопрос не найден")
+        answers, answers_next_cursor = await crud.get_answers_page(db, id, limit=config.QUESTION_DETAIL_ANSWERS)
+        body = _question_detail(question, answers, answers_next_cursor).model_dump_json().encode("utf-8")
+        etag = await cache_question(id, version, body)
+    headers = {"ETag": etag, "Cache-Control": "public, no-cache"}
+    if _etag_matches(etag, if_none_match):
+        logger.info("Вопрос с ID %s не изменился, ответ 304", id)
+        return Response(status_code=304, headers=headers)
+    logger.info("Успешно возвращен вопрос с ID: %s", id)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @router.delete("/{id}", summary="Удалить вопрос")
 async def delete_question(
@@ -50,46 +290,138 @@ async def delete_question(
     db: AsyncSession = Depends(get_db)
 ):
     """Удалить вопрос и связанные с ним ответы (только для владельца вопроса)."""
-    logger.info(f"Пользователь {current_user.id} пытается удалить вопрос с ID: {id}")
+    logger.info("Пользователь %s пытается удалить вопрос с ID: %s", current_user.id, id)
     question = await crud.get_question_by_id(db, id)
     if not question:
-        logger.warning(f"Вопрос с ID {id} не найден")
+        logger.warning("Вопрос с ID %s не найден", id)
         raise HTTPException(status_code=404, detail="Вопрос не найден")
     if question.author_id != current_user.id:
-        logger.error(f"Пользователь {current_user.id} не авторизован для удаления вопроса с ID: {id}")
+        logger.error("Пользователь %s не авторизован для удаления вопроса с ID: %s", current_user.id, id)
         raise HTTPException(status_code=403, detail="Нет прав для удаления этого вопроса")
     await crud.delete_question(db, question)
-    logger.info(f"Вопрос с ID {id} успешно удален")
+    logger.info("Вопрос с ID %s успешно удален", id)
     return {"detail": "Вопрос успешно удален"}
 
+@router.get("/{id}/related", response_model=schemas.RelatedQuestionsResponse, summary="Получить связанные вопросы")
+async def get_related_questions(
+    id: int,
+    limit: int = Query(5, ge=1, le=20, description="Сколько связанных вопросов вернуть"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Вопросы, близкие по тексту к вопросу id (публичный доступ), по убыванию сходства."""
+    logger.info("Запрос связанных вопросов для вопроса %s: limit=%s", id, limit)
+    question = await crud.get_question_by_id(db, id)
+    if not question:
+        logger.warning("Вопрос с ID %s не найден", id)
+        raise HTTPException(status_code=404, detail="Вопрос не найден")
+    related = await find_related(db, question, limit)
+    return {"items": [
+        {"question": schemas.QuestionResponse.model_validate(item), "score": score} for item, score in related
+    ]}
+
+@router.get("/{id}/events", summary="Подписаться на ответы вопроса (Server-Sent Events)",
+            responses={200: {"content": {"text/event-stream": {}}}, 503: {"description": "Превышено число подписок процесса"}})
+async def question_events(id: int, request: Request):
+    """Поток событий вопроса в формате Server-Sent Events (публичный доступ).
+
+    События: ready (подписка оформлена — теперь можно прочитать вопрос через GET /questions/{id}),
+    answer_created, answer_deleted, question_deleted (поток завершается) и overflow (события потеряны,
+    нужно переподключиться и перечитать вопрос). Пропущенные за время отключения события не повторяются.
+    """
+    # Сессия открывается только на проверку: зависимость с yield держала бы соединение весь поток
+    async with read_session(request) as db:
+        question = await crud.get_question_by_id(db, id)
+    if not question:
+        logger.warning("Вопрос с ID %s не найден", id)
+        raise HTTPException(status_code=404, detail="Вопрос не найден")
+    try:
+        subscription = broker.subscribe(question_channel(id))
+    except TooManySubscribers as e:
+        logger.warning("Подписка на вопрос %s отклонена: %s", id, e)
+        raise HTTPException(status_code=503, detail="Слишком много подписок, повторите позже",
+                            headers={"Retry-After": "5"})
+    logger.info("Подписка на события вопроса %s, подписок в процессе: %s", id, broker.subscribers)
+    return EventStreamResponse(subscription)
+
+@router.get("/{id}/answers", response_model=schemas.AnswerListResponse, summary="Получить ответы на вопрос")
+async def get_question_answers(
+    id: int,
+    limit: int = Query(20, ge=1, le=100, description="Размер страницы"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (next_cursor из предыдущего ответа)"),
+    order: str = Query("oldest", pattern="^(oldest|newest)$", description="Сортировка: oldest или newest"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Получить страницу ответов на вопрос (публичный доступ).
+
+    Курсор действителен только для того же значения order, с которым он получен.
+    """
+    logger.info("Запрос ответов на вопрос %s: limit=%s, order=%s", id, limit, order)
+    try:
+        position = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        logger.warning("Некорректный курсор: %s", cursor)
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+    answers, next_cursor = await crud.get_answers_page(db, id, limit=limit, cursor=position, order=order)
+    if not answers and position is None and not await crud.get_question_by_id(db, id):
+        logger.warning("Вопрос с ID %s не найден", id)
+        raise HTTPException(status_code=404, detail="Вопрос не найден")
+    logger.info("Успешно возвращено %s ответов на вопрос %s", len(answers), id)
+    return _rows_response(answers, next_cursor)
+
 @router.post("/{id}/answers/", response_model=schemas.AnswerResponse, summary="Добавить ответ к вопросу")
 async def create_answer(
+    request: Request,
     id: int,
     answer: schemas.AnswerCreate,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER, description=_IDEMPOTENCY_KEY_DESCRIPTION),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Добавить ответ к вопросу (только для авторизованных пользователей)."""
-    logger.info(f"Пользователь {current_user.id} добавляет ответ к вопросу с ID: {id}")
-    question = await crud.get_question_by_id(db, id)
-    if not question:
-        logger.warning(f"Вопрос с ID {id} не найден")
-        raise HTTPException(status_code=404, detail="Вопрос не найден")
-    result = await crud.create_answer(db, question_id=id, user_id=current_user.id, text=answer.text)
-    logger.info(f"Ответ успешно добавлен к вопросу с ID: {id}, ответ ID: {result.id}")
-    return result
+    logger.info("Пользователь %s добавляет ответ к вопросу с ID: %s", current_user.id, id)
+
+    async def handler(complete):
+        question = await crud.get_question_by_id(db, id)
+        if not question:
+            logger.warning("Вопрос с ID %s не найден", id)
+            raise HTTPException(status_code=404, detail="Вопрос не найден")
+        result = await crud.create_answer(
+            db, question_id=id, user_id=current_user.id, text=answer.text,
+            before_commit=complete and (lambda created: complete(schemas.AnswerResponse.model_validate(created))),
+        )
+        logger.info("Ответ успешно добавлен к вопросу с ID: %s, ответ ID: %s", id, result.id)
+        return schemas.AnswerResponse.model_validate(result)
+
+    return await idempotent(request, db, current_user.id, idempotency_key, handler)
 
 answers_router = APIRouter(prefix="/answers", tags=["Ответы"])
 
+@answers_router.get("/batch", response_model=schemas.AnswerBatchResponse, summary="Получить несколько ответов по id")
+async def get_answers_batch(
+    ids: List[str] = Query(..., description="id ответов: ids=1,2,3 или ids=1&ids=2"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Получить ответы по списку id одним запросом (публичный доступ).
+
+    Ответы возвращаются в порядке запрошенных id, ненайденные id перечислены в missing_ids.
+    """
+    requested = _batch_ids(ids)
+    logger.info("Запрос на получение %s ответов по id", len(requested))
+    found = {answer.id: answer for answer in await crud.get_answers_by_ids(db, requested)}
+    return {
+        "items": [found[id] for id in requested if id in found],
+        "missing_ids": [id for id in requested if id not in found],
+    }
+
 @answers_router.get("/{id}", response_model=schemas.AnswerResponse, summary="Получить информацию об ответе")
-async def get_answer(id: int, db: AsyncSession = Depends(get_db)):
+async def get_answer(id: int, db: AsyncSession = Depends(get_read_db)):
     """Получить информацию об ответе (публичный доступ)."""
-    logger.info(f"Запрос на получение ответа с ID: {id}")
+    logger.info("Запрос на получение ответа с ID: %s", id)
     answer = await crud.get_answer_by_id(db, id)
     if not answer:
-        logger.warning(f"Ответ с ID {id} не найден")
+        logger.warning("Ответ с ID %s не найден", id)
         raise HTTPException(status_code=404, detail="Ответ не найден")
-    logger.info(f"Успешно возвращен ответ с ID: {id}")
+    logger.info("Успешно возвращен ответ с ID: %s", id)
     return answer
 
 @answers_router.delete("/{id}", summary="Удалить ответ")
@@ -99,14 +431,14 @@ async def delete_answer(
     db: AsyncSession = Depends(get_db)
 ):
     """Удалить ответ (только для владельца ответа)."""
-    logger.info(f"Пользователь {current_user.id} пытается удалить ответ с ID: {id}")
+    logger.info("Пользователь %s пытается удалить ответ с ID: %s", current_user.id, id)
     answer = await crud.get_answer_by_id(db, id)
     if not answer:
-        logger.warning(f"Ответ с ID {id} не найден")
+        logger.warning("Ответ с ID %s не найден", id)
         raise HTTPException(status_code=404, detail="Ответ не найден")
     if answer.user_id != current_user.id:
-        logger.error(f"Пользователь {current_user.id} не авторизован для удаления ответа с ID: {id}")
+        logger.error("Пользователь %s не авторизован для удаления ответа с ID: %s", current_user.id, id)
         raise HTTPException(status_code=403, detail="Нет прав для удаления этого ответа")
     await crud.delete_answer(db, answer)
-    logger.info(f"Ответ с ID {id} успешно удален")
+    logger.info("Ответ с ID %s успешно удален", id)
     return {"detail": "Ответ успешно удален"}
@@ -1,6 +1,6 @@
 from datetime import datetime
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 class QuestionBase(BaseModel):
     text: str
@@ -12,15 +12,55 @@ class QuestionResponse(QuestionBase):
     id: int
     author_id: str  # Изменено на str
     created_at: datetime
+    answer_count: int = 0
+    last_answer_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
+class QuestionListResponse(BaseModel):
+    items: List[QuestionResponse]
+    next_cursor: Optional[str] = None  # None — страниц больше нет
+
+class TrendingQuestion(QuestionResponse):
+    hot: float  # Число ответов с затуханием: ответ возрастом TRENDING_HALF_LIFE_HOURS (6 ч) весит 0.5
+
+class TrendingQuestionsResponse(BaseModel):
+    items: List[TrendingQuestion]  # По убыванию hot
+    next_cursor: Optional[str] = None  # None — страниц больше нет
+
+class QuestionSearchHit(BaseModel):
+    question: QuestionResponse
+    rank: float
+    snippet: str  # Фрагмент текста вопроса, совпадения выделены <b>…</b>
+    answer_snippet: Optional[str] = None  # Фрагмент наиболее подходящего ответа, если совпадение есть в ответах
+
+class QuestionSearchResponse(BaseModel):
+    items: List[QuestionSearchHit]
+    next_cursor: Optional[str] = None  # None — страниц больше нет
+
+class SimilarQuestion(BaseModel):
+    question: QuestionResponse
+    similarity: float  # Коэффициент Жаккара символьных 4-грамм текстов, от 0 до 1
+
+class SimilarQuestionsResponse(BaseModel):
+    items: List[SimilarQuestion]  # По убыванию сходства
+
+class RelatedQuestion(BaseModel):
+    question: QuestionResponse
+    score: float  # Косинусное сходство TF-IDF-векторов текстов, от 0 до 1
+
+class RelatedQuestionsResponse(BaseModel):
+    items: List[RelatedQuestion]  # По убыванию сходства
+
 class QuestionDetailResponse(QuestionBase):
     id: int
     author_id: str  # Изменено на str
     created_at: datetime
-    answers: List["AnswerResponse"] = []
+    answer_count: int = 0
+    last_answer_at: Optional[datetime] = None
+    answers: List["AnswerResponse"] = []  # Первая страница ответов, всего ответов — answer_count
+    answers_next_cursor: Optional[str] = None  # Курсор для GET /questions/{id}/answers?order=oldest
 
     class Config:
         from_attributes = True
@@ -40,4 +80,38 @@ class AnswerResponse(AnswerBase):
     class Config:
         from_attributes = True
 
+class AnswerListResponse(BaseModel):
+    items: List[AnswerResponse]
+    next_cursor: Optional[str] = None  # None — страниц больше нет
+
+class QuestionBatchResponse(BaseModel):
+    items: List[QuestionDetailResponse]  # В порядке запрошенных id
+    missing_ids: List[int] = []
+
+class AnswerBatchResponse(BaseModel):
+    items: List[AnswerResponse]  # В порядке запрошенных id
+    missing_ids: List[int] = []
+
+class AnswerImport(AnswerBase):
+    user_id: str
+    created_at: Optional[datetime] = None  # None — время импорта
+
+class QuestionImport(QuestionBase):
+    author_id: str
+    created_at: Optional[datetime] = None  # None — время импорта
+    answers: List[AnswerImport] = []
+
+class ImportErrorItem(BaseModel):
+    line: int
+    error: str
+
+class ImportResponse(BaseModel):
+    batches: int
+    questions_inserted: int
+    questions_skipped: int
+    answers_inserted: int
+    answers_skipped: int
+    errors: List[ImportErrorItem]  # Первые IMPORT_MAX_REPORTED_ERRORS ошибок
+    errors_total: int
+
 QuestionDetailResponse.update_forward_refs()
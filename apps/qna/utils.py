@@ -0,0 +1,126 @@
+import base64
+import hashlib
+import math
+import re
+import struct
+import zlib
+from datetime import datetime, UTC
+from typing import List, Optional, Set, Tuple
+
+# Наибольший id: колонки id — integer PostgreSQL, большее значение параметра отклоняет драйвер
+MAX_ID = 2 ** 31 - 1
+
+
+def to_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Приводит datetime к наивному UTC (колонки created_at хранятся без часового пояса)."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(UTC).replace(tzinfo=None)
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    """Кодирует позицию keyset-пагинации (created_at, id) в непрозрачную строку."""
+    raw = f"{created_at.isoformat()}|{id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Декодирует курсор, созданный encode_cursor. Бросает ValueError при некорректном значении.
+
+    Время с часовым поясом приводится к наивному UTC: курсор может быть собран клиентом вручную.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, id = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8").split("|")
+        created_at, id = to_naive_utc(datetime.fromisoformat(created_at)), int(id)
+    except (UnicodeError, ValueError) as e:
+        raise ValueError("Некорректный курсор") from e
+    if not 1 <= id <= MAX_ID:
+        raise ValueError("Некорректный курсор")
+    return created_at, id
+
+
+def encode_rank_cursor(rank: float, id: int) -> str:
+    """Кодирует позицию пагинации результатов поиска (rank, id) в непрозрачную строку."""
+    raw = f"{rank!r}|{id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_rank_cursor(cursor: str) -> Tuple[float, int]:
+    """Декодирует курсор, созданный encode_rank_cursor. Бросает ValueError при некорректном значении.
+
+    nan и бесконечность отклоняются: сравнение с ними в keyset-условии молча даёт пустую или неверную страницу.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        rank, id = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8").split("|")
+        rank, id = float(rank), int(id)
+    except (UnicodeError, ValueError) as e:
+        raise ValueError("Некорректный курсор") from e
+    if not math.isfinite(rank) or not 1 <= id <= MAX_ID:
+        raise ValueError("Некорректный курсор")
+    return rank, id
+
+
+def parse_ids(values: List[str]) -> List[int]:
+    """Разбирает id из параметров вида ids=1,2,3 и/или ids=1&ids=2 без повторов, сохраняя порядок.
+
+    Бросает ValueError при нечисловом значении и при значении вне диапазона id (integer PostgreSQL).
+    """
+    ids = []
+    for value in values:
+        for part in value.split(","):
+            part = part.strip()
+            if part:
+                id = int(part)
+                if not 1 <= id <= MAX_ID:
+                    raise ValueError(f"id вне диапазона 1..{MAX_ID}: {part}")
+                ids.append(id)
+    return list(dict.fromkeys(ids))
+
+
+def text_hash(text: str) -> bytes:
+    """sha256 текста вопроса: уникальный индекс фиксированного размера вместо индекса по всему тексту."""
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+_WORD = re.compile(r"\w+")
+SHINGLE_SIZE = 4
+
+
+def shingles(text: str) -> Set[str]:
+    """Символьные 4-граммы текста без учёта регистра, пунктуации и ё/е."""
+    normalized = " ".join(_WORD.findall(text.lower().replace("ё", "е")))
+    if len(normalized) <= SHINGLE_SIZE:
+        return {normalized}
+    return {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+# MinHash LSH: сигнатура из LSH_BANDS * LSH_ROWS минимумов, тексты с совпадающей полосой — кандидаты
+# в дубликаты. При сходстве 0.7 вероятность попасть в кандидаты ~0.89, при 0.3 — ~0.06.
+# Ключи полос хранятся в question.lsh_bands: после изменения параметров колонку нужно обнулить,
+# ключи пересчитаются при загрузке индекса (apps.qna.dedup)
+LSH_BANDS = 8
+LSH_ROWS = 4
+# Все LSH_BANDS * LSH_ROWS хешей шингла — из одного дайджеста SHAKE-128: один вызов C-кода вместо
+# отдельной хеш-функции на каждую перестановку
+_SIGNATURE = struct.Struct(f"<{LSH_BANDS * LSH_ROWS}I")
+_BAND = struct.Struct(f"<{LSH_ROWS}I")
+
+
+def lsh_bands(text: str) -> List[int]:
+    """Ключи полос MinHash-сигнатуры текста (int32 со знаком — для колонки integer[])."""
+    hashes = (
+        _SIGNATURE.unpack(hashlib.shake_128(shingle.encode("utf-8")).digest(_SIGNATURE.size))
+        for shingle in shingles(text)
+    )
+    signature = list(map(min, zip(*hashes)))
+    bands = []
+    for start in range(0, len(signature), LSH_ROWS):
+        key = zlib.crc32(_BAND.pack(*signature[start:start + LSH_ROWS]))
+        bands.append(key - (1 << 32) if key >= 1 << 31 else key)
+    return bands
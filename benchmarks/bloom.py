@@ -0,0 +1,41 @@
+"""Фильтр отозванных токенов: память, доля ложных срабатываний и время проверки jti.
+
+Ложное срабатывание стоит запроса к revoked_token; ответ «нет» фильтра проверку в БД заменяет.
+
+Запуск из корня проекта:
+    python -m benchmarks.bloom --sizes 100000 1000000 --error-rate 0.001
+"""
+import argparse
+import time
+import uuid
+from core.bloom import BloomFilter
+
+
+def run(size: int, error_rate: float, probes: int):
+    bloom = BloomFilter(size, error_rate)
+    started = time.perf_counter()
+    for _ in range(size):
+        bloom.add(uuid.uuid4().hex)
+    add_time = (time.perf_counter() - started) / size * 1e6
+    keys = [uuid.uuid4().hex for _ in range(probes)]
+    started = time.perf_counter()
+    false_positives = sum(key in bloom for key in keys)
+    check_time = (time.perf_counter() - started) / probes * 1e6
+    print(
+        f"{size} отозванных jti: {bloom.nbytes / 1024:.0f} КБ, {bloom.hashes} хешей, "
+        f"ложных срабатываний {false_positives / probes:.4%}, добавление {add_time:.1f} мкс, проверка {check_time:.1f} мкс"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000], help="Записей в фильтре")
+    parser.add_argument("--error-rate", type=float, default=0.001, help="Расчётная доля ложных срабатываний")
+    parser.add_argument("--probes", type=int, default=200000, help="Проверок неотозванных jti")
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.error_rate, args.probes)
+
+
+if __name__ == "__main__":
+    main()
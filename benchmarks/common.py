@@ -0,0 +1,6 @@
+"""Общие функции бенчмарков."""
+
+
+def percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
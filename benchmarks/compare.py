@@ -0,0 +1,59 @@
+"""Сравнение двух результатов benchmarks.load_test.
+
+Печатает по каждому маршруту p50/p95/p99 и пропускную способность базового и нового прогона
+с изменением в процентах. Завершается с кодом 1, если p95 какого-либо маршрута выросла
+или пропускная способность упала больше чем на --threshold процентов, либо появились ошибки.
+
+Запуск из корня проекта:
+    python -m benchmarks.compare benchmarks/results/base.json benchmarks/results/new.json --threshold 10
+"""
+import argparse
+import json
+
+
+def change(base: float, new: float) -> float:
+    return (new - base) / base * 100 if base else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base", help="Результат базового прогона")
+    parser.add_argument("new", help="Результат нового прогона")
+    parser.add_argument("--threshold", type=float, default=10, help="Допустимое ухудшение, %%")
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+
+    print(f"base: {base['meta'].get('git_commit')}  new: {new['meta'].get('git_commit')}")
+    print(f"{'маршрут':<32} {'метрика':<8} {'base':>10} {'new':>10} {'изм.':>8}")
+    regressions = []
+    for route in sorted(set(base["routes"]) | set(new["routes"])):
+        if route not in base["routes"] or route not in new["routes"]:
+            print(f"{route:<32} есть только в {'new' if route in new['routes'] else 'base'}")
+            continue
+        before, after = base["routes"][route], new["routes"][route]
+        rows = [(name, before["latency_ms"][name], after["latency_ms"][name]) for name in ("p50", "p95", "p99")]
+        rows.append(("rps", before["throughput_rps"], after["throughput_rps"]))
+        for name, old_value, new_value in rows:
+            delta = change(old_value, new_value)
+            print(f"{route:<32} {name:<8} {old_value:>10.1f} {new_value:>10.1f} {delta:>+7.1f}%")
+        if change(before["latency_ms"]["p95"], after["latency_ms"]["p95"]) > args.threshold:
+            regressions.append(f"{route}: p95 выросла больше чем на {args.threshold}%")
+        if -change(before["throughput_rps"], after["throughput_rps"]) > args.threshold:
+            regressions.append(f"{route}: пропускная способность упала больше чем на {args.threshold}%")
+        if after["errors"] > before["errors"]:
+            regressions.append(f"{route}: ошибок {before['errors']} -> {after['errors']}")
+
+    if regressions:
+        print("\nРегрессии:")
+        for regression in regressions:
+            print(f"- {regression}")
+        raise SystemExit(1)
+    print("\nРегрессий нет")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Индекс похожих вопросов: время поиска кандидатов, память и полнота.
+
+Индекс заполняется --size вопросами со случайными ключами полос (как у несвязанных текстов;
+реальные сигнатуры для миллионов текстов считались бы минуты), затем в него добавляются
+--pairs сгенерированных вопросов. Для каждого из них ищется кандидат по переформулировке
+(пропущенное или заменённое слово, другой регистр и пунктуация) и проверяется, что исходный
+вопрос найден. Время поиска включает вычисление сигнатуры запроса, без обращения к БД.
+
+Запуск из корня проекта:
+    python -m benchmarks.dedup --size 1000000 --pairs 1000
+"""
+import argparse
+import asyncio
+import random
+import time
+from array import array
+import apps.auth.models
+from apps.qna.dedup import DuplicateIndex, _value
+from apps.qna.utils import LSH_BANDS, lsh_bands, shingles, jaccard
+from benchmarks.common import percentile
+from benchmarks.seed import WORDS
+
+
+def build_random(index: DuplicateIndex, size: int, rng: random.Random):
+    staged = [array("Q") for _ in range(LSH_BANDS)]
+    for question_id in range(1, size + 1):
+        for values in staged:
+            values.append(_value(rng.randrange(-2 ** 31, 2 ** 31), question_id))
+    asyncio.run(index._merge(staged))
+    index.max_id = size
+
+
+def rephrase(text: str, rng: random.Random) -> str:
+    words = text.rstrip("?").split()
+    position = rng.randrange(len(words))
+    if rng.random() < 0.5 and len(words) > 6:
+        del words[position]
+    else:
+        words[position] = rng.choice(WORDS)
+    return " ".join(words).lower() + rng.choice(("?", "", " ?!"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1_000_000, help="Вопросов в индексе")
+    parser.add_argument("--pairs", type=int, default=1000, help="Пар вопрос + переформулировка")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    index = DuplicateIndex()
+    started = time.perf_counter()
+    build_random(index, args.size, rng)
+    print(f"Индекс из {args.size} вопросов построен за {time.perf_counter() - started:.1f} с, "
+          f"{sum(len(values) * values.itemsize for values in index._bands) / 2 ** 20:.0f} МБ")
+
+    originals = {}
+    for question_id in range(args.size + 1, args.size + args.pairs + 1):
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 16))).capitalize() + "?"
+        originals[question_id] = text
+        index.add(question_id, lsh_bands(text))
+
+    latencies, found, similarities = [], 0, []
+    for question_id, text in originals.items():
+        query = rephrase(text, rng)
+        started = time.perf_counter()
+        candidates = index.candidates(lsh_bands(query), 20)
+        latencies.append((time.perf_counter() - started) * 1000)
+        found += question_id in candidates
+        similarities.append(jaccard(shingles(text), shingles(query)))
+
+    print(f"Поиск кандидатов: p50 {percentile(latencies, 0.50):.2f} мс, p99 {percentile(latencies, 0.99):.2f} мс")
+    print(f"Найдено исходных вопросов: {found} из {args.pairs} "
+          f"(среднее сходство переформулировок {sum(similarities) / len(similarities):.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""Нагрузочный тест API со смешанной нагрузкой.
+
+Виртуальные пользователи (по одному на единицу concurrency) входят под bench-пользователями
+из манифеста benchmarks.seed и в замкнутом цикле выполняют операции в заданной пропорции:
+list (GET /questions/, иногда следующая страница), detail (GET /questions/{id}, вопросы
+выбираются по закону Ципфа, как при наполнении), answer (POST /questions/{id}/answers/),
+delete (DELETE /answers/{id} своего ответа), login, register.
+
+По каждому маршруту считаются число запросов, ошибки, пропускная способность и p50/p95/p99
+задержки; результат пишется в JSON для сравнения прогонов (benchmarks.compare).
+
+Запуск из корня проекта против локального PostgreSQL из .env:
+    python -m benchmarks.seed --reset
+    python -m benchmarks.load_test --spawn --concurrency 32 --duration 60
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, UTC
+import httpx
+from benchmarks.common import percentile
+
+OPERATIONS = ("list", "detail", "answer", "delete", "login", "register")
+DEFAULT_MIX = "list=40,detail=35,answer=10,delete=5,login=7,register=3"
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        name, weight = part.split("=")
+        mix[name.strip()] = int(weight)
+    unknown = set(mix) - set(OPERATIONS)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Неизвестные операции: {', '.join(sorted(unknown))}")
+    return mix
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.recording = False
+
+    def add(self, route: str, elapsed: float, status: int, ok: bool):
+        if not self.recording:
+            return
+        self.latencies[route].append(elapsed * 1000)
+        self.statuses[route][status] += 1
+        if not ok:
+            self.errors[route] += 1
+
+    def report(self, duration: float) -> dict:
+        routes = {}
+        for route, values in sorted(self.latencies.items()):
+            routes[route] = {
+                "requests": len(values),
+                "errors": self.errors[route],
+                "statuses": {str(status): count for status, count in sorted(self.statuses[route].items())},
+                "throughput_rps": len(values) / duration,
+                "latency_ms": {
+                    "mean": statistics.fmean(values),
+                    "p50": percentile(values, 0.50),
+                    "p95": percentile(values, 0.95),
+                    "p99": percentile(values, 0.99),
+                    "max": max(values),
+                },
+            }
+        everything = list(itertools.chain.from_iterable(self.latencies.values()))
+        total = {
+            "requests": len(everything),
+            "errors": sum(self.errors.values()),
+            "throughput_rps": len(everything) / duration,
+            "latency_ms": {
+                "p50": percentile(everything, 0.50),
+                "p95": percentile(everything, 0.95),
+                "p99": percentile(everything, 0.99),
+            } if everything else {},
+        }
+        return {"routes": routes, "total": total}
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, stats: Stats, manifest: dict, email: str,
+                 cum_weights: list[float], rng: random.Random):
+        self.client = client
+        self.stats = stats
+        self.manifest = manifest
+        self.email = email
+        self.cum_weights = cum_weights
+        self.rng = rng
+        self.token = None
+        self.next_cursor = None
+        self.own_answers = []
+
+    async def request(self, route: str, method: str, url: str, expected=(200,), **kwargs) -> httpx.Response | None:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.stats.add(route, time.perf_counter() - started, 0, False)
+            return None
+        self.stats.add(route, time.perf_counter() - started, response.status_code, response.status_code in expected)
+        if response.status_code == 401 and self.token is not None:
+            self.token = None  # токен истёк — войдём заново в следующей операции
+        return response
+
+    @property
+    def auth(self) -> dict:
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def pick_question(self) -> int:
+        return self.rng.choices(self.manifest["question_ids"], cum_weights=self.cum_weights)[0]
+
+    async def op_login(self):
+        response = await self.request(
+            "POST /auth/login", "POST", "/auth/login",
+            data={"username": self.email, "password": self.manifest["password"]},
+        )
+        if response is not None and response.status_code == 200:
+            self.token = response.json()["access_token"]
+
+    async def op_register(self):
+        email = f"bench-load-{uuid.uuid4().hex[:12]}@example.com"
+        await self.request(
+            "POST /auth/register", "POST", "/auth/register",
+            json={"username": "bench load", "email": email,
+                  "password": self.manifest["password"], "password_confirm": self.manifest["password"]},
+        )
+
+    async def op_list(self):
+        params = {"limit": 20}
+        if self.next_cursor and self.rng.random() < 0.2:
+            params["cursor"] = self.next_cursor
+        response = await self.request("GET /questions/", "GET", "/questions/", params=params)
+        if response is not None and response.status_code == 200:
+            self.next_cursor = response.json()["next_cursor"]
+
+    async def op_detail(self):
+        await self.request("GET /questions/{id}", "GET", f"/questions/{self.pick_question()}")
+
+    async def op_answer(self):
+        response = await self.request(
+            "POST /questions/{id}/answers/", "POST", f"/questions/{self.pick_question()}/answers/",
+            json={"text": "Ответ нагрузочного теста"}, headers=self.auth,
+        )
+        if response is not None and response.status_code == 200:
+            self.own_answers.append(response.json()["id"])
+
+    async def op_delete(self):
+        if not self.own_answers:
+            await self.op_answer()
+            return
+        await self.request("DELETE /answers/{id}", "DELETE", f"/answers/{self.own_answers.pop()}", headers=self.auth)
+
+    async def run(self, operations: list[str], weights: list[int], stop_at: float):
+        while time.perf_counter() < stop_at:
+            if self.token is None:
+                await self.op_login()
+                if self.token is None:
+                    await asyncio.sleep(0.1)
+                    continue
+            operation = self.rng.choices(operations, weights=weights)[0]
+            await getattr(self, f"op_{operation}")()
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def wait_ready(base_url: str, timeout: float = 30):
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.perf_counter() < deadline:
+            try:
+                if (await client.get("/questions/", params={"limit": 1})).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5)
+    raise SystemExit(f"Приложение не ответило на {base_url} за {timeout} с")
+
+
+async def main(args):
+    with open(args.manifest, encoding="utf-8") as f:
+        manifest = json.load(f)
+    mix = args.mix
+    operations, weights = list(mix), list(mix.values())
+    cum_weights = list(itertools.accumulate(
+        1 / (rank ** manifest["zipf"]) for rank in range(1, len(manifest["question_ids"]) + 1)
+    ))
+
+    server = None
+    if args.spawn:
+        host, port = args.base_url.removeprefix("http://").split(":")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", host, "--port", port,
+             "--workers", str(args.workers), "--log-level", "warning"],
+            env={**os.environ, "LOG_LEVEL": os.getenv("LOG_LEVEL", "WARNING")},
+        )
+    try:
+        await wait_ready(args.base_url)
+        stats = Stats()
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+            rng = random.Random(args.seed)
+            users = [
+                VirtualUser(client, stats, manifest, manifest["emails"][i % len(manifest["emails"])],
+                            cum_weights, random.Random(rng.random()))
+                for i in range(args.concurrency)
+            ]
+            stop_at = time.perf_counter() + args.warmup + args.duration
+            tasks = [asyncio.create_task(user.run(operations, weights, stop_at)) for user in users]
+            await asyncio.sleep(args.warmup)
+            stats.recording = True
+            started = time.perf_counter()
+            await asyncio.gather(*tasks)
+            duration = time.perf_counter() - started
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    result = {
+        "meta": {
+            "started_at": datetime.now(UTC).isoformat(),
+            "git_commit": git_commit(),
+            "base_url": args.base_url,
+            "concurrency": args.concurrency,
+            "duration_s": duration,
+            "warmup_s": args.warmup,
+            "workers": args.workers if args.spawn else None,
+            "mix": mix,
+            "seed": args.seed,
+            "questions": len(manifest["question_ids"]),
+            "users": len(manifest["emails"]),
+        },
+        **stats.report(duration),
+    }
+    output = args.output or f"benchmarks/results/load-{datetime.now(UTC):%Y%m%dT%H%M%S}.json"
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+    print(f"{'маршрут':<32} {'запросов':>9} {'ошибок':>7} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for route, data in result["routes"].items():
+        latency = data["latency_ms"]
+        print(f"{route:<32} {data['requests']:>9} {data['errors']:>7} {data['throughput_rps']:>8.1f} "
+              f"{latency['p50']:>8.1f} {latency['p95']:>8.1f} {latency['p99']:>8.1f}")
+    print(f"Всего: {result['total']['requests']} запросов, {result['total']['throughput_rps']:.1f} rps. Результат: {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--spawn", action="store_true", help="Запустить uvicorn main:app на время теста")
+    parser.add_argument("--workers", type=int, default=1, help="Процессов uvicorn при --spawn")
+    parser.add_argument("--manifest", default="benchmarks/results/seed.json", help="Манифест benchmarks.seed")
+    parser.add_argument("--concurrency", type=int, default=16, help="Виртуальных пользователей")
+    parser.add_argument("--duration", type=float, default=60, help="Длительность замера, с")
+    parser.add_argument("--warmup", type=float, default=5, help="Прогрев без записи статистики, с")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help=f"Доли операций, по умолчанию {DEFAULT_MIX}")
+    parser.add_argument("--timeout", type=float, default=30, help="Таймаут запроса, с")
+    parser.add_argument("--seed", type=int, default=1, help="Зерно выбора операций и вопросов")
+    parser.add_argument("--output", help="Файл результата, по умолчанию benchmarks/results/load-<время>.json")
+    asyncio.run(main(parser.parse_args()))
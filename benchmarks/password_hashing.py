@@ -0,0 +1,103 @@
+"""Задержка «посторонних» запросов во время волны входов.
+
+Поднимает минимальное ASGI-приложение с двумя эндпоинтами: /login проверяет bcrypt-пароль,
+/ping ничего не делает. Параллельно гонит входы и пинги и печатает p50/p99 задержки /ping
+для двух режимов: bcrypt прямо в event loop (как было) и через PasswordHasher.
+
+Запуск из корня проекта:
+    python -m benchmarks.password_hashing --logins 32 --concurrency 8 --rounds 12
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import bcrypt
+import httpx
+from fastapi import FastAPI
+from apps.auth.hashing import PasswordHasher
+from benchmarks.common import percentile
+
+PASSWORD = "benchmark-password"
+
+
+def build_app(mode: str, hashed_password: str, hasher: PasswordHasher) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/login")
+    async def login():
+        if mode == "inline":
+            ok = bcrypt.checkpw(PASSWORD.encode("utf-8"), hashed_password.encode("utf-8"))
+        else:
+            ok = await hasher.verify(PASSWORD, hashed_password)
+        return {"ok": ok}
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+async def run(mode: str, args) -> dict:
+    hasher = PasswordHasher(rounds=args.rounds, workers=args.workers, queue_depth=args.logins)
+    hashed_password = bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt(args.rounds)).decode("utf-8")
+    app = build_app(mode, hashed_password, hasher)
+    latencies = []
+    logins_done = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def one_login():
+            async with semaphore:
+                await client.post("/login")
+
+        async def logins():
+            await asyncio.gather(*(one_login() for _ in range(args.logins)))
+            logins_done.set()
+
+        async def pings():
+            # Задержка считается от запланированного момента отправки, чтобы время,
+            # проведённое в заблокированном event loop, тоже попадало в замер
+            interval = args.ping_interval / 1000
+            scheduled = time.perf_counter()
+            while not logins_done.is_set():
+                scheduled += interval
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+                await client.get("/ping")
+                latencies.append((time.perf_counter() - scheduled) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(logins(), pings())
+        elapsed = time.perf_counter() - started
+
+    hasher.shutdown()
+    return {
+        "mode": mode,
+        "logins_per_s": args.logins / elapsed,
+        "pings": len(latencies),
+        "ping_p50_ms": statistics.median(latencies),
+        "ping_p99_ms": percentile(latencies, 0.99),
+        "ping_max_ms": max(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=32, help="Сколько входов выполнить")
+    parser.add_argument("--concurrency", type=int, default=8, help="Одновременных входов")
+    parser.add_argument("--workers", type=int, default=4, help="Потоков в пуле PasswordHasher")
+    parser.add_argument("--rounds", type=int, default=12, help="Cost factor bcrypt")
+    parser.add_argument("--ping-interval", type=float, default=5.0, help="Пауза между пингами, мс")
+    args = parser.parse_args()
+
+    for mode in ("inline", "pool"):
+        result = asyncio.run(run(mode, args))
+        print(
+            f"{result['mode']:>6}: {result['logins_per_s']:.1f} входов/с, пингов {result['pings']}, "
+            f"p50 {result['ping_p50_ms']:.1f} мс, p99 {result['ping_p99_ms']:.1f} мс, max {result['ping_max_ms']:.1f} мс"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Брокер событий в памяти процесса: память на простаивающего подписчика и время раздачи.
+
+Каждый подписчик — задача, которая, как поток GET /questions/{id}/events, ждёт сообщение
+подписки. Подписчики распределены по --channels вопросам, ещё --fanout подписаны на один
+популярный вопрос. Память считается tracemalloc (объекты Python: подписка,
+задача и её корутина; без буферов сокетов и HTTP-сервера). Время раздачи — от publish до
+получения сообщения последним подписчиком популярного вопроса.
+
+Запуск из корня проекта:
+    python -m benchmarks.pubsub --subscribers 20000 --channels 2000 --fanout 10000
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+from core.pubsub import Broker
+from benchmarks.common import percentile
+
+
+async def consume(subscription, received: list, done: asyncio.Event, expected: int):
+    while True:
+        message = await subscription.get()
+        if message is not None:
+            received[0] += 1
+            if received[0] == expected:
+                done.set()
+
+
+async def run(args):
+    broker = Broker(queue_size=32, max_subscribers=args.subscribers + args.fanout, keepalive_interval=15)
+    received = [0]
+    done = asyncio.Event()
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tasks = [
+        asyncio.create_task(consume(broker.subscribe(f"question:{index % args.channels}"), [0], done, -1))
+        for index in range(args.subscribers)
+    ]
+    await asyncio.sleep(0)
+    per_subscriber = (tracemalloc.get_traced_memory()[0] - before) / args.subscribers
+    tracemalloc.stop()
+    print(f"{args.subscribers} подписчиков на {args.channels} вопросов: {per_subscriber:.0f} байт на подписчика")
+
+    tasks += [
+        asyncio.create_task(consume(broker.subscribe("question:hot"), received, done, args.fanout))
+        for _ in range(args.fanout)
+    ]
+    await asyncio.sleep(0)
+    latencies = []
+    message = "event: answer_created\ndata: " + "x" * 200 + "\n\n"
+    for round_number in range(1, args.rounds + 1):
+        done.clear()
+        started = time.perf_counter()
+        await broker.publish("question:hot", message)
+        await done.wait()
+        latencies.append((time.perf_counter() - started) * 1000)
+        received[0] = 0
+    print(f"Раздача {args.fanout} подписчикам одного вопроса: p50 {percentile(latencies, 0.50):.1f} мс, "
+          f"p99 {percentile(latencies, 0.99):.1f} мс")
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=20000, help="Простаивающих подписчиков")
+    parser.add_argument("--channels", type=int, default=2000, help="Вопросов, на которые они подписаны")
+    parser.add_argument("--fanout", type=int, default=10000, help="Подписчиков популярного вопроса")
+    parser.add_argument("--rounds", type=int, default=50, help="Публикаций в популярный вопрос")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Индекс связанных вопросов: задержка запроса в зависимости от размера корпуса.
+
+Корпус синтетический: слова из словаря --vocabulary случайных слов с частотами по закону Ципфа,
+как в естественном языке (несколько частых слов и длинный хвост редких). Индекс наполняется
+до каждого размера из --sizes, на каждом шаге измеряются задержка поиска связанных вопросов для
+случайных вопросов корпуса (без обращения к БД), память и время записи и чтения снимка.
+
+Запуск из корня проекта:
+    python -m benchmarks.related --sizes 10000 100000 1000000
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+import apps.auth.models
+from apps.qna.related import RelatedIndex
+from benchmarks.common import percentile
+from benchmarks.seed import zipf_weights
+
+SYLLABLES = [consonant + vowel for consonant in "бвгдзклмнпрстхцчш" for vowel in "аеиоуыя"]
+
+
+def vocabulary(size: int, rng: random.Random) -> list[str]:
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 5))))
+    return list(words)
+
+
+def memory(index: RelatedIndex) -> int:
+    arrays = itertools.chain((index._start, index._count, index._features), index._postings.values())
+    return sum(sys.getsizeof(values) for values in arrays) + sys.getsizeof(index._postings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="Размеры корпуса")
+    parser.add_argument("--vocabulary", type=int, default=50_000, help="Слов в словаре")
+    parser.add_argument("--queries", type=int, default=1000, help="Запросов на каждый размер")
+    parser.add_argument("--limit", type=int, default=5, help="Связанных вопросов в ответе")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    words = vocabulary(args.vocabulary, rng)
+    cumulative = list(itertools.accumulate(zipf_weights(len(words), 1.0)))
+    texts = {}
+    index = RelatedIndex()
+    for size in sorted(args.sizes):
+        started = time.perf_counter()
+        for question_id in range(len(texts) + 1, size + 1):
+            texts[question_id] = " ".join(rng.choices(words, cum_weights=cumulative, k=rng.randint(6, 15))) + "?"
+            index.add(question_id, texts[question_id])
+        build = time.perf_counter() - started
+
+        latencies = []
+        for question_id in rng.sample(range(1, size + 1), args.queries):
+            started = time.perf_counter()
+            index.related(texts[question_id], args.limit, exclude_id=question_id)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "related.idx")
+            started = time.perf_counter()
+            index.save(path)
+            save = time.perf_counter() - started
+            started = time.perf_counter()
+            RelatedIndex.load(path)
+            load = time.perf_counter() - started
+            snapshot = os.path.getsize(path)
+
+        print(f"{size:>9} вопросов: запрос p50 {percentile(latencies, 0.50):.2f} мс, p99 {percentile(latencies, 0.99):.2f} мс; "
+              f"память {memory(index) / 2 ** 20:.0f} МБ, добавление {build:.1f} с; "
+              f"снимок {snapshot / 2 ** 20:.0f} МБ, запись {save:.1f} с, чтение {load:.1f} с")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Наполнение локальной БД данными для нагрузочного теста.
+
+Создаёт подтверждённых пользователей bench-N@example.com с общим паролем, вопросы и ответы.
+Популярность вопросов распределена по закону Ципфа: небольшая доля вопросов собирает
+большую часть ответов (тот же закон load_test использует для чтения вопросов).
+Пишет манифест с паролем и id вопросов в порядке популярности для benchmarks.load_test.
+
+Запуск из корня проекта (БД из .env):
+    python -m benchmarks.seed --users 1000 --questions 20000 --answers 200000 --reset
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta, UTC
+import bcrypt
+from sqlalchemy import delete, insert, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+import apps.auth.models
+from apps.auth.models import User
+from apps.qna.models import Question, Answer
+from core.config import config
+from core.database import Base, async_session, engine
+
+PASSWORD = "benchmark-password"
+EMAIL_PREFIX = "bench-"
+EMAIL_DOMAIN = "@example.com"
+BATCH_SIZE = 5000
+
+WORDS = (
+    "база данных индекс запрос транзакция кэш сервер клиент очередь поток память диск сеть "
+    "задержка пропускная способность python postgres fastapi async миграция реплика пул "
+    "соединение блокировка сериализация json оптимизация профилирование тест нагрузка ошибка"
+).split()
+
+
+def zipf_weights(count: int, exponent: float) -> list[float]:
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def batches(rows, size: int = BATCH_SIZE):
+    iterator = iter(rows)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+async def seed(args):
+    rng = random.Random(args.seed)
+    now = datetime.now(UTC).replace(tzinfo=None)
+    hashed_password = bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt(config.BCRYPT_ROUNDS)).decode("utf-8")
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_session() as db:
+        if args.reset:
+            # Вопросы и ответы пользователей удаляются каскадом по внешним ключам
+            await db.execute(delete(User).where(User.email.like(f"{EMAIL_PREFIX}%{EMAIL_DOMAIN}")))
+            await db.commit()
+
+        started = time.perf_counter()
+        user_ids = []
+        for batch in batches(range(args.users)):
+            rows = [
+                {"username": f"bench user {i}", "email": f"{EMAIL_PREFIX}{i}{EMAIL_DOMAIN}",
+                 "hashed_password": hashed_password, "is_verified": True}
+                for i in batch
+            ]
+            result = await db.execute(pg_insert(User).returning(User.id), rows)
+            user_ids.extend(result.scalars().all())
+            await db.commit()
+        print(f"Пользователей: {len(user_ids)}")
+
+        question_ids = []
+        for batch in batches(range(args.questions)):
+            rows = [
+                {"text": f"{sentence(rng, rng.randint(5, 15))}? #{args.seed}-{i}",
+                 "author_id": rng.choice(user_ids),
+                 "created_at": now - timedelta(seconds=rng.randint(0, args.days * 86400))}
+                for i in batch
+            ]
+            result = await db.execute(pg_insert(Question).returning(Question.id), rows)
+            question_ids.extend(result.scalars().all())
+            await db.commit()
+        print(f"Вопросов: {len(question_ids)}")
+
+        # Ранг популярности не связан с id: горячие вопросы разбросаны по таблице
+        by_popularity = question_ids[:]
+        rng.shuffle(by_popularity)
+        cum_weights = list(itertools.accumulate(zipf_weights(len(by_popularity), args.zipf)))
+        answers = 0
+        for batch in batches(range(args.answers)):
+            targets = rng.choices(by_popularity, cum_weights=cum_weights, k=len(batch))
+            rows = [
+                {"question_id": question_id, "user_id": rng.choice(user_ids),
+                 "text": sentence(rng, rng.randint(10, 60)),
+                 "created_at": now - timedelta(seconds=rng.randint(0, args.days * 86400))}
+                for question_id in targets
+            ]
+            await db.execute(insert(Answer), rows)
+            await db.commit()
+            answers += len(rows)
+        print(f"Ответов: {answers}")
+
+        await db.execute(text(
+            """
+            UPDATE question q
+            SET answer_count = s.answer_count, last_answer_at = s.last_answer_at
+            FROM (
+                SELECT question_id, count(*) AS answer_count, max(created_at) AS last_answer_at
+                FROM answer WHERE question_id = ANY(:ids) GROUP BY question_id
+            ) s
+            WHERE q.id = s.question_id
+            """
+        ), {"ids": question_ids})
+        await db.commit()
+        await db.execute(text("ANALYZE users, question, answer"))
+        print(f"Готово за {time.perf_counter() - started:.1f} с")
+
+    await engine.dispose()
+    os.makedirs(os.path.dirname(args.manifest) or ".", exist_ok=True)
+    with open(args.manifest, "w", encoding="utf-8") as f:
+        json.dump({
+            "password": PASSWORD,
+            "emails": [f"{EMAIL_PREFIX}{i}{EMAIL_DOMAIN}" for i in range(args.users)],
+            "question_ids": by_popularity,
+            "zipf": args.zipf,
+        }, f)
+    print(f"Манифест: {args.manifest}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--questions", type=int, default=20000)
+    parser.add_argument("--answers", type=int, default=200000)
+    parser.add_argument("--zipf", type=float, default=1.1, help="Показатель распределения популярности вопросов")
+    parser.add_argument("--days", type=int, default=365, help="За сколько дней распределены даты создания")
+    parser.add_argument("--seed", type=int, default=42, help="Зерно генератора: одинаковое зерно — одинаковые данные")
+    parser.add_argument("--reset", action="store_true", help="Удалить ранее созданных bench-пользователей и их данные")
+    parser.add_argument("--manifest", default="benchmarks/results/seed.json", help="Куда записать манифест")
+    asyncio.run(seed(parser.parse_args()))
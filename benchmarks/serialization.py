@@ -0,0 +1,83 @@
+"""Стоимость сериализации списка вопросов: Pydantic по ORM-объектам против строк Row и orjson.
+
+Поднимает минимальное ASGI-приложение с двумя эндпоинтами, отдающими одну и ту же страницу:
+/orm возвращает ORM-объекты Question через response_model (как было), /rows — строки
+crud.QUESTION_ROW_COLUMNS через ORJSONResponse. Данные готовятся заранее, поэтому
+разница в стоимости загрузки ORM-объектов из БД сюда не входит и выигрыш в реальном запросе больше.
+
+Запуск из корня проекта:
+    python -m benchmarks.serialization --sizes 100 1000 10000 --repeat 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta
+import httpx
+from fastapi import FastAPI
+from sqlalchemy.engine.result import result_tuple
+import apps.auth.models
+from apps.qna import schemas
+from apps.qna.crud import QUESTION_ROW_COLUMNS
+from apps.qna.models import Question
+from apps.qna.routes import _rows_response
+
+
+def make_data(size: int):
+    started = datetime(2026, 1, 1, 12, 0, 0, 123456)
+    values = [
+        (i, f"Вопрос номер {i}: как ускорить сериализацию JSON?", f"author-{i % 97}",
+         started - timedelta(seconds=i), i % 13, started - timedelta(seconds=i // 2) if i % 13 else None)
+        for i in range(size)
+    ]
+    keys = [column.key for column in QUESTION_ROW_COLUMNS]
+    make_row = result_tuple(keys)
+    rows = [make_row(value) for value in values]
+    questions = [Question(**dict(zip(keys, value))) for value in values]
+    return questions, rows
+
+
+def build_app(questions, rows) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/orm", response_model=schemas.QuestionListResponse)
+    async def orm():
+        return {"items": questions, "next_cursor": None}
+
+    @app.get("/rows", response_model=schemas.QuestionListResponse)
+    async def fast_rows():
+        return _rows_response(rows, None)
+
+    return app
+
+
+async def measure(client: httpx.AsyncClient, path: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = await client.get(path)
+        response.raise_for_status()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+async def main(args):
+    print(f"{'строк':>8} {'orm, мс':>10} {'rows, мс':>10} {'ускорение':>10}")
+    for size in args.sizes:
+        questions, rows = make_data(size)
+        app = build_app(questions, rows)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            orm_body = (await client.get("/orm")).json()
+            rows_body = (await client.get("/rows")).json()
+            if orm_body != rows_body:
+                raise SystemExit(f"Ответы /orm и /rows различаются при {size} строках")
+            orm_ms = await measure(client, "/orm", args.repeat)
+            rows_ms = await measure(client, "/rows", args.repeat)
+        print(f"{size:>8} {orm_ms:>10.2f} {rows_ms:>10.2f} {orm_ms / rows_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="Размеры страницы")
+    parser.add_argument("--repeat", type=int, default=20, help="Запросов на каждый размер и режим")
+    asyncio.run(main(parser.parse_args()))
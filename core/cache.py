@@ -0,0 +1,114 @@
+from collections import OrderedDict
+from typing import Optional
+from core.config import config
+from core.metrics import Counter
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Доля попаданий: hit / (hit + miss) по метке cache
+cache_requests_total = Counter("qna_cache_requests_total", "Обращения к кэшам по результату", ["cache", "result"])
+
+
+class CacheBackend:
+    """Интерфейс кэша. Значения — bytes, ttl — время жизни записи в секундах."""
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def add(self, key: str, value: bytes, ttl: float) -> bool:
+        """Записывает значение, только если ключа нет. False — ключ уже есть."""
+        raise NotImplementedError
+
+    async def delete(self, *keys: str) -> None:
+        raise NotImplementedError
+
+
+class LRUCache(CacheBackend):
+    """Кэш в памяти процесса с вытеснением давно неиспользуемых записей.
+
+    Инвалидация видна только текущему процессу: при нескольких воркерах uvicorn
+    устаревание ограничено ttl записи.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def add(self, key: str, value: bytes, ttl: float) -> bool:
+        if await self.get(key) is not None:
+            return False
+        await self.set(key, value, ttl)
+        return True
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._data.pop(key, None)
+
+
+class RedisCache(CacheBackend):
+    """Общий для всех воркеров кэш в Redis. Ошибки Redis не ломают запрос — кэш просто пропускается."""
+
+    def __init__(self, url: str, namespace: str):
+        import redis.asyncio as redis  # опциональная зависимость, нужна только для CACHE_BACKEND=redis
+
+        self._redis = redis.from_url(url)
+        self._prefix = f"qna:{namespace}:"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            return await self._redis.get(self._prefix + key)
+        except Exception as e:
+            logger.warning("Ошибка чтения из Redis, ключ %s: %s", key, e)
+            return None
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        try:
+            await self._redis.set(self._prefix + key, value, px=int(ttl * 1000))
+        except Exception as e:
+            logger.warning("Ошибка записи в Redis, ключ %s: %s", key, e)
+
+    async def add(self, key: str, value: bytes, ttl: float) -> bool:
+        try:
+            return bool(await self._redis.set(self._prefix + key, value, px=int(ttl * 1000), nx=True))
+        except Exception as e:
+            logger.warning("Ошибка записи в Redis, ключ %s: %s", key, e)
+            return False
+
+    async def delete(self, *keys: str) -> None:
+        if not keys:
+            return
+        try:
+            await self._redis.delete(*(self._prefix + key for key in keys))
+        except Exception as e:
+            logger.error("Ошибка удаления ключей из Redis %s: %s", keys, e)
+
+
+def create_cache(namespace: str, max_entries: int) -> CacheBackend:
+    """Создаёт кэш выбранного в CACHE_BACKEND типа для указанного пространства имён."""
+    if config.CACHE_BACKEND == "redis":
+        logger.info("Кэш %s: Redis (%s)", namespace, config.CACHE_REDIS_URL)
+        return RedisCache(config.CACHE_REDIS_URL, namespace)
+    logger.info("Кэш %s: LRU в памяти процесса, до %s записей", namespace, max_entries)
+    return LRUCache(max_entries)
@@ -13,20 +13,141 @@ class Config:
         self.DB_NAME = os.getenv("DB_NAME")
         self.DATABASE_URL = f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
+        # Connection pool: на каждый процесс uvicorn приходится до DB_POOL_SIZE + DB_MAX_OVERFLOW соединений
+        self.DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+        self.DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+        self.DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+        self.DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+        self.DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "Yes").lower() == "yes"
+        self.DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))  # 0 — без ограничения
+        self.DB_PREPARED_STATEMENT_CACHE_SIZE = int(os.getenv("DB_PREPARED_STATEMENT_CACHE_SIZE", "100"))
+        self.DB_CONNECT_TIMEOUT = float(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+
+        # Startup: check — сверить ревизию БД с head миграций Alembic (схему создаёт alembic upgrade head),
+        # create_all — создать недостающие таблицы по моделям (локальная разработка), skip — ничего не делать
+        self.DB_STARTUP_MODE = os.getenv("DB_STARTUP_MODE", "check").lower()
+
+        # Read replicas: "host:port,host:port" с теми же пользователем, паролем и именем БД, что и primary
+        self.DB_REPLICA_URLS = [
+            f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASSWORD}@{host.strip()}/{self.DB_NAME}"
+            for host in os.getenv("DB_REPLICA_HOSTS", "").split(",") if host.strip()
+        ]
+        self.DB_REPLICA_RETRY_SECONDS = float(os.getenv("DB_REPLICA_RETRY_SECONDS", "30"))  # пауза для недоступной реплики
+        self.READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))  # чтение с primary после записи
+
         self.SECRET_KEY = os.getenv("SECRET_KEY")
         self.ALGORITHM = "HS256"
         self.ACCESS_TOKEN_EXPIRE_MINUTES = 10
 
+        # Отзыв токенов: как часто процесс дочитывает отозванные jti в свой фильтр Блума (столько же отзыв
+        # в других процессах может запаздывать), минимальная ёмкость фильтра и доля ложных срабатываний,
+        # каждое из которых стоит запроса к БД
+        self.REVOCATION_SYNC_INTERVAL = float(os.getenv("REVOCATION_SYNC_INTERVAL", "2"))
+        self.REVOCATION_FILTER_CAPACITY = int(os.getenv("REVOCATION_FILTER_CAPACITY", "100000"))
+        self.REVOCATION_FILTER_ERROR_RATE = float(os.getenv("REVOCATION_FILTER_ERROR_RATE", "0.001"))
+        self.REVOCATION_PURGE_INTERVAL = float(os.getenv("REVOCATION_PURGE_INTERVAL", "3600"))
+
+        # Password hashing: cost factor bcrypt, размер пула потоков и глубина очереди
+        self.BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+        self.PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.PASSWORD_HASH_QUEUE_DEPTH = int(os.getenv("PASSWORD_HASH_QUEUE_DEPTH", "64"))
+
+        # Cache settings: memory (LRU в процессе) или redis (общий для всех воркеров)
+        self.CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+        self.CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+        # Кэш пользователей по subject токена; TTL не больше срока жизни access-токена
+        self.USER_CACHE_TTL_SECONDS = min(
+            int(os.getenv("USER_CACHE_TTL_SECONDS", "60")), self.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        )
+        self.USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+        # Кэш готовых ответов GET /questions/{id}
+        self.QUESTION_CACHE_TTL_SECONDS = int(os.getenv("QUESTION_CACHE_TTL_SECONDS", "300"))
+        self.QUESTION_CACHE_MAX_ENTRIES = int(os.getenv("QUESTION_CACHE_MAX_ENTRIES", "5000"))
+        # Сколько ответов отдаётся вместе с вопросом; остальные — через GET /questions/{id}/answers
+        self.QUESTION_DETAIL_ANSWERS = int(os.getenv("QUESTION_DETAIL_ANSWERS", "20"))
+
+        # Near-duplicates: поиск похожих вопросов при создании (MinHash LSH-индекс в памяти каждого процесса)
+        self.DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "Yes").lower() == "yes"
+        self.DEDUP_MIN_SIMILARITY = float(os.getenv("DEDUP_MIN_SIMILARITY", "0.6"))  # коэффициент Жаккара 4-грамм
+        self.DEDUP_MAX_CANDIDATES = int(os.getenv("DEDUP_MAX_CANDIDATES", "5"))
+        self.DEDUP_REFRESH_INTERVAL = float(os.getenv("DEDUP_REFRESH_INTERVAL", "10"))  # подгрузка новых вопросов
+
+        # Related questions: TF-IDF-индекс вопросов в памяти каждого процесса для GET /questions/{id}/related
+        self.RELATED_ENABLED = os.getenv("RELATED_ENABLED", "Yes").lower() == "yes"
+        # Снимок индекса от rebuild_related.py; пусто — индекс строится из БД при старте
+        self.RELATED_INDEX_PATH = os.getenv("RELATED_INDEX_PATH", "")
+        self.RELATED_REFRESH_INTERVAL = float(os.getenv("RELATED_REFRESH_INTERVAL", "10"))  # подгрузка новых вопросов
+
+        # Trending: лента вопросов по затухающему числу ответов (GET /questions/trending, таблица question_trend)
+        # Вопросы, у которых затухающее число ответов меньше веса одного ответа этого возраста, в ленту не попадают
+        self.TRENDING_WINDOW_HOURS = float(os.getenv("TRENDING_WINDOW_HOURS", str(7 * 24)))
+        self.TRENDING_MAX_AGE_SECONDS = int(os.getenv("TRENDING_MAX_AGE_SECONDS", "5"))  # Cache-Control страниц ленты
+
+        # Pub/sub для push-уведомлений (GET /questions/{id}/events): memory — только подписчики процесса,
+        # опубликовавшего событие (один воркер), postgres — LISTEN/NOTIFY между всеми воркерами
+        self.PUBSUB_BACKEND = os.getenv("PUBSUB_BACKEND", "memory").lower()
+        # Сообщений в очереди одной подписки; при переполнении подписка закрывается и клиент переподключается
+        self.PUBSUB_SUBSCRIBER_QUEUE = int(os.getenv("PUBSUB_SUBSCRIBER_QUEUE", "32"))
+        self.PUBSUB_MAX_SUBSCRIBERS = int(os.getenv("PUBSUB_MAX_SUBSCRIBERS", "50000"))  # подписок на процесс
+        self.PUBSUB_RECONNECT_SECONDS = float(os.getenv("PUBSUB_RECONNECT_SECONDS", "2"))  # пауза перед переподключением LISTEN
+        # Комментарий SSE в простаивающий поток: прокси не закрывают соединение, отключившийся клиент обнаруживается
+        self.SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+
+        # Export: строк на одну выборку серверного курсора и размер отдаваемого блока в байтах
+        self.EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", "1000"))
+        self.EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", str(64 * 1024)))
+
+        # Import: вопросов в одной транзакции и сколько ошибок строк возвращать в ответе API
+        self.IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+        self.IMPORT_MAX_REPORTED_ERRORS = int(os.getenv("IMPORT_MAX_REPORTED_ERRORS", "100"))
+
+        # Idempotency-Key: сколько хранится ответ, через сколько незавершённый запрос считается прерванным
+        # и сколько повтор ждёт завершения выполняющегося запроса с тем же ключом
+        self.IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+        self.IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+        self.IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+        self.IDEMPOTENCY_PURGE_INTERVAL = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL", "3600"))
+
         # SMTP settings
-        self.SMTP_ENABLED = os.getenv("SMTP", "No").lower() == "yes"
+        self.SMTP_ENABLED = os.getenv("SMTP_ENABLED", os.getenv("SMTP", "No")).lower() == "yes"
         self.SMTP_HOST = os.getenv("SMTP_HOST") if self.SMTP_ENABLED else None
         self.SMTP_PORT = int(os.getenv("SMTP_PORT")) if self.SMTP_ENABLED and os.getenv("SMTP_PORT") else None
         self.SMTP_USER = os.getenv("SMTP_USER") if self.SMTP_ENABLED else None
         self.SMTP_PASSWORD = os.getenv("SMTP_PASSWORD") if self.SMTP_ENABLED else None
         self.SMTP_FROM = os.getenv("SMTP_FROM") if self.SMTP_ENABLED else None
+        self.SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+
+        # Email outbox: письма пишутся в таблицу в транзакции регистрации и отправляются фоновым воркером
+        self.EMAIL_OUTBOX_WORKER_IN_APP = os.getenv("EMAIL_OUTBOX_WORKER_IN_APP", "Yes").lower() == "yes"
+        self.EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "50"))
+        self.EMAIL_OUTBOX_POLL_INTERVAL = float(os.getenv("EMAIL_OUTBOX_POLL_INTERVAL", "2"))
+        self.EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "8"))
+        self.EMAIL_OUTBOX_BACKOFF_SECONDS = int(os.getenv("EMAIL_OUTBOX_BACKOFF_SECONDS", "30"))
+        self.EMAIL_OUTBOX_MAX_BACKOFF_SECONDS = int(os.getenv("EMAIL_OUTBOX_MAX_BACKOFF_SECONDS", "3600"))
 
         self.BASE_URL = os.getenv("BASE_URL")
 
+        # Logging: уровень корневого логгера, формат (text или json) и уровни отдельных модулей
+        self.LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+        self.LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+        self.LOG_LEVELS = dict(
+            (name.strip(), level.strip().upper())
+            for name, level in (item.split("=", 1) for item in os.getenv("LOG_LEVELS", "").split(",") if "=" in item)
+        )  # например: apps.qna=DEBUG,sqlalchemy.engine=WARNING
+        # Частые DEBUG-сообщения этих логгеров пишутся выборочно, с долей LOG_DEBUG_SAMPLE_RATE
+        self.LOG_SAMPLED_LOGGERS = [
+            name.strip() for name in os.getenv("LOG_SAMPLED_LOGGERS", "core.dependencies").split(",") if name.strip()
+        ]
+        self.LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.01"))
+
+        # Profiling: заголовок Server-Timing, учёт SQL и профилировщик по запросу администратора
+        self.PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "No").lower() == "yes"
+        # Сколько одинаковых SQL-запросов за один HTTP-запрос допустимо, прежде чем считать это N+1
+        self.PROFILING_N_PLUS_ONE_THRESHOLD = int(os.getenv("PROFILING_N_PLUS_ONE_THRESHOLD", "10"))
+
+        # Health checks: сколько секунд ждать ответа БД в /readyz
+        self.HEALTHCHECK_TIMEOUT = float(os.getenv("HEALTHCHECK_TIMEOUT", "2"))
+
 
 config = Config()
 
@@ -1,7 +1,10 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker, declarative_base
+from typing import List
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine
+from sqlalchemy.orm import declarative_base
 from core.config import config
+from core.metrics import CallbackGauge
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -9,12 +12,94 @@ logger = logging.getLogger(__name__)
 logger.debug("Создание декларативной базы SQLAlchemy")
 Base = declarative_base()
 
+
+def create_engine_from_config(url: str) -> AsyncEngine:
+    """Создаёт асинхронный движок с настройками пула из core.config."""
+    connect_args = {
+        "prepared_statement_cache_size": config.DB_PREPARED_STATEMENT_CACHE_SIZE,
+        "timeout": config.DB_CONNECT_TIMEOUT,
+    }
+    if config.DB_STATEMENT_TIMEOUT_MS:
+        connect_args["server_settings"] = {"statement_timeout": str(config.DB_STATEMENT_TIMEOUT_MS)}
+    return create_async_engine(
+        url,
+        echo=False,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        pool_pre_ping=config.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+
+
+def get_pool_status(db_engine: AsyncEngine = None) -> dict:
+    """Текущее состояние пула соединений движка."""
+    pool = (db_engine or engine).pool
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        # QueuePool.overflow() отсчитывается от -pool_size, пока не открыты все постоянные соединения
+        "overflow": max(0, pool.overflow()),
+    }
+
+
+class ReplicaRouter:
+    """Выбор реплики для чтения: round-robin с временным исключением недоступных реплик."""
+
+    def __init__(self, session_makers: List[async_sessionmaker], retry_after: float):
+        self.session_makers = session_makers
+        self.retry_after = retry_after
+        self._next = 0
+        self._down_until = [0.0] * len(session_makers)
+
+    def __bool__(self):
+        return bool(self.session_makers)
+
+    def candidates(self) -> List[int]:
+        """Индексы доступных реплик в порядке очереди round-robin."""
+        count = len(self.session_makers)
+        start = self._next
+        self._next = (self._next + 1) % count
+        now = time.monotonic()
+        return [i % count for i in range(start, start + count) if self._down_until[i % count] <= now]
+
+    def mark_down(self, index: int):
+        self._down_until[index] = time.monotonic() + self.retry_after
+        logger.warning("Реплика %s недоступна, исключена на %s с", index, self.retry_after)
+
+
 # Создание асинхронного движка
-logger.info(f"Инициализация асинхронного движка базы данных с URL: {config.DATABASE_URL}")
-engine = create_async_engine(config.DATABASE_URL, echo=False)
-logger.debug("Асинхронный движок базы данных успешно создан")
+logger.info("Инициализация асинхронного движка базы данных: %s:%s/%s", config.DB_HOST, config.DB_PORT, config.DB_NAME)
+engine = create_engine_from_config(config.DATABASE_URL)
+logger.info(
+    "Пул соединений: pool_size=%s, max_overflow=%s, recycle=%ss, pre_ping=%s, statement_timeout=%sms",
+    config.DB_POOL_SIZE, config.DB_MAX_OVERFLOW, config.DB_POOL_RECYCLE, config.DB_POOL_PRE_PING,
+    config.DB_STATEMENT_TIMEOUT_MS,
+)
 
-# Настройка фабрики сессий
+# Единая фабрика сессий для зависимостей FastAPI, админки, воркеров и скриптов
 logger.debug("Настройка фабрики сессий SQLAlchemy")
-async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+async_session = async_sessionmaker(engine, expire_on_commit=False)
 logger.info("Фабрика асинхронных сессий успешно настроена")
+
+# Реплики для чтения (DB_REPLICA_HOSTS); без них все чтения идут в primary
+replica_engines = [create_engine_from_config(url) for url in config.DB_REPLICA_URLS]
+replica_router = ReplicaRouter(
+    [async_sessionmaker(replica, expire_on_commit=False) for replica in replica_engines],
+    retry_after=config.DB_REPLICA_RETRY_SECONDS,
+)
+if replica_engines:
+    logger.info("Настроено реплик для чтения: %s", len(replica_engines))
+
+
+def _pool_metrics(key: str):
+    engines = {"primary": engine, **{f"replica{index}": replica for index, replica in enumerate(replica_engines)}}
+    return {(name,): get_pool_status(db_engine)[key] for name, db_engine in engines.items()}
+
+
+CallbackGauge("qna_db_pool_size", "Постоянные соединения пула", ["engine"], lambda: _pool_metrics("pool_size"))
+CallbackGauge("qna_db_pool_checked_out", "Соединения, выданные из пула", ["engine"], lambda: _pool_metrics("checked_out"))
+CallbackGauge("qna_db_pool_overflow", "Соединения сверх pool_size", ["engine"], lambda: _pool_metrics("overflow"))
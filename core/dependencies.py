@@ -1,18 +1,81 @@
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
-from core.database import async_session
+from sqlalchemy.orm import Session
+from core.database import async_session, replica_router
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
-async def get_db():
+# Cookie, по которой чтения клиента после его собственной записи идут в primary
+READ_YOUR_WRITES_COOKIE = "qna_rw"
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_request_write(session, flush_context):
+    # Сессия из get_db знает состояние своего запроса; ReadYourWritesMiddleware выставит cookie
+    request_state = session.info.get("request_state")
+    if request_state is not None:
+        request_state.db_wrote = True
+
+
+async def get_db(request: Request):
     logger.debug("Открытие новой сессии базы данных")
     async with async_session() as session:
+        session.info["request_state"] = request.state
         logger.debug("Сессия базы данных успешно предоставлена")
         yield session
         logger.debug("Закрытие сессии базы данных")
 
+
+def use_replica(request: Optional[Request]) -> bool:
+    """Можно ли читать с реплики: реплики настроены и клиент недавно ничего не записывал.
+
+    Недавнюю запись отмечает ReadYourWritesMiddleware: cookie или read_primary в состоянии запроса.
+    """
+    if not replica_router:
+        return False
+    if request is None:
+        return True
+    return not (request.cookies.get(READ_YOUR_WRITES_COOKIE) or getattr(request.state, "read_primary", False))
+
+
+async def _open_read_session(request: Optional[Request]) -> AsyncSession:
+    if use_replica(request):
+        for index in replica_router.candidates():
+            session = replica_router.session_makers[index]()
+            try:
+                # Соединение берётся сразу, чтобы недоступная реплика обнаружилась до выполнения запросов
+                await session.connection()
+                return session
+            except (OSError, asyncio.TimeoutError, SQLAlchemyError) as e:
+                logger.error("Ошибка подключения к реплике %s: %s", index, e)
+                replica_router.mark_down(index)
+                await session.close()
+        logger.warning("Нет доступных реплик, чтение из primary")
+    return async_session()
+
+
+@asynccontextmanager
+async def read_session(request: Optional[Request] = None):
+    """Сессия только для чтения: реплика по round-robin или primary (read-your-writes, нет реплик)."""
+    session = await _open_read_session(request)
+    async with session:
+        yield session
+
+
+async def get_read_db(request: Request):
+    logger.debug("Открытие сессии базы данных для чтения")
+    async with read_session(request) as session:
+        yield session
+        logger.debug("Закрытие сессии базы данных для чтения")
+
+
 async def get_db_session() -> AsyncSession:
+    """Новая сессия вне зависимостей FastAPI. Закрывается вызывающим кодом: `async with session:`."""
     logger.debug("Создание новой сессии базы данных")
-    async with async_session() as session:
-        logger.debug("Сессия базы данных успешно создана")
-        return session
+    return async_session()
@@ -1,43 +1,78 @@
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
+from email.message import EmailMessage
+from typing import List, Optional, Tuple
 from core.config import config
+from core.metrics import Counter
+import aiosmtplib
 import logging
-import asyncio
 
 logger = logging.getLogger(__name__)
 
-def get_mail_conf():
-    if not config.SMTP_ENABLED:
-        logger.warning("SMTP отключен, отправка писем невозможна")
-        return None
-    return ConnectionConfig(
-        MAIL_USERNAME=config.SMTP_USER,
-        MAIL_PASSWORD=config.SMTP_PASSWORD,
-        MAIL_FROM=config.SMTP_FROM,
-        MAIL_PORT=config.SMTP_PORT,
-        MAIL_SERVER=config.SMTP_HOST,
-        MAIL_STARTTLS=(config.SMTP_PORT == 587),
-        MAIL_SSL_TLS=(config.SMTP_PORT == 465),
-        USE_CREDENTIALS=True,
-        VALIDATE_CERTS=True
+email_send_total = Counter("qna_email_send_total", "Попытки отправки писем по результату", ["outcome"])
+
+async def send_batch(messages: List[Tuple[str, str, str]]) -> List[Optional[str]]:
+    """Отправляет пачку писем (to_email, subject, body) через одно SMTP-соединение.
+
+    Возвращает для каждого письма None при успехе или текст ошибки. Ошибки подключения
+    и авторизации пробрасываются: в этом случае не отправлено ни одно письмо. Если соединение
+    разорвано посреди пачки, возвращаются результаты до письма, на котором это произошло, включительно:
+    список короче messages, остальные письма не отправлялись.
+    """
+    smtp = aiosmtplib.SMTP(
+        hostname=config.SMTP_HOST,
+        port=config.SMTP_PORT,
+        username=config.SMTP_USER or None,
+        password=config.SMTP_PASSWORD or None,
+        use_tls=(config.SMTP_PORT == 465),
+        start_tls=True if config.SMTP_PORT == 587 else None,
+        timeout=config.SMTP_TIMEOUT,
     )
+    results: List[Optional[str]] = []
+    logger.debug("Подключение к SMTP %s:%s для отправки %s писем", config.SMTP_HOST, config.SMTP_PORT, len(messages))
+    try:
+        await smtp.connect()
+    except Exception:
+        # Ни одно письмо пачки не отправлено
+        email_send_total.labels("connection_error").inc(len(messages))
+        raise
+    async with smtp:
+        for to_email, subject, body in messages:
+            message = EmailMessage()
+            message["From"] = config.SMTP_FROM
+            message["To"] = to_email
+            message["Subject"] = subject
+            message.set_content(body)
+            try:
+                await smtp.send_message(message)
+                results.append(None)
+                email_send_total.labels("sent").inc()
+                logger.info("Письмо успешно отправлено на %s", to_email)
+            except (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPTimeoutError) as e:
+                # Состояние соединения неизвестно: остальные письма пачки не отправляются
+                logger.error(
+                    "SMTP-соединение прервано при отправке письма на %s, не отправлено писем пачки: %s: %s",
+                    to_email, len(messages) - len(results) - 1, e,
+                )
+                email_send_total.labels("connection_error").inc()
+                results.append(str(e))
+                break
+            except aiosmtplib.SMTPException as e:
+                # Отказ сервера по этому письму (в том числе SMTPRecipientsRefused), соединение пригодно для следующих
+                logger.error("Ошибка при отправке письма на %s: %s", to_email, e)
+                email_send_total.labels("rejected").inc()
+                results.append(str(e))
+    return results
 
-fm = FastMail(get_mail_conf()) if config.SMTP_ENABLED else None
 
 async def send_email(to_email: str, subject: str, body: str):
-    """Асинхронная отправка email через SMTP."""
-    if not config.SMTP_ENABLED or fm is None:
-        logger.info(f"Отправка письма на {to_email} отклонена, так как SMTP отключен")
+    """Асинхронная отправка одного письма через SMTP, минуя outbox."""
+    if not config.SMTP_ENABLED:
+        logger.info("Отправка письма на %s отклонена, так как SMTP отключен", to_email)
         return
-    logger.info(f"Начало отправки письма на {to_email}, тема: {subject}")
-    message = MessageSchema(
-        subject=subject,
-        recipients=[to_email],
-        body=body,
-        subtype=MessageType.plain
-    )
+    logger.info("Начало отправки письма на %s, тема: %s", to_email, subject)
     try:
-        await fm.send_message(message)
-        logger.info(f"Письмо успешно отправлено на {to_email}")
+        errors = await send_batch([(to_email, subject, body)])
     except Exception as e:
-        logger.error(f"Ошибка при отправке письма на {to_email}: {str(e)}", exc_info=True)
-        raise
\ No newline at end of file
+        logger.error("Ошибка при отправке письма на %s: %s", to_email, e, exc_info=True)
+        raise
+    if errors[0] is not None:
+        raise aiosmtplib.SMTPException(errors[0])
@@ -0,0 +1,275 @@
+"""Идемпотентные POST-запросы по заголовку Idempotency-Key.
+
+Первый запрос с ключом захватывает запись (user_id, key) в отдельной короткой транзакции
+(INSERT ... ON CONFLICT), выполняет обработчик и сохраняет ответ в той же транзакции, что и
+созданную запись: зафиксированы либо обе, либо ни одна. Повтор с тем же ключом получает
+сохранённый ответ без повторного выполнения обработчика; повтор, пришедший пока первый запрос
+ещё выполняется, ждёт его завершения. Если захват истёк и ключ перехватил повтор, сохранение
+ответа первым запросом не находит своего захвата и его транзакция откатывается — вставка
+выполняется ровно один раз.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta, UTC
+from typing import Any, Awaitable, Callable, Optional
+from fastapi import HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import Column, String, Integer, LargeBinary, DateTime, ForeignKey, Index, delete, update, func, or_, and_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.config import config
+from core.database import Base, async_session
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_key"
+    __table_args__ = (
+        # Очистка устаревших ключей
+        Index("ix_idempotency_key_expires_at", "expires_at"),
+        {'comment': 'Idempotency keys'},
+    )
+
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    key = Column(String(MAX_KEY_LENGTH), primary_key=True)
+    request_hash = Column(String(64), nullable=False)  # sha256 метода, пути, параметров и тела запроса
+    status = Column(String, nullable=False, default="in_progress", server_default="in_progress")  # in_progress / completed
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
+    locked_until = Column(DateTime, nullable=False)  # после этого момента незавершённый запрос считается прерванным
+    expires_at = Column(DateTime, nullable=False)
+
+
+def _now() -> datetime:
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+async def request_fingerprint(request: Request) -> str:
+    """Отпечаток запроса: повтор с тем же ключом, но другим телом — ошибка клиента."""
+    digest = hashlib.sha256(f"{request.method} {request.url.path}?{request.url.query}\n".encode("utf-8"))
+    digest.update(await request.body())
+    return digest.hexdigest()
+
+
+# Сохраняет ответ в транзакции обработчика; вызывается до её фиксации
+Complete = Callable[[Any], Awaitable[None]]
+
+
+class _ClaimLost(Exception):
+    """Захват ключа истёк и ключ перехвачен другим запросом."""
+
+
+async def _claim(user_id: str, key: str, request_hash: str) -> Optional[datetime]:
+    """Захватывает ключ. Истёкший ключ и ключ прерванного запроса с тем же телом захватываются заново.
+
+    Возвращает locked_until захвата — по нему запрос отличает свой захват от перехваченного; None — ключ занят.
+    """
+    now = _now()
+    statement = pg_insert(IdempotencyKey).values(
+        user_id=user_id,
+        key=key,
+        request_hash=request_hash,
+        status="in_progress",
+        locked_until=now + timedelta(seconds=config.IDEMPOTENCY_LOCK_SECONDS),
+        expires_at=now + timedelta(seconds=config.IDEMPOTENCY_TTL_SECONDS),
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[IdempotencyKey.user_id, IdempotencyKey.key],
+        set_={
+            "request_hash": statement.excluded.request_hash,
+            "status": "in_progress",
+            "status_code": None,
+            "response_body": None,
+            "created_at": func.now(),
+            "locked_until": statement.excluded.locked_until,
+            "expires_at": statement.excluded.expires_at,
+        },
+        where=or_(
+            IdempotencyKey.expires_at < now,
+            and_(
+                IdempotencyKey.status == "in_progress",
+                IdempotencyKey.locked_until < now,
+                IdempotencyKey.request_hash == statement.excluded.request_hash,
+            ),
+        ),
+    ).returning(IdempotencyKey.locked_until)
+    async with async_session() as db:
+        locked_until = (await db.execute(statement)).scalar()
+        await db.commit()
+    return locked_until
+
+
+def _owned(user_id: str, key: str, locked_until: datetime):
+    return and_(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.key == key,
+        IdempotencyKey.status == "in_progress",
+        IdempotencyKey.locked_until == locked_until,
+    )
+
+
+async def _store(db: AsyncSession, user_id: str, key: str, locked_until: datetime, status_code: int, body: bytes):
+    """Записывает ответ в транзакции db (без commit). _ClaimLost — захват перехвачен другим запросом.
+
+    UPDATE блокирует строку ключа: перехвативший запрос ждёт фиксации этой транзакции и затем не находит
+    своего захвата, поэтому зафиксировать результат может только один из них.
+    """
+    result = await db.execute(
+        update(IdempotencyKey)
+        .where(_owned(user_id, key, locked_until))
+        .values(status="completed", status_code=status_code, response_body=body)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        raise _ClaimLost(key)
+
+
+async def _complete(user_id: str, key: str, locked_until: datetime, status_code: int, body: bytes):
+    """Сохраняет ответ отдельной транзакцией: для отказов обработчика, которые ничего не записали."""
+    async with async_session() as db:
+        try:
+            await _store(db, user_id, key, locked_until, status_code, body)
+        except _ClaimLost:
+            return
+        await db.commit()
+
+
+async def _release(user_id: str, key: str, locked_until: datetime):
+    """Освобождает ключ после сбоя обработчика: повтор выполнит запрос заново.
+
+    Ключ с уже зафиксированным ответом (сбой после фиксации транзакции обработчика) не освобождается.
+    """
+    async with async_session() as db:
+        await db.execute(delete(IdempotencyKey).where(_owned(user_id, key, locked_until)))
+        await db.commit()
+
+
+async def _wait_for_result(user_id: str, key: str, request_hash: str) -> Optional[IdempotencyKey]:
+    """Ждёт завершения запроса, захватившего ключ. None — ключ освобождён, его можно захватить."""
+    deadline = asyncio.get_running_loop().time() + config.IDEMPOTENCY_WAIT_SECONDS
+    delay = 0.05
+    while True:
+        async with async_session() as db:
+            record = await db.get(IdempotencyKey, (user_id, key))
+        if record is None or record.expires_at < _now():
+            return None
+        if record.request_hash != request_hash:
+            raise HTTPException(status_code=422, detail=f"{IDEMPOTENCY_HEADER} уже использован с другим запросом")
+        if record.status == "completed":
+            return record
+        if record.locked_until < _now():
+            return None
+        if asyncio.get_running_loop().time() >= deadline:
+            raise HTTPException(status_code=409, detail=f"Запрос с этим {IDEMPOTENCY_HEADER} ещё выполняется")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.5)
+
+
+def _encode(content) -> bytes:
+    # Так же, как JSONResponse FastAPI: повтор получает побайтно тот же ответ
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def _replay(record: IdempotencyKey) -> Response:
+    return Response(
+        content=record.response_body,
+        status_code=record.status_code,
+        media_type="application/json",
+        headers={REPLAYED_HEADER: "true"},
+    )
+
+
+async def _replay_when_done(user_id: str, key: str, request_hash: str) -> Optional[Response]:
+    record = await _wait_for_result(user_id, key, request_hash)
+    if record is None:
+        return None
+    logger.info("Повтор запроса с %s %s пользователя %s, ответ из сохранённого", IDEMPOTENCY_HEADER, key, user_id)
+    return _replay(record)
+
+
+async def idempotent(
+        request: Request, db: AsyncSession, user_id: str, key: Optional[str],
+        handler: Callable[[Optional[Complete]], Awaitable[Any]],
+):
+    """Выполняет handler не больше одного раза на (user_id, key).
+
+    handler получает complete(result) (None — запрос без ключа) и вызывает его в своей транзакции в db
+    до фиксации: ответ сохраняется атомарно с созданной записью. Результат и HTTPException с кодом
+    меньше 500 отдаются повторам; при других ошибках ключ освобождается.
+    """
+    if key is None:
+        return await handler(None)
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"{IDEMPOTENCY_HEADER} должен содержать от 1 до {MAX_KEY_LENGTH} символов")
+
+    request_hash = await request_fingerprint(request)
+    while True:
+        locked_until = await _claim(user_id, key, request_hash)
+        if locked_until is not None:
+            break
+        replay = await _replay_when_done(user_id, key, request_hash)
+        if replay is not None:
+            return replay
+
+    stored = False
+
+    async def complete(result):
+        nonlocal stored
+        await _store(db, user_id, key, locked_until, 200, _encode(jsonable_encoder(result)))
+        stored = True
+
+    try:
+        result = await handler(complete)
+    except _ClaimLost:
+        # Захват истёк, пока выполнялся обработчик: его транзакция не зафиксирована, ответ — от перехватившего
+        await db.rollback()
+        logger.warning("Захват %s %s пользователя %s истёк до сохранения ответа", IDEMPOTENCY_HEADER, key, user_id)
+        replay = await _replay_when_done(user_id, key, request_hash)
+        if replay is None:
+            raise HTTPException(status_code=409, detail=f"Запрос с этим {IDEMPOTENCY_HEADER} ещё выполняется")
+        return replay
+    except HTTPException as e:
+        # Откат снимает блокировку строки ключа, если обработчик успел сохранить ответ, но не зафиксировал его
+        await db.rollback()
+        if e.status_code >= 500:
+            await _release(user_id, key, locked_until)
+            raise
+        await _complete(user_id, key, locked_until, e.status_code, _encode({"detail": e.detail}))
+        raise
+    except Exception:
+        await db.rollback()
+        await _release(user_id, key, locked_until)
+        raise
+    if not stored:
+        # Обработчик ничего не записал в БД: ответ сохраняется отдельно
+        await _complete(user_id, key, locked_until, 200, _encode(jsonable_encoder(result)))
+    return result
+
+
+async def purge_expired_keys() -> int:
+    """Удаляет истёкшие ключи. Возвращает количество удалённых."""
+    async with async_session() as db:
+        result = await db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < _now()))
+        await db.commit()
+    return result.rowcount
+
+
+async def run_purge_forever(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            purged = await purge_expired_keys()
+            if purged:
+                logger.info("Удалено %s истёкших ключей идемпотентности", purged)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Ошибка очистки ключей идемпотентности: %s", e)
@@ -0,0 +1,99 @@
+"""Неблокирующее логирование.
+
+Обработчики логгеров только кладут запись в очередь; форматирование и запись в stderr
+выполняет отдельный поток QueueListener. Уровни, формат и выборочное логирование
+отладочных сообщений настраиваются в core.config.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from typing import Optional
+from core.config import config
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись — одна JSON-строка."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler, который в вызывающем потоке только подставляет аргументы в сообщение.
+
+    Стандартный prepare() полностью форматирует запись (время, traceback) до постановки
+    в очередь; здесь это делает поток QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускает только долю rate DEBUG-сообщений; сообщения выше DEBUG проходят всегда."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+def setup_logging():
+    """Настраивает корневой логгер на очередь и запускает поток записи. Повторный вызов ничего не делает."""
+    global _listener
+    if _listener is not None:
+        return
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if config.LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers = [DeferredQueueHandler(log_queue)]
+    root.setLevel(config.LOG_LEVEL)
+
+    # Логи uvicorn тоже идут через очередь, а не пишутся синхронно своими обработчиками
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+
+    for name, level in config.LOG_LEVELS.items():
+        logging.getLogger(name).setLevel(level)
+
+    if config.LOG_DEBUG_SAMPLE_RATE < 1:
+        sampler = SamplingFilter(config.LOG_DEBUG_SAMPLE_RATE)
+        for name in config.LOG_SAMPLED_LOGGERS:
+            logging.getLogger(name).addFilter(sampler)
+
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Дописывает оставшиеся в очереди записи и останавливает поток записи."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
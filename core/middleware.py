@@ -0,0 +1,190 @@
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+from jose import jwt, JWTError
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from core.cache import create_cache
+from core.config import config
+from core.dependencies import READ_YOUR_WRITES_COOKIE
+from core.profiling import start_profile, end_profile
+from core.metrics import http_requests_total, http_request_duration_seconds, http_requests_in_progress, \
+    http_streams_open
+
+logger = logging.getLogger(__name__)
+
+
+def _token_subject(scope: Scope) -> Optional[str]:
+    """subject действительного Bearer-токена запроса или None."""
+    scheme, _, token = Request(scope).headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return jwt.decode(token, config.SECRET_KEY, algorithms=[config.ALGORITHM]).get("sub")
+    except JWTError:
+        return None
+
+
+class ReadYourWritesMiddleware:
+    """Направляет в primary чтения клиента, который недавно записал данные.
+
+    После запроса, записавшего данные в primary, ставится cookie. Если запрос был с Bearer-токеном,
+    subject токена ещё и запоминается на сервере на то же время: клиенты API часто не хранят cookie.
+    Пока жива cookie или запись о subject, get_read_db направляет чтения клиента в primary.
+    Записи хранятся в кэше CACHE_BACKEND: с memory их видит только процесс, выполнивший запись.
+    """
+
+    def __init__(self, app: ASGIApp, window_seconds: int):
+        self.app = app
+        self.window_seconds = window_seconds
+        self.cookie = (
+            f"{READ_YOUR_WRITES_COOKIE}=1; Max-Age={window_seconds}; Path=/; HttpOnly; SameSite=Lax"
+        )
+        # Одна запись на пользователя, как в кэше пользователей
+        self.recent_writers = create_cache("read_your_writes", config.USER_CACHE_MAX_ENTRIES)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        state = scope.setdefault("state", {})
+        subject = _token_subject(scope)
+        if subject is not None and await self.recent_writers.get(subject) is not None:
+            state["read_primary"] = True
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start" and state.get("db_wrote"):
+                MutableHeaders(scope=message).append("set-cookie", self.cookie)
+                if subject is not None:
+                    await self.recent_writers.set(subject, b"1", self.window_seconds)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class ProfilingMiddleware:
+    """Профилирование запросов (включается PROFILING_ENABLED).
+
+    Каждому ответу добавляется заголовок Server-Timing: время и число SQL-запросов, этапы,
+    отмеченные core.profiling.profiled (auth, bcrypt), и общее время обработки. Повторяющиеся
+    больше n_plus_one_threshold раз одинаковые SQL-запросы пишутся в лог как вероятный N+1.
+
+    С параметром ?profile=1 или заголовком X-Profile: 1 запрос администратора выполняется
+    под семплирующим профилировщиком pyinstrument, и вместо ответа возвращается HTML-отчёт.
+    is_admin(token) проверяет Bearer-токен; запросы остальных пользователей обрабатываются как обычно.
+    """
+
+    def __init__(self, app: ASGIApp, is_admin: Callable[[str], Awaitable[bool]], n_plus_one_threshold: int):
+        self.app = app
+        self.is_admin = is_admin
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        profile, token = start_profile()
+        try:
+            if await self._profiler_requested(scope):
+                await self._run_profiler(scope, receive, send)
+                return
+
+            async def send_wrapper(message: Message):
+                if message["type"] == "http.response.start":
+                    MutableHeaders(scope=message).append("server-timing", profile.server_timing())
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            end_profile(token)
+            self._report(scope, profile)
+
+    async def _profiler_requested(self, scope: Scope) -> bool:
+        request = Request(scope)
+        if request.query_params.get("profile") != "1" and request.headers.get("x-profile") != "1":
+            return False
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not token or not await self.is_admin(token):
+            logger.warning("Запрос профилирования без прав администратора: %s", scope["path"])
+            return False
+        return True
+
+    async def _run_profiler(self, scope: Scope, receive: Receive, send: Send):
+        try:
+            from pyinstrument import Profiler  # опциональная зависимость, нужна только для профилирования
+        except ImportError:
+            logger.error("pyinstrument не установлен, профилирование недоступно")
+            await PlainTextResponse("pyinstrument не установлен", status_code=501)(scope, receive, send)
+            return
+
+        async def discard(message: Message):
+            pass
+
+        profiler = Profiler(async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            profiler.stop()
+        await HTMLResponse(profiler.output_html())(scope, receive, send)
+
+    def _report(self, scope: Scope, profile):
+        logger.debug("%s %s: %s", scope["method"], scope["path"], profile.server_timing())
+        for statement, count in profile.repeated_statements(self.n_plus_one_threshold):
+            logger.warning(
+                "Возможный N+1 в %s %s: запрос выполнен %s раз: %s",
+                scope["method"], scope["path"], count, " ".join(statement.split())[:300],
+            )
+
+
+class MetricsMiddleware:
+    """Считает HTTP-запросы по маршруту и статусу, время обработки и число запросов в работе.
+
+    Маршрут — шаблон пути FastAPI (/questions/{id}), чтобы число меток не зависело от id;
+    для админки — путь монтирования, запросы, не попавшие ни в один маршрут, — "unmatched".
+    Ответы text/event-stream с момента отправки заголовков учитываются в qna_http_streams_open,
+    а не в запросах в работе, и не попадают в гистограмму времени обработки.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status = 500
+        in_progress = http_requests_in_progress.labels(method)
+        in_progress.inc()
+        stream = None
+        started = time.perf_counter()
+
+        def route_path() -> str:
+            route = scope.get("route")
+            # Для смонтированных приложений (админка) маршрут — путь монтирования
+            return getattr(route, "path", None) or scope.get("root_path") or "unmatched"
+
+        async def send_wrapper(message: Message):
+            nonlocal status, stream
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                content_type = MutableHeaders(raw=message["headers"]).get("content-type", "")
+                if content_type.startswith("text/event-stream"):
+                    stream = http_streams_open.labels(route_path())
+                    in_progress.dec()
+                    stream.inc()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            path = route_path()
+            http_requests_total.labels(method, path, str(status)).inc()
+            if stream is not None:
+                stream.dec()
+            else:
+                in_progress.dec()
+                http_request_duration_seconds.labels(method, path).observe(time.perf_counter() - started)
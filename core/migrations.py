@@ -0,0 +1,63 @@
+"""Проверка схемы БД при старте приложения.
+
+Схему создают и обновляют миграции Alembic (alembic upgrade head). При старте процесс
+не интроспектирует каталог, а одним запросом сверяет ревизию в alembic_version с head
+из alembic/versions, и при расхождении завершается с понятной ошибкой.
+"""
+import logging
+import os
+from alembic.config import Config as AlembicConfig
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from core.database import Base
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP_MODES = ("check", "create_all", "skip")
+
+
+class SchemaNotReadyError(RuntimeError):
+    """БД не на head-ревизии миграций."""
+
+
+def get_head_revisions() -> set[str]:
+    """Head-ревизии из alembic/versions (читаются файлы миграций, к БД не обращается)."""
+    alembic_config = AlembicConfig(os.path.join(PROJECT_ROOT, "alembic.ini"))
+    alembic_config.set_main_option("script_location", os.path.join(PROJECT_ROOT, "alembic"))
+    return set(ScriptDirectory.from_config(alembic_config).get_heads())
+
+
+async def check_schema_revision(db_engine: AsyncEngine):
+    """Сверяет ревизию БД с head миграций; SchemaNotReadyError, если миграции не применены."""
+    heads = get_head_revisions()
+    try:
+        async with db_engine.connect() as conn:
+            current = set((await conn.execute(text("SELECT version_num FROM alembic_version"))).scalars())
+    except DBAPIError as e:
+        # Нет таблицы alembic_version — к базе ни разу не применялись миграции
+        raise SchemaNotReadyError(f"Не удалось прочитать ревизию схемы БД, выполните alembic upgrade head: {e}") from e
+    if current != heads:
+        raise SchemaNotReadyError(
+            f"Ревизия схемы БД {', '.join(sorted(current)) or 'отсутствует'} не совпадает с head миграций "
+            f"{', '.join(sorted(heads))}, выполните alembic upgrade head"
+        )
+    logger.info("Схема БД на ревизии %s", ", ".join(sorted(current)))
+
+
+async def prepare_schema(db_engine: AsyncEngine, mode: str):
+    """Подготовка схемы при старте процесса в режиме DB_STARTUP_MODE.
+
+    check — только проверка ревизии, create_all — создание недостающих таблиц по моделям
+    (для локальной разработки без миграций), skip — без обращения к БД.
+    """
+    if mode == "check":
+        await check_schema_revision(db_engine)
+    elif mode == "create_all":
+        async with db_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    elif mode != "skip":
+        raise ValueError(f"Неизвестный DB_STARTUP_MODE={mode}, допустимо: {', '.join(STARTUP_MODES)}")
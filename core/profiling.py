@@ -0,0 +1,89 @@
+"""Профилирование запросов: число и время SQL-запросов, время отдельных этапов, поиск N+1.
+
+Профиль текущего запроса хранится в contextvar и заполняется событиями движков SQLAlchemy
+и декоратором profiled. Профиль создаёт core.middleware.ProfilingMiddleware; вне запроса
+(воркеры, скрипты) все хуки ничего не делают.
+"""
+import functools
+import logging
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+_current: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.statements: Counter[str] = Counter()
+        self.timings: defaultdict[str, float] = defaultdict(float)
+
+    def server_timing(self) -> str:
+        """Значение заголовка Server-Timing: SQL, отмеченные этапы и общее время обработки."""
+        parts = [f'db;dur={self.sql_time * 1000:.2f};desc="{self.sql_count} SQL"']
+        parts.extend(f"{name};dur={elapsed * 1000:.2f}" for name, elapsed in self.timings.items())
+        parts.append(f"app;dur={(perf_counter() - self.started) * 1000:.2f}")
+        return ", ".join(parts)
+
+    def repeated_statements(self, threshold: int) -> list[tuple[str, int]]:
+        """Одинаковые SQL-запросы, выполненные больше threshold раз, — вероятный N+1."""
+        return [(statement, count) for statement, count in self.statements.most_common() if count > threshold]
+
+
+def start_profile() -> tuple[RequestProfile, object]:
+    profile = RequestProfile()
+    return profile, _current.set(profile)
+
+
+def end_profile(token):
+    _current.reset(token)
+
+
+def profiled(name: str):
+    """Декоратор async-функции: её время добавляется в этап name профиля текущего запроса.
+
+    Сигнатура сохраняется, поэтому декоратор можно применять и к зависимостям FastAPI.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            profile = _current.get()
+            if profile is None:
+                return await func(*args, **kwargs)
+            started = perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                profile.timings[name] += perf_counter() - started
+        return wrapper
+    return decorator
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        context._profiling_started = perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    started = getattr(context, "_profiling_started", None)
+    if profile is None or started is None:
+        return
+    profile.sql_count += 1
+    profile.sql_time += perf_counter() - started
+    # Параметры передаются отдельно, поэтому одинаковые по форме запросы имеют одинаковый текст
+    profile.statements[statement] += 1
+
+
+def instrument_engine(async_engine: AsyncEngine):
+    """Подключает учёт SQL-запросов движка к профилю текущего запроса."""
+    event.listen(async_engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(async_engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
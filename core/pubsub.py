@@ -0,0 +1,235 @@
+"""Публикация событий и подписка на них (pub/sub) для push-уведомлений клиентам.
+
+Подписки живут в памяти процесса: у каждой своя очередь не длиннее PUBSUB_SUBSCRIBER_QUEUE
+сообщений, а сообщение кодируется один раз и раздаётся подписчикам канала как общий bytes.
+Подписка, которая не успевает забирать сообщения, помечается переполненной и закрывается:
+клиент переподключается и перечитывает состояние, а медленный клиент не раздувает память процесса.
+
+Бэкенды (PUBSUB_BACKEND):
+- memory — сообщения получают только подписчики процесса, который их опубликовал (один воркер uvicorn);
+- postgres — публикация через NOTIFY, каждый процесс держит одно соединение LISTEN
+  и раздаёт полученные сообщения своим подписчикам.
+"""
+import asyncio
+import logging
+import asyncpg
+from typing import Dict, List, Optional, Set
+from sqlalchemy import text
+from core.config import config
+from core.database import engine
+from core.metrics import CallbackGauge, Counter
+
+logger = logging.getLogger(__name__)
+
+# Канал PostgreSQL, через который процессы обмениваются сообщениями всех каналов приложения
+NOTIFY_CHANNEL = "qna_pubsub"
+
+pubsub_overflows_total = Counter("qna_pubsub_overflows_total", "Подписки, закрытые из-за переполнения очереди")
+
+
+class SubscriptionOverflow(Exception):
+    """Очередь подписки переполнилась или бэкенд терял соединение: часть сообщений потеряна."""
+
+
+class TooManySubscribers(Exception):
+    """Достигнут PUBSUB_MAX_SUBSCRIBERS."""
+
+
+class Subscription:
+    # Десятки тысяч подписок на процесс: без __dict__, очередь и future ожидания создаются по необходимости
+    __slots__ = ("channel", "_broker", "_messages", "_waiter", "overflowed")
+
+    def __init__(self, broker: "Broker", channel: str):
+        self.channel = channel
+        self._broker = broker
+        self._messages: Optional[List[bytes]] = None
+        self._waiter: Optional[asyncio.Future] = None
+        self.overflowed = False
+
+    def _deliver(self, message: bytes):
+        if self.overflowed:
+            return
+        if self._messages is None:
+            self._messages = []
+        if len(self._messages) >= self._broker.queue_size:
+            self._overflow()
+            return
+        self._messages.append(message)
+        self._wake()
+
+    def _overflow(self):
+        if self.overflowed:
+            return
+        self.overflowed = True
+        self._messages = None
+        pubsub_overflows_total.inc()
+        self._wake()
+
+    def _wake(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def get(self) -> Optional[bytes]:
+        """Следующее сообщение или None — сигнал keepalive брокера, сообщений пока нет.
+
+        SubscriptionOverflow — сообщения потеряны, подписку нужно закрыть.
+        """
+        if not self._messages and not self.overflowed:
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        if self.overflowed:
+            raise SubscriptionOverflow(self.channel)
+        return self._messages.pop(0) if self._messages else None
+
+    def close(self):
+        self._broker._remove(self)
+
+
+class Broker:
+    """Раздача сообщений подписчикам процесса; publish доставляет только в этом процессе (memory)."""
+
+    # Ограничение размера сообщения бэкендом, None — без ограничения
+    max_message_size: Optional[int] = None
+
+    def __init__(self, queue_size: int, max_subscribers: int, keepalive_interval: float):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.keepalive_interval = keepalive_interval
+        self.subscribers = 0
+        self._channels: Dict[str, Set[Subscription]] = {}
+        self._keepalive_task: Optional[asyncio.Task] = None
+
+    def subscribe(self, channel: str) -> Subscription:
+        """Подписка на канал. Закрывается вызывающим кодом: subscription.close()."""
+        if self.subscribers >= self.max_subscribers:
+            raise TooManySubscribers(f"Достигнуто ограничение подписок процесса: {self.max_subscribers}")
+        subscription = Subscription(self, channel)
+        self._channels.setdefault(channel, set()).add(subscription)
+        self.subscribers += 1
+        return subscription
+
+    def _remove(self, subscription: Subscription):
+        subscriptions = self._channels.get(subscription.channel)
+        if subscriptions is None or subscription not in subscriptions:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._channels[subscription.channel]
+        self.subscribers -= 1
+
+    def _dispatch(self, channel: str, message: bytes):
+        # Копия множества: подписчик может закрыться во время раздачи
+        for subscription in tuple(self._channels.get(channel, ())):
+            subscription._deliver(message)
+
+    def _overflow_all(self):
+        for subscriptions in self._channels.values():
+            for subscription in subscriptions:
+                subscription._overflow()
+
+    def keepalive(self):
+        """Будит ожидающие подписки: get() вернёт None, и поток отправит клиенту keepalive."""
+        for subscriptions in self._channels.values():
+            for subscription in subscriptions:
+                subscription._wake()
+
+    async def _keepalive_forever(self):
+        # Один общий таймер вместо таймаута ожидания у каждой подписки: таймаут на каждое
+        # ожидание в несколько раз замедляет раздачу сообщения тысячам подписчиков
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            self.keepalive()
+
+    async def publish(self, channel: str, message: str):
+        self._dispatch(channel, message.encode("utf-8"))
+
+    async def start(self):
+        self._keepalive_task = asyncio.create_task(self._keepalive_forever(), name="pubsub-keepalive")
+
+    async def stop(self):
+        await _cancel(self._keepalive_task)
+
+
+class PostgresBroker(Broker):
+    """Сообщения между процессами через LISTEN/NOTIFY PostgreSQL.
+
+    Публикация — pg_notify через пул приложения, сообщение получают все процессы, включая
+    опубликовавший. Пока соединение LISTEN разорвано, сообщения теряются, поэтому при разрыве
+    все подписки закрываются как переполненные и клиенты перечитывают состояние.
+    """
+
+    # Полезная нагрузка NOTIFY — меньше 8000 байт, вместе с именем канала
+    max_message_size = 7000
+
+    def __init__(self, queue_size: int, max_subscribers: int, keepalive_interval: float):
+        super().__init__(queue_size, max_subscribers, keepalive_interval)
+        self._listen_task: Optional[asyncio.Task] = None
+
+    async def publish(self, channel: str, message: str):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT pg_notify(:notify_channel, :payload)"), {
+                "notify_channel": NOTIFY_CHANNEL, "payload": f"{channel}\n{message}",
+            })
+            await conn.commit()
+
+    def _on_notify(self, connection, pid: int, notify_channel: str, payload: str):
+        channel, _, message = payload.partition("\n")
+        self._dispatch(channel, message.encode("utf-8"))
+
+    async def _listen_forever(self):
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(
+                    host=config.DB_HOST, port=int(config.DB_PORT), user=config.DB_USER,
+                    password=config.DB_PASSWORD, database=config.DB_NAME, timeout=config.DB_CONNECT_TIMEOUT,
+                )
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await connection.add_listener(NOTIFY_CHANNEL, self._on_notify)
+                logger.info("Подписка LISTEN %s установлена", NOTIFY_CHANNEL)
+                await closed.wait()
+                logger.error("Соединение LISTEN %s разорвано", NOTIFY_CHANNEL)
+            except asyncio.CancelledError:
+                if connection is not None:
+                    await connection.close()
+                raise
+            except Exception as e:
+                logger.error("Ошибка соединения LISTEN %s: %s", NOTIFY_CHANNEL, e)
+            self._overflow_all()
+            await asyncio.sleep(config.PUBSUB_RECONNECT_SECONDS)
+
+    async def start(self):
+        await super().start()
+        self._listen_task = asyncio.create_task(self._listen_forever(), name="pubsub-listen")
+
+    async def stop(self):
+        await _cancel(self._listen_task)
+        await super().stop()
+
+
+async def _cancel(task: Optional[asyncio.Task]):
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def create_broker() -> Broker:
+    """Создаёт брокер выбранного в PUBSUB_BACKEND типа."""
+    if config.PUBSUB_BACKEND == "postgres":
+        logger.info("Pub/sub: PostgreSQL LISTEN/NOTIFY")
+        return PostgresBroker(config.PUBSUB_SUBSCRIBER_QUEUE, config.PUBSUB_MAX_SUBSCRIBERS, config.SSE_KEEPALIVE_SECONDS)
+    logger.info("Pub/sub: в памяти процесса")
+    return Broker(config.PUBSUB_SUBSCRIBER_QUEUE, config.PUBSUB_MAX_SUBSCRIBERS, config.SSE_KEEPALIVE_SECONDS)
+
+
+broker = create_broker()
+
+CallbackGauge("qna_pubsub_subscribers", "Активные подписки процесса", [], lambda: {(): broker.subscribers})
@@ -0,0 +1,44 @@
+import asyncio
+import logging
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import text
+from core.config import config
+from core.database import engine, get_pool_status
+from core.metrics import render
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/system", tags=["Система"])
+# Служебные эндпоинты для мониторинга и оркестратора — в корне, без префикса
+health_router = APIRouter(tags=["Система"])
+
+
+@router.get("/pool", summary="Состояние пула соединений БД")
+async def pool_status():
+    """Текущее состояние пула соединений этого процесса (занято, свободно, overflow)."""
+    return get_pool_status()
+
+
+@health_router.get("/metrics", summary="Метрики Prometheus", response_class=PlainTextResponse)
+async def metrics():
+    """Метрики этого процесса в текстовом формате Prometheus."""
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@health_router.get("/healthz", summary="Проверка живости")
+async def healthz():
+    """Процесс жив и обрабатывает запросы; зависимости не проверяются."""
+    return {"status": "ok"}
+
+
+@health_router.get("/readyz", summary="Проверка готовности")
+async def readyz():
+    """Готовность принимать трафик: primary-БД отвечает на SELECT 1 за HEALTHCHECK_TIMEOUT секунд."""
+    try:
+        async with asyncio.timeout(config.HEALTHCHECK_TIMEOUT):
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+    except Exception as e:
+        logger.error("Проверка готовности не пройдена: %s", e)
+        return JSONResponse({"status": "unavailable", "database": str(e) or e.__class__.__name__}, status_code=503)
+    return {"status": "ok"}
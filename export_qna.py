@@ -0,0 +1,32 @@
+import argparse
+import asyncio
+import sys
+from datetime import datetime
+import apps.auth.models
+import apps.qna.models
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Выгрузка вопросов с ответами в NDJSON или CSV")
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson", help="Формат выгрузки")
+    parser.add_argument("--output", "-o", default="-", help="Файл для записи (по умолчанию stdout)")
+    parser.add_argument("--gzip", action="store_true", help="Сжимать выгрузку gzip")
+    parser.add_argument("--updated-since", type=datetime.fromisoformat, default=None,
+                        help="Только вопросы, созданные или получившие ответ с этого момента (ISO 8601, UTC)")
+    return parser.parse_args()
+
+async def export_qna(args):
+    from apps.qna.export import stream_export
+    from apps.qna.utils import to_naive_utc
+    from core.database import engine
+
+    output = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        async for chunk in stream_export(args.format, updated_since=to_naive_utc(args.updated_since), compress=args.gzip):
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+        await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(export_qna(parse_args()))
@@ -0,0 +1,53 @@
+import argparse
+import asyncio
+import gzip
+import sys
+import apps.auth.models
+import apps.qna.models
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Импорт вопросов с ответами из NDJSON (формат export_qna.py)")
+    parser.add_argument("input", nargs="?", default="-", help="Файл NDJSON, .gz распаковывается (по умолчанию stdin)")
+    parser.add_argument("--batch-size", type=int, default=None, help="Вопросов в одной транзакции")
+    return parser.parse_args()
+
+async def read_lines(source):
+    for line in source:
+        yield line
+
+async def import_qna(args):
+    from apps.qna.importer import import_ndjson
+    from core.config import config
+    from core.database import async_session, engine
+
+    if args.input == "-":
+        source = sys.stdin.buffer
+    elif args.input.endswith(".gz"):
+        source = gzip.open(args.input, "rb")
+    else:
+        source = open(args.input, "rb")
+    totals = {"questions_inserted": 0, "questions_skipped": 0, "answers_inserted": 0, "answers_skipped": 0}
+    try:
+        async with async_session() as db:
+            async for batch in import_ndjson(db, read_lines(source), args.batch_size or config.IMPORT_BATCH_SIZE):
+                for key in totals:
+                    totals[key] += getattr(batch, key)
+                print(
+                    f"Пачка {batch.batch}: вопросов +{batch.questions_inserted} (пропущено {batch.questions_skipped}), "
+                    f"ответов +{batch.answers_inserted} (пропущено {batch.answers_skipped})",
+                    file=sys.stderr,
+                )
+                for line, error in batch.errors:
+                    print(f"  строка {line}: {error}", file=sys.stderr)
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        await engine.dispose()
+    print(
+        f"Импорт завершён: вопросов добавлено {totals['questions_inserted']}, пропущено {totals['questions_skipped']}; "
+        f"ответов добавлено {totals['answers_inserted']}, пропущено {totals['answers_skipped']}",
+        file=sys.stderr,
+    )
+
+if __name__ == "__main__":
+    asyncio.run(import_qna(parse_args()))
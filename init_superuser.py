@@ -71,7 +71,7 @@ async def init_superuser():
             password=password,
             password_confirm=password_confirm
         )
-        db_user, _ = await create_user(db, user)
+        db_user, _ = await create_user(db, user, send_verification=False)
         db_user.is_superuser = True
         db_user.is_verified = True
         await db.commit()
@@ -1,32 +1,80 @@
-import logging
+from core.logs import setup_logging
+
+# Логирование настраивается до импорта остальных модулей, чтобы не потерять их сообщения при загрузке
+setup_logging()
+
+import asyncio
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
-from apps.auth.routes import router as auth_router
+from apps.auth.routes import router as auth_router, is_superuser_token
 from apps.qna.routes import router as qna_router, answers_router
 from apps.admin import init_admin
+from core.routes import router as system_router, health_router
 from core.config import config
-from core.database import Base, engine
+from core.database import engine, replica_engines
+from core.migrations import prepare_schema
+from core.idempotency import run_purge_forever
+from core.pubsub import broker
+from apps.qna.dedup import run_refresh_forever as run_dedup_refresh_forever
+from apps.qna.related import run_refresh_forever as run_related_refresh_forever
+from core.middleware import ReadYourWritesMiddleware, ProfilingMiddleware, MetricsMiddleware
+from core.profiling import instrument_engine
+from apps.auth.hashing import password_hasher
+from apps.auth.revocation import run_sync_forever as run_revocation_sync_forever, \
+    run_purge_forever as run_revocation_purge_forever
+from apps.mail.worker import outbox_worker
 from starlette.middleware.sessions import SessionMiddleware
 
-# Настройка глобального логирования
-logging.basicConfig(level=logging.DEBUG)
-
 # Управление жизненным циклом приложения
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    await prepare_schema(engine, config.DB_STARTUP_MODE)
+    if config.SMTP_ENABLED and config.EMAIL_OUTBOX_WORKER_IN_APP:
+        outbox_worker.start()
+    await broker.start()
+    tasks = [
+        asyncio.create_task(run_purge_forever(config.IDEMPOTENCY_PURGE_INTERVAL), name="idempotency-purge"),
+        # Пока фильтр отозванных токенов не загружен, проверки токенов с jti обращаются к БД
+        asyncio.create_task(run_revocation_sync_forever(config.REVOCATION_SYNC_INTERVAL), name="revocation-sync"),
+        asyncio.create_task(run_revocation_purge_forever(config.REVOCATION_PURGE_INTERVAL), name="revocation-purge"),
+    ]
+    if config.DEDUP_ENABLED:
+        # Индекс похожих вопросов загружается в фоне: старт процесса не ждёт чтения всех вопросов
+        tasks.append(asyncio.create_task(run_dedup_refresh_forever(config.DEDUP_REFRESH_INTERVAL), name="dedup-refresh"))
+    if config.RELATED_ENABLED:
+        tasks.append(asyncio.create_task(run_related_refresh_forever(config.RELATED_REFRESH_INTERVAL), name="related-refresh"))
     yield
+    for task in tasks:
+        task.cancel()
+    await broker.stop()
+    await outbox_worker.stop()
+    password_hasher.shutdown()
     await engine.dispose()
+    for replica in replica_engines:
+        await replica.dispose()
 
 # Инициализация FastAPI приложения
 app = FastAPI(title="My Awesome Project", lifespan=lifespan)
 app.add_middleware(SessionMiddleware, secret_key=config.SECRET_KEY)
+if replica_engines:
+    app.add_middleware(ReadYourWritesMiddleware, window_seconds=config.READ_YOUR_WRITES_SECONDS)
+app.add_middleware(MetricsMiddleware)
+if config.PROFILING_ENABLED:
+    for profiled_engine in (engine, *replica_engines):
+        instrument_engine(profiled_engine)
+    # Добавляется последним, то есть оборачивает всё приложение: время включает остальные middleware
+    app.add_middleware(
+        ProfilingMiddleware,
+        is_admin=is_superuser_token,
+        n_plus_one_threshold=config.PROFILING_N_PLUS_ONE_THRESHOLD,
+    )
 
 # Подключение маршрутов существующих приложений
 app.include_router(auth_router)
 app.include_router(qna_router)  # /questions
 app.include_router(answers_router)  # /answers
+app.include_router(system_router)  # /system
+app.include_router(health_router)  # /metrics, /healthz, /readyz
 
 # Инициализация админки
 init_admin(app)
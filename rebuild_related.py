@@ -0,0 +1,35 @@
+import argparse
+import asyncio
+import sys
+import time
+import apps.auth.models
+import apps.qna.models
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Пересборка снимка индекса связанных вопросов (TF-IDF) по всем вопросам из БД")
+    parser.add_argument("--output", "-o", default=None, help="Файл снимка (по умолчанию RELATED_INDEX_PATH)")
+    return parser.parse_args()
+
+async def rebuild_related(args):
+    from apps.qna.related import RelatedIndex
+    from core.config import config
+    from core.database import engine
+
+    output = args.output or config.RELATED_INDEX_PATH
+    if not output:
+        sys.exit("Не задан файл снимка: укажите --output или RELATED_INDEX_PATH")
+    index = RelatedIndex()
+    started = time.perf_counter()
+    try:
+        await index.refresh()
+    finally:
+        await engine.dispose()
+    index.save(output)
+    print(
+        f"Индекс связанных вопросов пересобран за {time.perf_counter() - started:.1f} с: "
+        f"вопросов {len(index)}, признаков {len(index._postings)}, снимок {output}",
+        file=sys.stderr,
+    )
+
+if __name__ == "__main__":
+    asyncio.run(rebuild_related(parse_args()))
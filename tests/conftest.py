@@ -0,0 +1,6 @@
+# Все модели регистрируются до первой настройки мапперов, как в приложении и alembic/env.py:
+# связи между моделями заданы по имени класса
+from apps.qna.models import Question, Answer, QuestionTrend  # noqa: F401
+from apps.auth.models import User, RevokedToken  # noqa: F401
+from apps.mail.models import EmailOutbox  # noqa: F401
+from core.idempotency import IdempotencyKey  # noqa: F401
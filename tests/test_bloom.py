@@ -0,0 +1,28 @@
+"""BloomFilter: отсутствие ложноотрицательных ответов и доля ложных срабатываний."""
+from core.bloom import BloomFilter
+
+
+def test_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    keys = [f"jti-{index}" for index in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+
+
+def test_false_positive_rate_within_bound():
+    capacity, error_rate = 20000, 0.001
+    bloom = BloomFilter(capacity, error_rate)
+    for index in range(capacity):
+        bloom.add(f"revoked-{index}")
+    probes = 200000
+    false_positives = sum(f"live-{index}" in bloom for index in range(probes))
+    # Запас вдвое на случайный разброс: ожидаемое значение — около 200 из 200000
+    assert false_positives / probes < 2 * error_rate
+
+
+def test_repeated_add_is_not_counted():
+    bloom = BloomFilter(100, 0.01)
+    assert bloom.add("a")
+    assert not bloom.add("a")
+    assert len(bloom) == 1
@@ -0,0 +1,54 @@
+"""DuplicateIndex: добавление, удаление и поиск кандидатов в дубликаты."""
+from array import array
+import pytest
+from apps.qna import dedup
+from apps.qna.dedup import DuplicateIndex, _value
+from apps.qna.utils import lsh_bands
+
+
+def test_candidates_ranked_by_matching_bands():
+    index = DuplicateIndex(bands=4)
+    index.add(1, [10, 20, 30, 40])
+    index.add(2, [10, 20, 31, 41])
+    index.add(3, [11, 21, 31, 42])
+    assert index.candidates([10, 20, 30, 42], limit=10) == [1, 2, 3]
+    assert index.candidates([10, 20, 30, 42], limit=1) == [1]
+    assert index.candidates([-5, -6, -7, -8], limit=10) == []
+
+
+def test_remove():
+    index = DuplicateIndex(bands=2)
+    index.add(1, [10, 20])
+    index.add(2, [10, 20])
+    index.remove(1, [10, 20])
+    assert index.candidates([10, 20], limit=10) == [2]
+    assert not index.contains(1, [10, 20]) and index.contains(2, [10, 20])
+    # Повторное удаление ничего не ломает
+    index.remove(1, [10, 20])
+    assert len(index) == 1
+
+
+def test_negative_band_keys():
+    index = DuplicateIndex(bands=2)
+    index.add(5, [-1, -(2 ** 31)])
+    assert index.candidates([-1, 0], limit=10) == [5]
+
+
+def test_similar_texts_are_candidates():
+    index = DuplicateIndex()
+    original = "Как настроить пул соединений SQLAlchemy для asyncpg в FastAPI?"
+    index.add(1, lsh_bands(original))
+    index.add(2, lsh_bands("Почему бетон трескается зимой на открытой веранде?"))
+    assert index.candidates(lsh_bands(original.replace("?", "!")), limit=10)[0] == 1
+
+
+@pytest.mark.asyncio
+async def test_bulk_merge_keeps_sorted_unique_values(monkeypatch):
+    monkeypatch.setattr(dedup, "BULK_THRESHOLD", 4)
+    monkeypatch.setattr(dedup, "SORT_CHUNK", 3)
+    index = DuplicateIndex(bands=1)
+    index.add(1, [7])
+    staged = [array("Q", (_value(key, question_id) for question_id, key in [(4, 9), (2, 7), (3, 8), (1, 7), (5, 1)]))]
+    await index._merge(staged)
+    assert list(index._bands[0]) == sorted(set(staged[0]))
+    assert sorted(index.candidates([7], limit=10)) == [1, 2]
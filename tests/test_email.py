@@ -0,0 +1,151 @@
+"""Отправка писем через локальный SMTP-сервер aiosmtpd: send_batch и OutboxWorker.process_batch."""
+import socket
+from contextlib import asynccontextmanager
+import pytest
+from aiosmtpd.controller import Controller
+from apps.mail import worker as worker_module
+from apps.mail.models import EmailOutbox
+from apps.mail.worker import OutboxWorker
+from core import email as email_module
+from core.config import config
+
+
+class Handler:
+    """Принимает письма; адреса из refused отклоняет на RCPT, на письме с темой disconnect_subject рвёт соединение."""
+
+    def __init__(self, refused=(), disconnect_subject=None):
+        self.refused = set(refused)
+        self.disconnect_subject = disconnect_subject
+        self.delivered = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.refused:
+            return "550 no such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        content = envelope.content.decode("utf-8", "replace")
+        if self.disconnect_subject and f"Subject: {self.disconnect_subject}" in content:
+            server.transport.close()
+            return "421 closing"
+        self.delivered.append((envelope.rcpt_tos[0], content))
+        return "250 OK"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    servers = []
+
+    def start(handler: Handler) -> Handler:
+        port = _free_port()
+        controller = Controller(handler, hostname="127.0.0.1", port=port)
+        controller.start()
+        servers.append(controller)
+        monkeypatch.setattr(config, "SMTP_HOST", "127.0.0.1")
+        monkeypatch.setattr(config, "SMTP_PORT", port)
+        monkeypatch.setattr(config, "SMTP_USER", None)
+        monkeypatch.setattr(config, "SMTP_PASSWORD", None)
+        monkeypatch.setattr(config, "SMTP_FROM", "noreply@example.com")
+        monkeypatch.setattr(config, "SMTP_TIMEOUT", 5)
+        return handler
+
+    yield start
+    for controller in servers:
+        controller.stop()
+
+
+def _messages(*addresses):
+    return [(address, f"Subject {index}", "Текст письма") for index, address in enumerate(addresses)]
+
+
+@pytest.mark.asyncio
+async def test_send_batch_delivers_all(smtp_server):
+    handler = smtp_server(Handler())
+    results = await email_module.send_batch(_messages("a@example.com", "b@example.com"))
+    assert results == [None, None]
+    assert [to for to, _ in handler.delivered] == ["a@example.com", "b@example.com"]
+
+
+@pytest.mark.asyncio
+async def test_send_batch_refused_recipient_does_not_stop_batch(smtp_server):
+    handler = smtp_server(Handler(refused={"missing@example.com"}))
+    results = await email_module.send_batch(_messages("a@example.com", "missing@example.com", "c@example.com"))
+    assert results[0] is None and results[2] is None
+    assert "no such user" in results[1]
+    assert [to for to, _ in handler.delivered] == ["a@example.com", "c@example.com"]
+
+
+@pytest.mark.asyncio
+async def test_send_batch_disconnect_returns_collected_results(smtp_server):
+    handler = smtp_server(Handler(disconnect_subject="Subject 1"))
+    results = await email_module.send_batch(_messages("a@example.com", "b@example.com", "c@example.com"))
+    # Третье письмо не отправлялось: результата для него нет
+    assert len(results) == 2
+    assert results[0] is None and results[1] is not None
+    assert [to for to, _ in handler.delivered] == ["a@example.com"]
+
+
+class FakeSession:
+    """Сессия без БД: process_batch использует только async with session / session.begin()."""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    @asynccontextmanager
+    async def begin(self):
+        yield
+
+
+def _outbox(*addresses):
+    return [
+        EmailOutbox(id=index, to_email=address, subject=f"Subject {index}", body="Текст", status="pending", attempts=0)
+        for index, address in enumerate(addresses)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_process_batch_marks_each_message(smtp_server, monkeypatch):
+    smtp_server(Handler(refused={"missing@example.com"}, disconnect_subject="Subject 2"))
+    messages = _outbox("a@example.com", "missing@example.com", "b@example.com", "c@example.com")
+
+    async def claim(db, limit):
+        return messages
+
+    monkeypatch.setattr(worker_module, "async_session", FakeSession)
+    monkeypatch.setattr(worker_module, "claim_pending_emails", claim)
+    monkeypatch.setattr(config, "EMAIL_OUTBOX_MAX_ATTEMPTS", 8)
+
+    assert await OutboxWorker(batch_size=10, poll_interval=1).process_batch() == 4
+    sent, refused, disconnected, unsent = messages
+    assert (sent.status, sent.attempts) == ("sent", 1)
+    assert (refused.status, refused.attempts) == ("pending", 1) and "no such user" in refused.last_error
+    assert (disconnected.status, disconnected.attempts) == ("pending", 1)
+    # Письмо после разрыва не отправлялось: попытка не засчитана, уйдёт со следующей пачкой
+    assert (unsent.status, unsent.attempts, unsent.last_error) == ("pending", 0, None)
+
+
+@pytest.mark.asyncio
+async def test_process_batch_connection_error_defers_batch(monkeypatch):
+    messages = _outbox("a@example.com", "b@example.com")
+
+    async def claim(db, limit):
+        return messages
+
+    monkeypatch.setattr(worker_module, "async_session", FakeSession)
+    monkeypatch.setattr(worker_module, "claim_pending_emails", claim)
+    monkeypatch.setattr(config, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(config, "SMTP_PORT", _free_port())
+    monkeypatch.setattr(config, "SMTP_TIMEOUT", 5)
+
+    assert await OutboxWorker(batch_size=10, poll_interval=1).process_batch() == 2
+    assert all(message.status == "pending" and message.attempts == 1 for message in messages)
@@ -0,0 +1,67 @@
+"""GET /questions/{id}/events: подписка закрывается при любом завершении ответа."""
+import asyncio
+import pytest
+from core.pubsub import Broker
+from apps.qna import events
+from apps.qna.events import EventStreamResponse, question_channel
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    broker = Broker(queue_size=8, max_subscribers=10, keepalive_interval=60)
+    monkeypatch.setattr(events, "broker", broker)
+    return broker
+
+
+def _scope(spec_version: str) -> dict:
+    return {"type": "http", "asgi": {"spec_version": spec_version}}
+
+
+@pytest.mark.asyncio
+async def test_subscription_closed_when_headers_fail(broker):
+    response = EventStreamResponse(broker.subscribe(question_channel(1)))
+
+    async def receive():
+        await asyncio.Future()
+
+    async def send(message):
+        raise OSError("соединение закрыто")
+
+    with pytest.raises(Exception):
+        await response(_scope("2.4"), receive, send)
+    assert broker.subscribers == 0
+
+
+@pytest.mark.asyncio
+async def test_subscription_closed_when_client_disconnects_first(broker):
+    response = EventStreamResponse(broker.subscribe(question_channel(1)))
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        await asyncio.sleep(0)
+
+    await response(_scope("2.0"), receive, send)
+    assert broker.subscribers == 0
+
+
+@pytest.mark.asyncio
+async def test_question_deleted_ends_stream(broker):
+    response = EventStreamResponse(broker.subscribe(question_channel(1)))
+    sent = []
+
+    async def receive():
+        await asyncio.Future()
+
+    async def send(message):
+        sent.append(message)
+
+    task = asyncio.create_task(response(_scope("2.4"), receive, send))
+    await asyncio.sleep(0.01)
+    await events.publish_question_deleted(1)
+    await asyncio.wait_for(task, 1)
+    bodies = b"".join(message.get("body", b"") for message in sent)
+    assert bodies.startswith(events.READY_EVENT)
+    assert b"event: question_deleted" in bodies
+    assert broker.subscribers == 0
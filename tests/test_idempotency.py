@@ -0,0 +1,170 @@
+"""idempotent: порядок захвата, сохранения, освобождения ключа и повтора ответа.
+
+Таблица idempotency_key и транзакция обработчика заменены моделью в памяти: проверяется только логика
+idempotent поверх _claim/_store/_complete/_release, а не их SQL. Захват через ON CONFLICT, проверка
+владения по locked_until и откат перехваченной транзакции на PostgreSQL — в test_idempotency_db.py.
+"""
+import asyncio
+from datetime import timedelta
+import pytest
+from fastapi import HTTPException
+from core import idempotency
+from core.idempotency import idempotent, _ClaimLost, _now
+
+
+class FakeDb:
+    """Транзакция обработчика: вставленные строки и сохранённый ответ фиксируются вместе."""
+
+    def __init__(self, store: "FakeKeys"):
+        self.store = store
+        self.pending = []
+
+    async def commit(self):
+        for apply in self.pending:
+            apply()
+        self.pending = []
+
+    async def rollback(self):
+        self.pending = []
+
+
+class FakeKeys:
+    def __init__(self):
+        self.records = {}
+        self.inserted = []
+
+    async def claim(self, user_id, key, request_hash):
+        record = self.records.get((user_id, key))
+        now = _now()
+        if record is not None and not (record["status"] == "in_progress" and record["locked_until"] < now):
+            return None
+        locked_until = now + timedelta(seconds=60)
+        self.records[(user_id, key)] = {"status": "in_progress", "locked_until": locked_until, "body": None}
+        return locked_until
+
+    def _owned(self, user_id, key, locked_until):
+        record = self.records.get((user_id, key))
+        return record is not None and record["status"] == "in_progress" and record["locked_until"] == locked_until
+
+    async def store(self, db, user_id, key, locked_until, status_code, body):
+        if not self._owned(user_id, key, locked_until):
+            raise _ClaimLost(key)
+
+        def apply():
+            self.records[(user_id, key)].update(status="completed", status_code=status_code, body=body)
+        db.pending.append(apply)
+
+    async def complete(self, user_id, key, locked_until, status_code, body):
+        if self._owned(user_id, key, locked_until):
+            self.records[(user_id, key)].update(status="completed", status_code=status_code, body=body)
+
+    async def release(self, user_id, key, locked_until):
+        if self._owned(user_id, key, locked_until):
+            del self.records[(user_id, key)]
+
+    async def wait_for_result(self, user_id, key, request_hash):
+        for _ in range(200):
+            record = self.records.get((user_id, key))
+            if record is None or record["locked_until"] < _now():
+                return None
+            if record["status"] == "completed":
+                return type("Record", (), {"status_code": record["status_code"], "response_body": record["body"]})
+            await asyncio.sleep(0.01)
+        raise HTTPException(status_code=409, detail="ещё выполняется")
+
+
+@pytest.fixture
+def keys(monkeypatch):
+    store = FakeKeys()
+    monkeypatch.setattr(idempotency, "_claim", store.claim)
+    monkeypatch.setattr(idempotency, "_store", store.store)
+    monkeypatch.setattr(idempotency, "_complete", store.complete)
+    monkeypatch.setattr(idempotency, "_release", store.release)
+    monkeypatch.setattr(idempotency, "_wait_for_result", store.wait_for_result)
+
+    async def fingerprint(request):
+        return "hash"
+
+    monkeypatch.setattr(idempotency, "request_fingerprint", fingerprint)
+    return store
+
+
+def create_handler(db: FakeDb, calls: list, fail_commit: bool = False):
+    """Как crud.create_question: вставка, complete до фиксации, commit."""
+
+    async def handler(complete):
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        row = {"id": len(calls)}
+        db.pending.append(lambda: db.store.inserted.append(row))
+        await complete(row)
+        if fail_commit:
+            raise ConnectionError("соединение с БД потеряно")
+        await db.commit()
+        return row
+
+    return handler
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_with_same_key_insert_once(keys):
+    calls = []
+    first_db, second_db = FakeDb(keys), FakeDb(keys)
+    first, second = await asyncio.gather(
+        idempotent(None, first_db, "user", "key-1", create_handler(first_db, calls)),
+        idempotent(None, second_db, "user", "key-1", create_handler(second_db, calls)),
+    )
+    assert len(calls) == 1
+    assert keys.inserted == [{"id": 1}]
+    assert first == {"id": 1}
+    assert second.body == b'{"id":1}'
+    assert second.headers[idempotency.REPLAYED_HEADER] == "true"
+
+
+@pytest.mark.asyncio
+async def test_failed_commit_releases_key_without_insert(keys):
+    calls = []
+    db = FakeDb(keys)
+    with pytest.raises(ConnectionError):
+        await idempotent(None, db, "user", "key-2", create_handler(db, calls, fail_commit=True))
+    assert keys.inserted == []
+    assert ("user", "key-2") not in keys.records
+
+    retry_db = FakeDb(keys)
+    assert await idempotent(None, retry_db, "user", "key-2", create_handler(retry_db, calls)) == {"id": 2}
+    assert keys.inserted == [{"id": 2}]
+
+
+@pytest.mark.asyncio
+async def test_lost_claim_rolls_back_and_replays(keys):
+    calls = []
+    slow_db, retry_db = FakeDb(keys), FakeDb(keys)
+
+    async def slow_handler(complete):
+        calls.append(1)
+        slow_db.pending.append(lambda: keys.inserted.append({"id": "slow"}))
+        # Захват истекает, повтор перехватывает ключ и успевает завершиться
+        keys.records[("user", "key-3")]["locked_until"] = _now() - timedelta(seconds=1)
+        await idempotent(None, retry_db, "user", "key-3", create_handler(retry_db, calls))
+        await complete({"id": "slow"})
+        await slow_db.commit()
+        return {"id": "slow"}
+
+    response = await idempotent(None, slow_db, "user", "key-3", slow_handler)
+    assert keys.inserted == [{"id": 2}]
+    assert response.body == b'{"id":2}'
+
+
+@pytest.mark.asyncio
+async def test_client_error_is_stored_and_replayed(keys):
+    calls = []
+
+    async def handler(complete):
+        calls.append(1)
+        raise HTTPException(status_code=404, detail="Вопрос не найден")
+
+    with pytest.raises(HTTPException):
+        await idempotent(None, FakeDb(keys), "user", "key-4", handler)
+    replay = await idempotent(None, FakeDb(keys), "user", "key-4", handler)
+    assert len(calls) == 1
+    assert replay.status_code == 404
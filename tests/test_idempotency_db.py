@@ -0,0 +1,173 @@
+"""idempotent на настоящем PostgreSQL: захват ключа через ON CONFLICT ... WHERE, проверка владения по
+locked_until и откат транзакции обработчика, чей захват перехвачен.
+
+Нужна база из настроек DB_* с применёнными миграциями; если она недоступна, тесты пропускаются.
+"""
+import asyncio
+import uuid
+from datetime import timedelta
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+from core import idempotency
+from core.config import config
+from core.idempotency import IdempotencyKey, idempotent, _claim, _store, _ClaimLost, _now
+from apps.auth.models import User
+from apps.qna.models import Question
+
+
+@pytest_asyncio.fixture
+async def session_maker(monkeypatch):
+    # Без пула: соединения asyncpg привязаны к event loop, а у каждого теста он свой
+    try:
+        engine = create_async_engine(config.DATABASE_URL, poolclass=NullPool, connect_args={"timeout": 2})
+        async with engine.connect():
+            pass
+    except Exception as e:
+        pytest.skip(f"PostgreSQL недоступен: {e}")
+    maker = async_sessionmaker(engine, expire_on_commit=False)
+    monkeypatch.setattr(idempotency, "async_session", maker)
+
+    async def fingerprint(request):
+        return "hash"
+
+    monkeypatch.setattr(idempotency, "request_fingerprint", fingerprint)
+    yield maker
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def user_id(session_maker):
+    user_id = str(uuid.uuid4())
+    async with session_maker() as db:
+        db.add(User(id=user_id, username="idempotency", email=f"{user_id}@example.com"))
+        await db.commit()
+    yield user_id
+    # Ключи и вопросы пользователя удаляются каскадом
+    async with session_maker() as db:
+        await db.delete(await db.get(User, user_id))
+        await db.commit()
+
+
+def create_handler(db, user_id: str, calls: list, before_complete=None):
+    """Как crud.create_question: вставка, complete до фиксации, commit."""
+
+    async def handler(complete):
+        calls.append(1)
+        question = Question(text=f"Вопрос {uuid.uuid4()}", author_id=user_id)
+        db.add(question)
+        await db.flush()
+        await asyncio.sleep(0.05)
+        if before_complete is not None:
+            await before_complete()
+        await complete({"id": question.id})
+        await db.commit()
+        return {"id": question.id}
+
+    return handler
+
+
+async def _question_ids(session_maker, user_id: str) -> list:
+    async with session_maker() as db:
+        return list((await db.scalars(select(Question.id).where(Question.author_id == user_id))).all())
+
+
+async def _expire_claim(session_maker, user_id: str, key: str):
+    async with session_maker() as db:
+        await db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+            .values(locked_until=_now() - timedelta(seconds=1))
+        )
+        await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_claims_run_handler_once(session_maker, user_id):
+    calls = []
+    async with session_maker() as first_db, session_maker() as second_db:
+        first, second = await asyncio.gather(
+            idempotent(None, first_db, user_id, "key-1", create_handler(first_db, user_id, calls)),
+            idempotent(None, second_db, user_id, "key-1", create_handler(second_db, user_id, calls)),
+        )
+    assert len(calls) == 1
+    responses = [first, second]
+    replay = next(response for response in responses if not isinstance(response, dict))
+    result = next(response for response in responses if isinstance(response, dict))
+    assert await _question_ids(session_maker, user_id) == [result["id"]]
+    assert replay.body == f'{{"id":{result["id"]}}}'.encode()
+    assert replay.headers[idempotency.REPLAYED_HEADER] == "true"
+
+
+@pytest.mark.asyncio
+async def test_expired_claim_is_taken_over_and_loser_rolls_back(session_maker, user_id):
+    calls = []
+    retry = {}
+
+    async with session_maker() as slow_db, session_maker() as retry_db:
+        async def take_over():
+            # Захват медленного запроса истекает, повтор перехватывает ключ и успевает завершиться
+            await _expire_claim(session_maker, user_id, "key-2")
+            retry["result"] = await idempotent(
+                None, retry_db, user_id, "key-2", create_handler(retry_db, user_id, calls),
+            )
+
+        response = await idempotent(
+            None, slow_db, user_id, "key-2", create_handler(slow_db, user_id, calls, before_complete=take_over),
+        )
+        # Вставка медленного запроса откатана: фиксация его сессии уже ничего не записывает
+        await slow_db.commit()
+
+    assert len(calls) == 2
+    assert await _question_ids(session_maker, user_id) == [retry["result"]["id"]]
+    assert response.body == f'{{"id":{retry["result"]["id"]}}}'.encode()
+    async with session_maker() as db:
+        record = await db.get(IdempotencyKey, (user_id, "key-2"))
+    assert record.status == "completed"
+
+
+@pytest.mark.asyncio
+async def test_store_blocks_takeover_until_commit(session_maker, user_id):
+    locked_until = await _claim(user_id, "key-3", "hash")
+    assert locked_until is not None
+    assert await _claim(user_id, "key-3", "hash") is None
+
+    async with session_maker() as db:
+        await _expire_claim(session_maker, user_id, "key-3")
+        expired_until = (await db.get(IdempotencyKey, (user_id, "key-3"))).locked_until
+        await _store(db, user_id, "key-3", expired_until, 200, b'{"id":1}')
+        # Строка заблокирована UPDATE: перехват ждёт фиксации и после неё видит сохранённый ответ
+        takeover = asyncio.create_task(_claim(user_id, "key-3", "hash"))
+        await asyncio.sleep(0.2)
+        assert not takeover.done()
+        await db.commit()
+    assert await takeover is None
+
+    async with session_maker() as db:
+        with pytest.raises(_ClaimLost):
+            await _store(db, user_id, "key-3", locked_until, 200, b'{"id":2}')
+        record = await db.get(IdempotencyKey, (user_id, "key-3"))
+    assert record.status == "completed"
+    assert record.response_body == b'{"id":1}'
+    assert record.locked_until < _now()
+
+
+@pytest.mark.asyncio
+async def test_stale_owner_cannot_store_while_takeover_in_progress(session_maker, user_id):
+    assert await _claim(user_id, "key-4", "hash") is not None
+    await _expire_claim(session_maker, user_id, "key-4")
+    async with session_maker() as db:
+        stale_until = (await db.get(IdempotencyKey, (user_id, "key-4"))).locked_until
+    owner_until = await _claim(user_id, "key-4", "hash")
+    assert owner_until is not None and owner_until != stale_until
+
+    async with session_maker() as db:
+        with pytest.raises(_ClaimLost):
+            await _store(db, user_id, "key-4", stale_until, 200, b'{"id":1}')
+        await db.rollback()
+        await _store(db, user_id, "key-4", owner_until, 200, b'{"id":2}')
+        await db.commit()
+        record = await db.get(IdempotencyKey, (user_id, "key-4"))
+    assert record.response_body == b'{"id":2}'
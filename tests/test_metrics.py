@@ -0,0 +1,40 @@
+"""MetricsMiddleware: потоки text/event-stream учитываются отдельно от обычных запросов."""
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from core.metrics import http_request_duration_seconds, http_requests_in_progress, http_streams_open
+from core.middleware import MetricsMiddleware
+
+
+def _app(seen: dict) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    async def events():
+        # Во время потока запрос уже не считается «в работе»
+        seen["in_progress"] = http_requests_in_progress.labels("GET").value
+        seen["streams"] = http_streams_open.labels("/test/events").value
+        yield b"data: {}\n\n"
+
+    @app.get("/test/events")
+    async def stream():
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/test/plain")
+    async def plain():
+        return {"ok": True}
+
+    return app
+
+
+def test_event_stream_excluded_from_request_metrics():
+    seen = {}
+    in_progress_before = http_requests_in_progress.labels("GET").value
+    with TestClient(_app(seen)) as client:
+        assert client.get("/test/events").status_code == 200
+        assert client.get("/test/plain").status_code == 200
+    assert seen == {"in_progress": in_progress_before, "streams": 1}
+    assert http_streams_open.labels("/test/events").value == 0
+    assert http_requests_in_progress.labels("GET").value == in_progress_before
+    assert ("GET", "/test/events") not in http_request_duration_seconds._children
+    assert ("GET", "/test/plain") in http_request_duration_seconds._children
@@ -0,0 +1,71 @@
+"""Broker в памяти процесса: доставка, переполнение очереди подписки и ограничение подписок."""
+import asyncio
+import pytest
+from core.pubsub import Broker, SubscriptionOverflow, TooManySubscribers
+
+
+def _broker(**kwargs) -> Broker:
+    return Broker(**{"queue_size": 2, "max_subscribers": 10, "keepalive_interval": 60, **kwargs})
+
+
+@pytest.mark.asyncio
+async def test_publish_reaches_channel_subscribers():
+    broker = _broker()
+    first, second, other = broker.subscribe("a"), broker.subscribe("a"), broker.subscribe("b")
+    await broker.publish("a", "привет")
+    assert await first.get() == "привет".encode("utf-8")
+    assert await second.get() == "привет".encode("utf-8")
+    other.close()
+    assert broker.subscribers == 2
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_overflows_without_affecting_others():
+    broker = _broker()
+    slow, fast = broker.subscribe("a"), broker.subscribe("a")
+    received = []
+    for index in range(3):
+        await broker.publish("a", str(index))
+        received.append(await fast.get())
+    assert received == [b"0", b"1", b"2"]
+    assert slow.overflowed
+    with pytest.raises(SubscriptionOverflow):
+        await slow.get()
+    # Переполненная подписка больше не копит сообщения
+    await broker.publish("a", "3")
+    assert await fast.get() == b"3"
+    assert slow._messages is None
+
+
+@pytest.mark.asyncio
+async def test_waiting_subscriber_woken_by_overflow():
+    broker = _broker(queue_size=1)
+    subscription = broker.subscribe("a")
+    await broker.publish("a", "0")
+    assert await subscription.get() == b"0"
+    waiter = asyncio.create_task(subscription.get())
+    await asyncio.sleep(0)
+    subscription._overflow()
+    with pytest.raises(SubscriptionOverflow):
+        await asyncio.wait_for(waiter, 1)
+
+
+@pytest.mark.asyncio
+async def test_keepalive_wakes_waiting_subscriber():
+    broker = _broker()
+    subscription = broker.subscribe("a")
+    waiter = asyncio.create_task(subscription.get())
+    await asyncio.sleep(0)
+    broker.keepalive()
+    assert await asyncio.wait_for(waiter, 1) is None
+
+
+def test_max_subscribers():
+    broker = _broker(max_subscribers=1)
+    subscription = broker.subscribe("a")
+    with pytest.raises(TooManySubscribers):
+        broker.subscribe("b")
+    subscription.close()
+    subscription.close()
+    assert broker.subscribers == 0
+    broker.subscribe("b")
@@ -0,0 +1,54 @@
+"""ReadYourWritesMiddleware: после записи чтения клиента идут в primary — по cookie или по токену."""
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from jose import jwt
+from core import dependencies
+from core.config import config
+from core.dependencies import use_replica
+from core.middleware import ReadYourWritesMiddleware
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(config, "SECRET_KEY", "test-secret")
+    monkeypatch.setattr(dependencies, "replica_router", object())
+    app = FastAPI()
+    app.add_middleware(ReadYourWritesMiddleware, window_seconds=60)
+
+    @app.post("/write")
+    async def write(request: Request):
+        request.state.db_wrote = True
+        return {}
+
+    @app.get("/read")
+    async def read(request: Request):
+        return {"replica": use_replica(request)}
+
+    with TestClient(app) as client:
+        yield client
+
+
+def _auth(subject: str) -> dict:
+    return {"Authorization": f"Bearer {jwt.encode({'sub': subject}, 'test-secret', algorithm=config.ALGORITHM)}"}
+
+
+def test_cookie_routes_reads_to_primary(client):
+    assert client.get("/read").json() == {"replica": True}
+    client.post("/write")
+    assert client.get("/read").json() == {"replica": False}
+
+
+def test_token_routes_reads_to_primary_without_cookie(client):
+    client.post("/write", headers=_auth("writer@example.com"))
+    client.cookies.clear()
+    assert client.get("/read", headers=_auth("writer@example.com")).json() == {"replica": False}
+    assert client.get("/read", headers=_auth("other@example.com")).json() == {"replica": True}
+    assert client.get("/read").json() == {"replica": True}
+
+
+def test_invalid_token_is_ignored(client):
+    forged = jwt.encode({"sub": "writer@example.com"}, "other-secret", algorithm=config.ALGORITHM)
+    client.post("/write", headers={"Authorization": f"Bearer {forged}"})
+    client.cookies.clear()
+    assert client.get("/read", headers=_auth("writer@example.com")).json() == {"replica": True}
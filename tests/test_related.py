@@ -0,0 +1,53 @@
+"""RelatedIndex: поиск по TF-IDF и снимок индекса."""
+import pytest
+from apps.qna.related import RelatedIndex
+
+QUESTIONS = {
+    1: "Как настроить пул соединений PostgreSQL в SQLAlchemy?",
+    2: "Размер пула соединений SQLAlchemy для asyncpg",
+    3: "Почему бетон трескается зимой?",
+    5: "Как утеплить веранду зимой?",
+}
+
+
+def _index() -> RelatedIndex:
+    index = RelatedIndex()
+    for question_id, text in QUESTIONS.items():
+        index.add(question_id, text)
+    return index
+
+
+def test_related_finds_similar_question():
+    index = _index()
+    related = index.related(QUESTIONS[1], limit=2, exclude_id=1)
+    assert related[0][0] == 2
+    assert all(question_id != 1 for question_id, _ in related)
+
+
+def test_removed_question_is_not_returned():
+    index = _index()
+    index.remove(2)
+    assert 2 not in [question_id for question_id, _ in index.related(QUESTIONS[1], limit=10, exclude_id=1)]
+    assert len(index) == 3
+
+
+def test_snapshot_round_trip(tmp_path):
+    index = _index()
+    index.remove(3)
+    path = str(tmp_path / "related.bin")
+    index.save(path)
+    loaded = RelatedIndex.load(path)
+    assert loaded.loaded
+    assert (loaded.max_id, len(loaded)) == (index.max_id, len(index))
+    for text in QUESTIONS.values():
+        assert loaded.related(text, limit=10) == index.related(text, limit=10)
+    # Индекс из снимка продолжает принимать новые вопросы
+    loaded.add(6, "Пул соединений asyncpg и SQLAlchemy")
+    assert 6 in [question_id for question_id, _ in loaded.related(QUESTIONS[2], limit=10)]
+
+
+def test_load_rejects_foreign_file(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        RelatedIndex.load(str(path))
@@ -0,0 +1,55 @@
+"""Курсоры пагинации и разбор ids из apps.qna.utils."""
+import math
+from datetime import datetime
+import pytest
+from apps.qna.utils import (
+    MAX_ID, encode_cursor, decode_cursor, encode_rank_cursor, decode_rank_cursor, parse_ids,
+)
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2026, 10, 18, 12, 30, 5, 123456)
+    cursor = encode_cursor(created_at, 42)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, 42)
+
+
+def test_rank_cursor_round_trip():
+    assert decode_rank_cursor(encode_rank_cursor(0.1 + 0.2, 7)) == (0.1 + 0.2, 7)
+
+
+@pytest.mark.parametrize("rank, id", [(math.nan, 7), (math.inf, 7), (-math.inf, 7), (0.5, 0), (0.5, MAX_ID + 1)])
+def test_decode_rank_cursor_rejects_invalid(rank, id):
+    with pytest.raises(ValueError):
+        decode_rank_cursor(encode_rank_cursor(rank, id))
+
+
+@pytest.mark.parametrize("cursor", ["", "не-курсор", "bm90LWEtY3Vyc29y", encode_cursor(datetime(2026, 1, 1), 1)[:-3]])
+def test_decode_cursor_rejects_garbage(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_decode_cursor_normalizes_timezone():
+    cursor = encode_cursor(datetime.fromisoformat("2026-10-18T15:30:00+03:00"), 42)
+    assert decode_cursor(cursor) == (datetime(2026, 10, 18, 12, 30), 42)
+
+
+@pytest.mark.parametrize("id", [0, -1, MAX_ID + 1])
+def test_decode_cursor_rejects_id_out_of_range(id):
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(datetime(2026, 1, 1), id))
+
+
+def test_parse_ids_merges_and_deduplicates():
+    assert parse_ids(["3,1", " 2 ,3", "", "1"]) == [3, 1, 2]
+
+
+@pytest.mark.parametrize("value", ["abc", "1.5", "0", "-1", str(MAX_ID + 1), "99999999999"])
+def test_parse_ids_rejects_invalid(value):
+    with pytest.raises(ValueError):
+        parse_ids(["1", value])
+
+
+def test_parse_ids_accepts_max_id():
+    assert parse_ids([str(MAX_ID)]) == [MAX_ID]